@@ -0,0 +1,11 @@
+import os
+import sys
+
+# allow "python OppProject2 ..." / "python -m OppProject2 ..." from the repository root
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cli import main
+
+# guarded: spawned worker processes (loadtest) re-import this module as __mp_main__
+if __name__ == "__main__":
+    sys.exit(main())
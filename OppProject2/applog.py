@@ -0,0 +1,183 @@
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+# Structured logging for the app and the command line.
+#
+#     log = applog.get_logger("database")
+#     log.error("Error inserting invoice: %s", e, extra={"table": "invoices"})
+#
+# setup() puts a QueueHandler on the "vetclinic" logger, so a log call only
+# formats its message and queues the record; a QueueListener thread writes
+# it to a rotating JSONL file and (WARNING and up by default) to stderr.
+# Fields from log_context()/set_context() -- frame, operation, row ids --
+# and any extra= keys become JSON fields of the record. Before setup() (or
+# without it) records fall through to logging's default stderr output.
+
+LOGGER_NAME = "vetclinic"
+DEFAULT_LOG_FILE = os.path.join("logs", "vetclinic.jsonl")
+
+_context = contextvars.ContextVar("vetclinic_log_context", default={})
+
+# attributes every LogRecord has; anything else on a record is a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener = None
+_setup_lock = threading.Lock()
+
+
+def get_logger(name):
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+
+# ===== Context =====
+@contextmanager
+def log_context(**fields):
+    """Add fields to every record logged inside the block (this thread/task only)"""
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def set_context(**fields):
+    """Set long-lived fields for this thread (e.g. the frame on screen); None removes one"""
+    current = dict(_context.get())
+    for key, value in fields.items():
+        if value is None:
+            current.pop(key, None)
+        else:
+            current[key] = value
+    _context.set(current)
+
+
+def current_context():
+    return dict(_context.get())
+
+
+class ContextFilter(logging.Filter):
+    """Copies the context fields onto each record (runs in the thread that logs)"""
+
+    def filter(self, record):
+        for key, value in _context.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+
+def record_fields(record):
+    return {key: value for key, value in vars(record).items()
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_")}
+
+
+# ===== Formatting =====
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, thread, message, fields, traceback"""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        entry.update(record_fields(record))
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class ConsoleFormatter(logging.Formatter):
+    """Short human-readable line; tracebacks only go to the JSONL file"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s", "%H:%M:%S")
+
+    def format(self, record):
+        record = copy.copy(record)
+        record.exc_info = None
+        record.exc_text = None
+        line = super().format(record)
+        fields = record_fields(record)
+        if fields:
+            line += "  " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Like the stock prepare(), but keep the traceback apart from the message
+        # and leave the extra fields on the record for the JSON formatter.
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+# ===== Setup =====
+def setup(log_file=DEFAULT_LOG_FILE, level="INFO", console_level="WARNING",
+          max_bytes=5 * 1024 * 1024, backups=5):
+    """Start queued logging (idempotent). log_file=None logs to the console only."""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return _listener
+        handlers = []
+        if log_file:
+            folder = os.path.dirname(log_file)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            file_handler = logging.handlers.RotatingFileHandler(
+                log_file, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True)
+            file_handler.setFormatter(JsonFormatter())
+            handlers.append(file_handler)
+        console = logging.StreamHandler(sys.stderr)
+        console.setLevel(console_level)
+        console.setFormatter(ConsoleFormatter())
+        handlers.append(console)
+
+        records = queue.SimpleQueue()
+        handler = _QueueHandler(records)
+        handler.addFilter(ContextFilter())
+        logger = logging.getLogger(LOGGER_NAME)
+        logger.setLevel(level)
+        logger.addHandler(handler)
+        logger.propagate = False
+
+        _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown)
+        return _listener
+
+
+def shutdown():
+    """Write out everything still queued and stop the listener thread"""
+    global _listener
+    with _setup_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+        logger = logging.getLogger(LOGGER_NAME)
+        for handler in list(logger.handlers):
+            if isinstance(handler, _QueueHandler):
+                logger.removeHandler(handler)
+        logger.propagate = True
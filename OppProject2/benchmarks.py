@@ -0,0 +1,353 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime
+
+import datagen
+import reporting
+import services
+from database import Database, LIST_COLUMNS
+from querystats import QUERY_STATS
+from records import record_factory
+
+# Benchmarks for the data layer. Run from the OppProject2 folder with
+# "python -m cli bench" or "python benchmarks.py".
+#
+# "bench suite" times every Database fetch/insert method, the services the
+# frames call, every report and vetclinic.py's medical record list against
+# datagen databases of several sizes (generated once into --data-dir and
+# copied for each run, so inserts never pile up between runs). For each
+# case it keeps the median wall time, the tracemalloc peak of one extra run
+# and the number of SQL statements SQLite ran. --save writes the results
+# as a JSON baseline; --baseline compares against one and exits 1 when a
+# case got slower (or hungrier) by more than --threshold, or runs more
+# statements than before.
+#
+# "bench records" compares row representations (tuple/dict/Row/record).
+
+
+# ===== Row representations =====
+def _dict_factory(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+ROW_FACTORIES = {
+    "tuple": None,
+    "dict": _dict_factory,
+    "sqlite3.Row": sqlite3.Row,
+    "record": record_factory,
+}
+
+
+def _invoice_rows(n, seed=1):
+    rnd = random.Random(seed)
+    clients = [f"Client {i}" for i in range(max(1, n // 20))]
+    pets = ["Max", "Bella", "Luna", "Charlie", "Milo", "Coco", "Rocky"]
+    for i in range(n):
+        yield (f"INV-{i:08d}", rnd.choice(clients), rnd.choice(pets), round(rnd.uniform(40, 900), 2),
+               f"2025-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}", rnd.choice(("Paid", "Unpaid")))
+
+
+def record_memory(rows=100000):
+    """Memory and fetch time per row for each row representation (invoices table).
+
+    Returns {name: {"bytes_per_row": ..., "fetch_ms": ...}}.
+    """
+    conn = sqlite3.connect(":memory:")
+    columns = LIST_COLUMNS["invoices"]
+    conn.execute("CREATE TABLE invoices (id INTEGER PRIMARY KEY, invoice_no TEXT, client TEXT, "
+                 "pet TEXT, amount REAL, date TEXT, status TEXT)")
+    conn.executemany("INSERT INTO invoices (invoice_no, client, pet, amount, date, status) VALUES (?, ?, ?, ?, ?, ?)",
+                     _invoice_rows(rows))
+    query = f"SELECT {', '.join(columns)} FROM invoices"
+
+    results = {}
+    for name, factory in ROW_FACTORIES.items():
+        cur = conn.cursor()
+        cur.row_factory = factory
+
+        start = time.perf_counter()
+        fetched = cur.execute(query).fetchall()
+        elapsed = time.perf_counter() - start
+        del fetched
+
+        tracemalloc.start()
+        fetched = cur.execute(query).fetchall()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del fetched
+
+        results[name] = {"bytes_per_row": size / rows, "fetch_ms": elapsed * 1000}
+    conn.close()
+    return results
+
+
+# ===== Suite =====
+# Datasets are pinned to this end date so baselines from different days compare
+BENCH_END = date(2025, 12, 31)
+DEFAULT_SIZES = (1000, 10000)
+DEFAULT_THRESHOLD = 0.25
+# differences below these are noise, whatever the ratio
+MIN_DELTA_MS = 0.5
+MIN_DELTA_KB = 64
+
+
+class BenchContext:
+    """The databases and sample keys one size's cases run against"""
+
+    def __init__(self, db, vdb, clients):
+        self.db = db
+        self.vdb = vdb
+        self.clients = clients
+        # the busiest client/pet, so per-client lookups are the expensive kind
+        self.client, self.pet = db.conn.execute(
+            "SELECT client, pet FROM treatments GROUP BY client, pet ORDER BY COUNT(*) DESC LIMIT 1").fetchone()
+        self.invoice_id = db.conn.execute("SELECT MAX(id) / 2 FROM invoices").fetchone()[0]
+        self.today = BENCH_END.isoformat()
+
+    def walkin(self):
+        return ("Bench Client", "09170000000", "Calatagan", "Bench", "Dog", "Beagle", 3, "Checkup", self.today)
+
+
+def _load_records(ctx):
+    # what MedicalRecord list's reload() runs: the row count, then the first page
+    vetclinic = datagen.vetclinic_module()
+    vetclinic.count_rows(ctx.vdb, vetclinic.RECORD_SOURCE)
+    return vetclinic.fetch_page(ctx.vdb, vetclinic.RECORD_FIELDS, vetclinic.RECORD_SOURCE,
+                                "m.recordID", "m.visitDate", descending=True)
+
+
+# (name, fn(ctx)); names group as "Area.case"
+CASES = [
+    ("Database.fetch_clients", lambda ctx: ctx.db.fetch_clients()),
+    ("Database.fetch_clients_keyword", lambda ctx: ctx.db.fetch_clients("Santos")),
+    ("Database.fetch_walkins", lambda ctx: ctx.db.fetch_walkins()),
+    ("Database.fetch_animals", lambda ctx: ctx.db.fetch_animals()),
+    ("Database.fetch_appointments", lambda ctx: ctx.db.fetch_appointments()),
+    ("Database.fetch_invoices", lambda ctx: ctx.db.fetch_invoices()),
+    ("Database.fetch_treatments", lambda ctx: ctx.db.fetch_treatments()),
+    ("Database.fetch_pet_status", lambda ctx: ctx.db.fetch_pet_status()),
+    ("Database.fetch_invoice_by_id", lambda ctx: ctx.db.fetch_invoice_by_id(ctx.invoice_id)),
+    ("Database.fetch_latest_invoice_for_client", lambda ctx: ctx.db.fetch_latest_invoice_for_client(ctx.client)),
+    ("Database.fetch_page_invoices", lambda ctx: ctx.db.fetch_page("invoices", "date", True)),
+    ("Database.fetch_page_invoices_filtered", lambda ctx: ctx.db.fetch_page("invoices", "date", True,
+                                                                            {"status": "Unpaid"})),
+    ("Database.count_rows_invoices", lambda ctx: ctx.db.count_rows("invoices")),
+    ("Database.count_treatment_types", lambda ctx: ctx.db.count_treatment_types(ctx.client)),
+    ("Database.fetch_confined_pets", lambda ctx: ctx.db.fetch_confined_pets()),
+    ("Database.insert_client", lambda ctx: ctx.db.insert_client(["Bench Client", "09170000000", "Calatagan"])),
+    ("Database.insert_animal", lambda ctx: ctx.db.insert_animal(["Bench", "Dog", "Beagle", 3, "Bench Client"])),
+    ("Database.insert_appointment", lambda ctx: ctx.db.insert_appointment(
+        ["Bench Client", "Bench", ctx.today, "09:00", "Checkup"])),
+    ("Database.insert_walkin", lambda ctx: ctx.db.insert_walkin(list(ctx.walkin()))),
+    ("Database.insert_treatment_with_type", lambda ctx: ctx.db.insert_treatment_with_type(
+        ["Checkup", "Bench", "Bench Client", "Checkup", ctx.today, "No", ""])),
+    ("Database.insert_invoice", lambda ctx: ctx.db.insert_invoice(
+        [services.new_invoice_no(ctx.db, ctx.today), "Bench Client", "Bench", 50.0, ctx.today, "Unpaid"])),
+    ("Database.insert_pet_status", lambda ctx: ctx.db.insert_pet_status(
+        ["Bench", "Bench Client", "Daily Treatment", ctx.today, ""])),
+    ("services.process_walkin", lambda ctx: services.process_walkin(ctx.db, ctx.walkin())),
+    ("services.add_treatment_cost", lambda ctx: services.add_treatment_cost(ctx.db, ctx.client, "Checkup")),
+    ("services.calculate_treatment_total", lambda ctx: services.calculate_treatment_total(ctx.db, ctx.client)),
+    ("services.calculate_treatment_total_pet", lambda ctx: services.calculate_treatment_total(
+        ctx.db, ctx.client, ctx.pet)),
+    ("services.discharge_totals", lambda ctx: services.discharge_totals(
+        ctx.db, [(client, pet) for client, pet, _ in ctx.db.fetch_confined_pets()])),
+] + [
+    (f"reporting.{name}", lambda ctx, build=build: build(ctx.db)) for name, build in sorted(reporting.REPORTS.items())
+] + [
+    ("vetclinic._load_records", _load_records),
+]
+
+
+def dataset(data_dir, clients, schema, seed=1):
+    """Path of the cached datagen database for this size, generating it if missing"""
+    path = os.path.join(data_dir, f"{schema}-{clients}-s{seed}.db")
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        tmp = path + ".part"
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        options = dict(clients=clients, end=BENCH_END, seed=seed)
+        if schema == "vetclinic":
+            datagen.generate_vetclinic(tmp, **options)
+        else:
+            db = Database(tmp)
+            try:
+                datagen.generate_clinic(db, **options)
+            finally:
+                db.conn.close()
+        os.replace(tmp, path)
+    return path
+
+
+def measure(fn, ctx, repeat=5):
+    """Median/min wall ms, tracemalloc peak KB and SQL statements per call"""
+    statements = [0]
+
+    def trace(sql):
+        statements[0] += 1
+
+    fn(ctx)  # warm the page cache and statement cache
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(ctx)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    for conn in (ctx.db.conn, ctx.vdb.conn):
+        conn.set_trace_callback(trace)
+    tracemalloc.start()
+    try:
+        fn(ctx)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        for conn in (ctx.db.conn, ctx.vdb.conn):
+            conn.set_trace_callback(None)
+    return {
+        "ms": statistics.median(timings),
+        "min_ms": min(timings),
+        "peak_kb": peak / 1024,
+        "queries": statements[0],
+    }
+
+
+def run_suite(sizes=DEFAULT_SIZES, repeat=5, only=None, data_dir=None, progress=None):
+    """{"<clients>/<case>": result} for every case (containing `only`) at every size"""
+    vetclinic = datagen.vetclinic_module()
+    data_dir = data_dir or os.path.join(tempfile.gettempdir(), "vetclinic-bench")
+    cases = [(name, fn) for name, fn in CASES if not only or only in name]
+    results = {}
+    # timings are the point here; keep slow statements out of the log
+    slow_ms, QUERY_STATS.slow_ms = QUERY_STATS.slow_ms, None
+    work = tempfile.mkdtemp(prefix="vetclinic-bench-")
+    try:
+        for clients in sizes:
+            clinic_path = os.path.join(work, "clinic.db")
+            vet_path = os.path.join(work, "vetclinic.db")
+            shutil.copyfile(dataset(data_dir, clients, "clinic"), clinic_path)
+            shutil.copyfile(dataset(data_dir, clients, "vetclinic"), vet_path)
+            db, vdb = Database(clinic_path), vetclinic.Database(vet_path)
+            try:
+                ctx = BenchContext(db, vdb, clients)
+                for name, fn in cases:
+                    result = measure(fn, ctx, repeat)
+                    result.update(case=name, clients=clients)
+                    results[f"{clients}/{name}"] = result
+                    if progress:
+                        progress(result)
+            finally:
+                db.conn.close()
+                vdb.close()
+    finally:
+        QUERY_STATS.slow_ms = slow_ms
+        shutil.rmtree(work, ignore_errors=True)
+    return results
+
+
+def save_baseline(path, results, repeat):
+    document = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "machine": platform.node(),
+        "repeat": repeat,
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+
+
+def load_baseline(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """[(key, [problems])] for every case also in the baseline; empty problems means OK"""
+    report = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        problems = []
+        if result["ms"] > base["ms"] * (1 + threshold) and result["ms"] - base["ms"] >= MIN_DELTA_MS:
+            problems.append(f"time {base['ms']:.2f} -> {result['ms']:.2f} ms")
+        if result["peak_kb"] > base["peak_kb"] * (1 + threshold) and result["peak_kb"] - base["peak_kb"] >= MIN_DELTA_KB:
+            problems.append(f"memory {base['peak_kb']:.0f} -> {result['peak_kb']:.0f} KB")
+        if result["queries"] > base["queries"]:
+            problems.append(f"queries {base['queries']} -> {result['queries']}")
+        report.append((key, problems))
+    return report
+
+
+def _print_result(result):
+    print(f"{result['clients']:>8,} {result['case']:<45} {result['ms']:>10.2f} {result['min_ms']:>10.2f} "
+          f"{result['peak_kb']:>10.0f} {result['queries']:>8}", flush=True)
+
+
+def run_suite_command(args):
+    sizes = [int(size) for size in args.sizes.split(",")]
+    baseline = load_baseline(args.baseline) if args.baseline else None
+    print(f"{'clients':>8} {'case':<45} {'median ms':>10} {'min ms':>10} {'peak KB':>10} {'queries':>8}")
+    results = run_suite(sizes, args.repeat, args.case, args.data_dir, progress=_print_result)
+    if args.save:
+        save_baseline(args.save, results, args.repeat)
+        print(f"Saved {len(results)} results to {args.save}")
+    if baseline is None:
+        return 0
+    report = compare(results, baseline, args.threshold)
+    regressions = [(key, problems) for key, problems in report if problems]
+    print(f"\nCompared {len(report)} cases with {args.baseline} (threshold {args.threshold:.0%}): "
+          f"{len(regressions)} regression(s)")
+    for key, problems in regressions:
+        print(f"  REGRESSION  {key}: {'; '.join(problems)}")
+    return 1 if regressions else 0
+
+
+# ===== Command line =====
+def add_arguments(parser):
+    parser.add_argument("target", nargs="?", choices=("suite", "records"), default="suite",
+                        help="method/report suite (default) or row representation memory")
+    parser.add_argument("--rows", type=int, default=100000, help="records: rows per measurement")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="suite: comma separated dataset sizes, in clients (default %(default)s)")
+    parser.add_argument("--repeat", type=int, default=5, help="suite: timed runs per case (median is kept)")
+    parser.add_argument("--case", help="suite: only cases whose name contains this")
+    parser.add_argument("--data-dir", help="suite: where generated datasets are cached")
+    parser.add_argument("--save", help="suite: write the results as a JSON baseline")
+    parser.add_argument("--baseline", help="suite: compare with this JSON baseline; exit 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="suite: allowed slowdown before a case counts as a regression (default %(default)s)")
+
+
+def run(args):
+    if args.target == "suite":
+        return run_suite_command(args)
+    results = record_memory(args.rows)
+    print(f"Invoices rows: {args.rows:,}")
+    print(f"{'representation':<15} {'bytes/row':>10} {'MB per 100k':>12} {'fetch ms':>10}")
+    for name, result in results.items():
+        per_row = result["bytes_per_row"]
+        print(f"{name:<15} {per_row:>10.0f} {per_row * 100000 / 1e6:>12.1f} {result['fetch_ms']:>10.0f}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Data layer benchmarks")
+    add_arguments(parser)
+    return run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+import argparse
+import sys
+
+import applog
+import benchmarks
+import datagen
+import dedup
+import exporter
+import importer
+import loadtest
+import memprofile
+import metrics
+import plancheck
+import receivables
+import reporting
+from database import Database, DB_FILE
+from querystats import QUERY_STATS
+
+# Headless command line for the clinic database.
+# Run from the OppProject2 folder with "python -m cli <command>" (or
+# "python -m OppProject2 <command>" from the repository root). Nothing here
+# imports tkinter or matplotlib, so it works on machines without a display.
+
+
+# ===== report =====
+def add_report_arguments(parser):
+    parser.add_argument("name", choices=sorted(reporting.REPORTS))
+    parser.add_argument("--db", default=DB_FILE, help="database file")
+    parser.add_argument("-o", "--output", help="write the report to this file instead of stdout")
+
+
+def run_report(args):
+    db = Database(args.db)
+    try:
+        text = reporting.REPORTS[args.name](db)
+    finally:
+        db.conn.close()
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
+    return 0
+
+
+# ===== check =====
+def add_check_arguments(parser):
+    parser.add_argument("--db", default=DB_FILE, help="database file")
+    parser.add_argument("--full", action="store_true", help="full integrity_check instead of quick_check")
+
+
+def run_check(args):
+    from maintenance import run_checks
+    db = Database(args.db)
+    try:
+        results = run_checks(db, args.full)
+    finally:
+        db.conn.close()
+    problems = 0
+    for description, count in results:
+        problems += count
+        print(f"{'OK  ' if count == 0 else 'FAIL'}  {description:<45} {count}")
+    return 1 if problems else 0
+
+
+# ===== maintenance =====
+def add_maintenance_arguments(parser):
+    parser.add_argument("task", choices=("analyze", "vacuum", "checkpoint", "backup", "rollups", "balances"))
+    parser.add_argument("dest", nargs="?", help="backup destination file")
+    parser.add_argument("--db", default=DB_FILE, help="database file")
+
+
+def run_maintenance(args):
+    import maintenance
+    if args.task == "backup" and not args.dest:
+        print("Error: backup needs a destination file", file=sys.stderr)
+        return 2
+    db = Database(args.db)
+    try:
+        if args.task == "backup":
+            maintenance.backup(db, args.dest)
+            print(f"Backed up {args.db} to {args.dest}")
+        elif args.task in ("rollups", "balances"):
+            counts = getattr(maintenance, args.task)(db)
+            print("Rebuilt " + ", ".join(f"{table} ({rows:,} rows)" for table, rows in counts.items()))
+        else:
+            getattr(maintenance, args.task)(db)
+            print(f"{args.task} done")
+    finally:
+        db.conn.close()
+    return 0
+
+
+# command -> (help, add_arguments, run)
+COMMANDS = {
+    "report": ("print a text report", add_report_arguments, run_report),
+    "export": ("export a table or report to CSV/JSONL", exporter.add_arguments, exporter.run),
+    "import": ("bulk import CSV/JSONL/JSON", importer.add_arguments, importer.run),
+    "dedup": ("find and merge duplicate clients and pets", dedup.add_arguments, dedup.run),
+    "check": ("run integrity checks", add_check_arguments, run_check),
+    "maintenance": ("analyze / vacuum / checkpoint / backup / rebuild rollups or balances", add_maintenance_arguments, run_maintenance),
+    "bench": ("data layer benchmarks", benchmarks.add_arguments, benchmarks.run),
+    "generate": ("create a seeded synthetic database", datagen.add_arguments, datagen.run),
+    "loadtest": ("concurrent multi-process load test", loadtest.add_arguments, loadtest.run),
+    "plancheck": ("fail on full scans / needless sorts in query plans", plancheck.add_arguments, plancheck.run),
+    "ar": ("receivables aging and client statements", receivables.add_arguments, receivables.run),
+    "memory": ("allocation growth from repeating a bench case", memprofile.add_arguments, memprofile.run),
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="vetclinic", description="Vet clinic command line tools")
+    parser.add_argument("--query-stats", action="store_true",
+                        help="print per-statement query timings to stderr when done")
+    parser.add_argument("--slow-ms", type=float,
+                        help=f"warn about queries slower than this (default: log those over "
+                             f"{QUERY_STATS.slow_ms:g} ms quietly)")
+    parser.add_argument("--slow-log", help="append slow queries (with query plans) to this JSONL file")
+    parser.add_argument("--metrics-file", help="write Prometheus metrics to this file when done")
+    parser.add_argument("--log-file", help="also write a rotating JSONL log to this file")
+    parser.add_argument("--log-level", default="WARNING", choices=("DEBUG", "INFO", "WARNING", "ERROR"))
+    sub = parser.add_subparsers(dest="command", metavar="command")
+    sub.required = True
+    for name, (help_text, add_arguments, run) in COMMANDS.items():
+        cmd = sub.add_parser(name, help=help_text)
+        add_arguments(cmd)
+        cmd.set_defaults(func=run)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    applog.setup(args.log_file, args.log_level, console_level=args.log_level)
+    if args.slow_ms is not None:
+        QUERY_STATS.slow_ms = args.slow_ms
+        QUERY_STATS.warn = True
+    QUERY_STATS.log_path = args.slow_log
+    try:
+        return args.func(args)
+    finally:
+        if args.query_stats:
+            sys.stderr.write(QUERY_STATS.summary())
+        if args.metrics_file:
+            metrics.REGISTRY.write(args.metrics_file)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,198 @@
+import os
 import sqlite3
+import threading
+from datetime import datetime
+
+import applog
+import metrics
+from normalize import normalize_pet_status
+from querystats import InstrumentedConnection
+from records import record_factory
+
+DB_FILE = "vet_clinic.db"
+
+# Columns shown by the list frames, per table (also the whitelist for fetch_page)
+LIST_COLUMNS = {
+    "clients": ("id", "name", "contact", "address"),
+    "animals": ("id", "pet_name", "species", "breed", "age", "owner_name"),
+    "appointments": ("id", "client_name", "pet_name", "date", "time", "reason"),
+    "treatments": ("id", "reason", "pet", "client", "treatment_type", "date", "confined", "notes"),
+    "invoices": ("id", "invoice_no", "client", "pet", "amount", "date", "status", "paid_amount"),
+    "pet_status": ("id", "pet", "client", "status", "date", "notes"),
+}
+
+# Columns the list frames can sort by. Each one is indexed (see create_tables),
+# so ORDER BY ... LIMIT reads the first page straight off the index.
+SORT_COLUMNS = {
+    "clients": ("id", "name"),
+    "animals": ("id", "pet_name", "species", "owner_name"),
+    "appointments": ("id", "client_name", "date"),
+    "treatments": ("id", "client", "treatment_type", "date"),
+    "invoices": ("id", "invoice_no", "client", "amount", "date", "status"),
+    "pet_status": ("id", "client", "status", "date"),
+}
+
+# Sort columns whose index is (column, second column): ties are ordered by
+# the second column before id, which keeps the page on the index instead of
+# sorting every row with the same client in a temp B-tree.
+SORT_TIES = {
+    ("appointments", "client_name"): "pet_name",
+    ("treatments", "client"): "pet",
+    ("invoices", "client"): "pet",
+    ("pet_status", "client"): "pet",
+}
+
+NUMERIC_COLUMNS = {"id", "age", "amount", "paid_amount"}
+
+# Revenue rollups: one row per day / month with the invoice count and totals,
+# kept current by triggers on invoices (see create_revenue_rollups), so the
+# revenue reports read O(days) rows however many invoices there are. Paid
+# and unpaid split each invoice by paid_amount, so partial payments count.
+# table -> (key column, key of an invoice row; {row} is NEW, OLD or invoices)
+REVENUE_ROLLUPS = {
+    "daily_revenue": ("date", "{row}.date"),
+    "monthly_revenue": ("month", "substr({row}.date, 1, 7)"),
+}
+# trigger name -> (event, [(invoice row, "+" adds it / "-" removes it)])
+REVENUE_TRIGGERS = {
+    "invoices_revenue_insert": ("AFTER INSERT", [("NEW", "+")]),
+    "invoices_revenue_delete": ("AFTER DELETE", [("OLD", "-")]),
+    "invoices_revenue_update": ("AFTER UPDATE OF amount, date, paid_amount", [("OLD", "-"), ("NEW", "+")]),
+}
+
+# Invoice numbers are INV-YYYYMMDD-NNNN: the invoice date and a per-day
+# counter in invoice_sequences. allocate_invoice_nos() reserves a block with
+# one UPDATE in the caller's transaction, so terminals (connections or
+# processes) are serialized by SQLite's write lock and a rolled back insert
+# gives its numbers back. The unique index makes a collision an error.
+INVOICE_NO_PREFIX = "INV-"
+INVOICE_NO_DIGITS = 4
+
+# Balances: invoices.paid_amount is the sum of the invoice's payments and
+# client_balances holds each client's billed / paid / balance, both kept in
+# step by triggers in the same transaction as the write (see create_balances).
+# Setting an invoice's status still works: marking it Paid records a
+# "Settled" payment for what is due, marking a settled one Unpaid records a
+# "Reversal", and a payment that clears (or reopens) an invoice sets its status.
+# Changing an amount sets the status in the same UPDATE (update_invoice_amount):
+# a trigger doing it would update the row again under the revenue trigger.
+SETTLED_TOLERANCE = 0.005  # dues below half a cent count as paid
+_DUE = "{row}.amount - {row}.paid_amount"
+_STATUS_AFTER = "CASE WHEN amount - ({paid}) <= %s THEN 'Paid' ELSE 'Unpaid' END" % SETTLED_TOLERANCE
+_CLIENT_CHANGE = """
+    INSERT OR IGNORE INTO client_balances (client) SELECT {row}.client WHERE {row}.client IS NOT NULL;
+    UPDATE client_balances SET invoices = invoices {sign} 1, billed = billed {sign} COALESCE({row}.amount, 0),
+        paid = paid {sign} {row}.paid_amount, balance = balance {sign} (COALESCE({row}.amount, 0) - {row}.paid_amount)
+    WHERE client = {row}.client;"""
+_PAYMENT_CHANGE = """
+    UPDATE invoices SET paid_amount = paid_amount {sign} {row}.amount,
+        status = """ + _STATUS_AFTER.format(paid="paid_amount {sign} {row}.amount") + """
+    WHERE id = {row}.invoice_id;"""
+# trigger name -> (event with table and WHEN, body)
+BALANCE_TRIGGERS = {
+    "payments_balance_insert": ("AFTER INSERT ON payments", _PAYMENT_CHANGE.format(row="NEW", sign="+")),
+    "payments_balance_delete": ("AFTER DELETE ON payments", _PAYMENT_CHANGE.format(row="OLD", sign="-")),
+    "payments_balance_update": ("AFTER UPDATE OF amount, invoice_id ON payments",
+                                _PAYMENT_CHANGE.format(row="OLD", sign="-") + _PAYMENT_CHANGE.format(row="NEW", sign="+")),
+    "invoices_balance_insert": ("AFTER INSERT ON invoices", _CLIENT_CHANGE.format(row="NEW", sign="+")),
+    "invoices_balance_delete": ("AFTER DELETE ON invoices", _CLIENT_CHANGE.format(row="OLD", sign="-")),
+    "invoices_balance_update": ("AFTER UPDATE OF client, amount, paid_amount ON invoices",
+                                _CLIENT_CHANGE.format(row="OLD", sign="-") + _CLIENT_CHANGE.format(row="NEW", sign="+")),
+    # status set by hand (or inserted as Paid): record the payment that makes it true
+    "invoices_settle_insert": (
+        f"AFTER INSERT ON invoices WHEN NEW.status = 'Paid' AND {_DUE.format(row='NEW')} > {SETTLED_TOLERANCE}",
+        f"INSERT INTO payments (invoice_id, amount, date, method) "
+        f"VALUES (NEW.id, {_DUE.format(row='NEW')}, COALESCE(NEW.date, date('now', 'localtime')), 'Settled');"),
+    "invoices_settle_update": (
+        f"AFTER UPDATE OF status ON invoices WHEN NEW.status = 'Paid' AND {_DUE.format(row='NEW')} > {SETTLED_TOLERANCE}",
+        f"INSERT INTO payments (invoice_id, amount, date, method) "
+        f"VALUES (NEW.id, {_DUE.format(row='NEW')}, date('now', 'localtime'), 'Settled');"),
+    "invoices_reopen": (
+        f"AFTER UPDATE OF status ON invoices WHEN NEW.status = 'Unpaid' AND NEW.paid_amount <> 0 "
+        f"AND {_DUE.format(row='NEW')} <= {SETTLED_TOLERANCE}",
+        "INSERT INTO payments (invoice_id, amount, date, method) "
+        "VALUES (NEW.id, -NEW.paid_amount, date('now', 'localtime'), 'Reversal');"),
+}
+
+FILTER_OPERATORS = (">=", "<=", "<>", "!=", ">", "<", "=")
+
+# (client, pet) pairs per count_treatment_types_for query: two variables
+# each, under SQLite's older 999-variable limit
+PETS_PER_QUERY = 400
+
+# Called as listener(path, table, row_ids) after a commit that changed `table`
+# in the database file at `path` (any Database instance, any thread).
+# row_ids are the ids of existing rows that changed: () when rows were only
+# added, None when any row may have changed.
+_write_listeners = []
+_listeners_lock = threading.Lock()
+
+log = applog.get_logger("database")
+
+INVOICES_CREATED = metrics.counter("vetclinic_invoices_created_total", "Invoices inserted")
 
 class Database:
-    def __init__(self):
-        self.conn = sqlite3.connect("vet_clinic.db")
+    def __init__(self, path=DB_FILE):
+        self.path = path
+        # every statement is timed into querystats.QUERY_STATS
+        self.conn = sqlite3.connect(path, factory=InstrumentedConnection)
+        # table rows come back as records.* objects, everything else as tuples
+        self.conn.row_factory = record_factory
         self.cursor = self.conn.cursor()
+        self.pending_changes = {}  # table -> set of changed row ids, or None
         self.create_tables()
 
+    # ===== Change notification (cache invalidation) =====
+    @staticmethod
+    def add_write_listener(listener):
+        with _listeners_lock:
+            _write_listeners.append(listener)
+
+    @staticmethod
+    def remove_write_listener(listener):
+        with _listeners_lock:
+            if listener in _write_listeners:
+                _write_listeners.remove(listener)
+
+    def changed(self, table, row_ids=None):
+        """Record a write to `table`; listeners hear about it on the next commit().
+
+        row_ids: ids of existing rows that changed, () if rows were only
+        inserted, None if any row may have changed.
+        """
+        if table in self.pending_changes:
+            known = self.pending_changes[table]
+            if known is None or row_ids is None:
+                self.pending_changes[table] = None
+            else:
+                known.update(row_ids)
+        else:
+            self.pending_changes[table] = None if row_ids is None else set(row_ids)
+
+    def commit(self):
+        """Commit, then notify write listeners of the tables that changed"""
+        self.conn.commit()
+        if not self.pending_changes:
+            return
+        changes, self.pending_changes = self.pending_changes, {}
+        with _listeners_lock:
+            listeners = list(_write_listeners)
+        path = os.path.abspath(self.path)
+        for table, row_ids in changes.items():
+            for listener in listeners:
+                try:
+                    listener(path, table, None if row_ids is None else tuple(row_ids))
+                except Exception as e:
+                    log.exception("Error in write listener: %s", e, extra={"table": table})
+
+    def rollback(self):
+        self.conn.rollback()
+        self.pending_changes = {}
+
+    def data_version(self):
+        """PRAGMA data_version: differs from the last reading if another connection committed since"""
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
     def create_tables(self):
         """Create all required tables"""
         try:
@@ -76,7 +263,12 @@ class Database:
                 if "status" not in cols:
                     self.cursor.execute("ALTER TABLE invoices ADD COLUMN status TEXT DEFAULT 'Unpaid'")
             except Exception as mig_e:
-                print(f"Warning: invoice status migration failed: {mig_e}")
+                log.warning("Invoice status migration failed: %s", mig_e)
+
+            # Running total of the invoice's payments (see BALANCE_TRIGGERS)
+            self.cursor.execute("PRAGMA table_info(invoices)")
+            if "paid_amount" not in [row[1] for row in self.cursor.fetchall()]:
+                self.cursor.execute("ALTER TABLE invoices ADD COLUMN paid_amount REAL NOT NULL DEFAULT 0")
 
             # Walk-ins table
             self.cursor.execute("""
@@ -106,10 +298,487 @@ class Database:
                 )
             """)
 
+            # Payments against invoices (negative amounts are refunds/reversals)
+            self.cursor.execute("""
+                CREATE TABLE IF NOT EXISTS payments (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    invoice_id INTEGER NOT NULL REFERENCES invoices(id),
+                    amount REAL NOT NULL,
+                    date TEXT,
+                    method TEXT,
+                    notes TEXT
+                )
+            """)
+
+            # Indexes on the name columns that link records together
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_clients_name ON clients(name)")
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_animals_owner ON animals(owner_name)")
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_appointments_client ON appointments(client_name, pet_name)")
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_treatments_client ON treatments(client, pet)")
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_invoices_client ON invoices(client, pet)")
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_invoices_date ON invoices(date)")
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_pet_status_client ON pet_status(client, pet)")
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_walkins_client ON walkins(client_name)")
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_payments_invoice ON payments(invoice_id)")
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_payments_date ON payments(date)")
+
+            # Indexes behind the sortable list columns (SORT_COLUMNS)
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_animals_pet_name ON animals(pet_name)")
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_animals_species ON animals(species)")
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_appointments_date ON appointments(date)")
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_treatments_type ON treatments(treatment_type)")
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_treatments_date ON treatments(date)")
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_invoices_amount ON invoices(amount)")
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_invoices_status ON invoices(status)")
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_pet_status_date ON pet_status(date)")
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_pet_status_status ON pet_status(status)")
+
+            # Open invoices only, covering the receivables queries (receivables.py)
+            self.cursor.execute("DROP INDEX IF EXISTS idx_invoices_open")  # before paid_amount
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_invoices_due "
+                                "ON invoices(date, client, amount, paid_amount) WHERE status = 'Unpaid'")
+
+            self.normalize_pet_statuses()
+            self.create_invoice_numbers()
+            # balances first: the rollups are built from paid_amount
+            self.create_balances()
+            self.create_revenue_rollups()
+
             self.conn.commit()
-            print("✅ All tables created/validated successfully!")
+            log.info("All tables created/validated", extra={"path": self.path})
+        except Exception as e:
+            log.exception("Error creating tables: %s", e, extra={"path": self.path})
+
+    def normalize_pet_statuses(self):
+        """Rewrite known statuses stored in another case ('confined') to the canonical
+        spelling: the confined list and fetch_confined_pets match them exactly"""
+        # DISTINCT walks idx_pet_status_status; each rewrite seeks it
+        statuses = [row[0] for row in self.cursor.execute("SELECT DISTINCT status FROM pet_status")]
+        for status in statuses:
+            canonical = normalize_pet_status(status)
+            if canonical != status:
+                self.cursor.execute("UPDATE pet_status SET status = ? WHERE status = ?", (canonical, status))
+
+    # ===== Invoice numbers =====
+    def create_invoice_numbers(self):
+        """Create invoice_sequences and the unique index on invoice_no (renumbering legacy duplicates)"""
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS invoice_sequences (
+                day TEXT PRIMARY KEY,
+                next INTEGER NOT NULL DEFAULT 1
+            ) WITHOUT ROWID
+        """)
+        exists = self.cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_invoices_no_unique'").fetchone()
+        if exists is None:
+            self._renumber_duplicate_invoices()
+            # IF NOT EXISTS: another terminal may be opening the same file
+            self.cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_invoices_no_unique ON invoices(invoice_no)")
+        # the unique index serves the invoice_no sort and lookups
+        self.cursor.execute("DROP INDEX IF EXISTS idx_invoices_no")
+
+    def _renumber_duplicate_invoices(self):
+        """Older databases reused numbers (one per day from the invoice form): the first
+        invoice keeps its number, later ones get "/2", "/3"... appended"""
+        duplicates = self.cursor.execute("""
+            SELECT id, invoice_no FROM (
+                SELECT id, invoice_no, ROW_NUMBER() OVER (PARTITION BY invoice_no ORDER BY id) AS n
+                FROM invoices WHERE invoice_no IS NOT NULL)
+            WHERE n > 1 ORDER BY id
+        """).fetchall()
+        for invoice_id, invoice_no in duplicates:
+            suffix = 2
+            while self.cursor.execute("SELECT 1 FROM invoices WHERE invoice_no = ?",
+                                      (f"{invoice_no}/{suffix}",)).fetchone():
+                suffix += 1
+            self.cursor.execute("UPDATE invoices SET invoice_no = ? WHERE id = ?", (f"{invoice_no}/{suffix}", invoice_id))
+        if duplicates:
+            self.changed("invoices", [invoice_id for invoice_id, _ in duplicates])
+            log.warning("Renumbered %d invoices with duplicate numbers", len(duplicates),
+                        extra={"table": "invoices", "path": self.path})
+
+    def allocate_invoice_nos(self, day, count=1):
+        """Reserve `count` consecutive invoice numbers for `day` (YYYY-MM-DD) and return them.
+
+        Runs in the caller's transaction and does not commit: insert the
+        invoices, then commit. The counter first skips past any number that
+        day already used (imports, datagen), so it never hands out a taken
+        one. Raises ValueError for a malformed day, and re-raises other
+        errors after rolling back.
+        """
+        prefix = f"{INVOICE_NO_PREFIX}{datetime.strptime(day, '%Y-%m-%d'):%Y%m%d}-"
+        try:
+            # the INSERT takes the write lock, so no other terminal reads the counter until we commit
+            self.cursor.execute("INSERT OR IGNORE INTO invoice_sequences (day) VALUES (?)", (day,))
+            self.cursor.execute(
+                "UPDATE invoice_sequences SET next = MAX(next, ("
+                "SELECT COALESCE(MAX(CAST(substr(invoice_no, :start) AS INTEGER)), 0) + 1 FROM invoices "
+                "WHERE invoice_no > :prefix AND invoice_no < :end)) + :count WHERE day = :day",
+                {"start": len(prefix) + 1, "prefix": prefix, "end": prefix[:-1] + ".", "count": count, "day": day}
+            )
+            after = self.cursor.execute("SELECT next FROM invoice_sequences WHERE day = ?", (day,)).fetchone()[0]
+        except Exception:
+            self.rollback()
+            raise
+        return [f"{prefix}{n:0{INVOICE_NO_DIGITS}d}" for n in range(after - count, after)]
+
+    # ===== Revenue rollups =====
+    @staticmethod
+    def _rollup_sums(row):
+        """SQL for (amount, paid part, unpaid part) of one invoice row"""
+        amount = f"COALESCE({row}.amount, 0)"
+        return amount, f"{row}.paid_amount", f"({amount} - {row}.paid_amount)"
+
+    def _rollup_trigger_body(self, row, sign):
+        """Trigger statements adding (sign "+") or removing ("-") invoice `row` in every rollup"""
+        amount, paid, unpaid = self._rollup_sums(row)
+        statements = []
+        for table, (key, expression) in REVENUE_ROLLUPS.items():
+            value = expression.format(row=row)
+            # triggers can run in either order (an insert whose payment trigger
+            # updates the row), so a removal may come first: it goes negative
+            statements.append(f"INSERT OR IGNORE INTO {table} ({key}) SELECT {value} WHERE {value} IS NOT NULL;")
+            statements.append(
+                f"UPDATE {table} SET invoices = invoices {sign} 1, total = total {sign} {amount}, "
+                f"paid = paid {sign} {paid}, unpaid = unpaid {sign} {unpaid} WHERE {key} = {value};"
+            )
+            if sign == "-":
+                statements.append(f"DELETE FROM {table} WHERE {key} = {value} AND invoices = 0 "
+                                  f"AND total = 0 AND paid = 0 AND unpaid = 0;")
+        return "\n".join(statements)
+
+    def create_revenue_rollups(self):
+        """Create the rollup tables and their triggers; fill them if they are new"""
+        existing = {row[0] for row in self.cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN (%s)"
+            % ", ".join("?" * len(REVENUE_ROLLUPS)), tuple(REVENUE_ROLLUPS)).fetchall()}
+        for table, (key, _) in REVENUE_ROLLUPS.items():
+            self.cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    {key} TEXT PRIMARY KEY,
+                    invoices INTEGER NOT NULL DEFAULT 0,
+                    total REAL NOT NULL DEFAULT 0,
+                    paid REAL NOT NULL DEFAULT 0,
+                    unpaid REAL NOT NULL DEFAULT 0
+                ) WITHOUT ROWID
+            """)
+        self._sync_triggers(self._revenue_trigger_sql(), self.rebuild_revenue,
+                            rebuild=existing != set(REVENUE_ROLLUPS))
+
+    def _revenue_trigger_sql(self):
+        """{trigger name: CREATE TRIGGER statement} for the current rollup definitions"""
+        statements = {}
+        for name, (event, changes) in REVENUE_TRIGGERS.items():
+            body = "\n".join(self._rollup_trigger_body(row, sign) for row, sign in changes)
+            statements[name] = f"CREATE TRIGGER {name} {event} ON invoices BEGIN\n{body}\nEND"
+        return statements
+
+    def _stored_triggers(self, names):
+        return dict(self.cursor.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name IN (%s)"
+            % ", ".join("?" * len(names)), tuple(names)).fetchall())
+
+    def _sync_triggers(self, statements, rebuild_fn, rebuild=False):
+        """Bring triggers in line with `statements` ({name: CREATE TRIGGER sql}).
+
+        Opening a database that is up to date only reads sqlite_master. A
+        trigger that is missing or whose stored SQL differs is replaced, and
+        the data it keeps is rebuilt with rebuild_fn(commit=False), all under
+        BEGIN IMMEDIATE: other terminals cannot write while a trigger is
+        missing, and a second terminal opening the file at the same time
+        finds the work done when it gets the lock.
+        """
+        if not rebuild and self._stored_triggers(statements) == statements:
+            return
+        began = not self.conn.in_transaction
+        if began:
+            self.cursor.execute("BEGIN IMMEDIATE")
+        try:
+            stored = self._stored_triggers(statements)
+            replaced = [name for name, sql in statements.items() if stored.get(name) != sql]
+            for name in replaced:
+                self.cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+                self.cursor.execute(statements[name])
+            if rebuild or replaced:
+                rebuild_fn(commit=False)
+            if began:
+                self.commit()
+        except Exception:
+            self.rollback()
+            raise
+
+    def drop_indexes(self, table):
+        """For bulk loads into an empty table: drop its non-unique indexes and return
+        their CREATE INDEX statements, to run once the rows are in (one sort per
+        index instead of a B-tree insert per row). Unique indexes stay: they
+        enforce constraints."""
+        indexes = self.cursor.execute(
+            "SELECT m.name, m.sql FROM sqlite_master m JOIN pragma_index_list(?) l ON l.name = m.name "
+            "WHERE m.type = 'index' AND m.sql IS NOT NULL AND NOT l.\"unique\"", (table,)).fetchall()
+        for name, _ in indexes:
+            self.cursor.execute(f"DROP INDEX {name}")
+        return [sql for _, sql in indexes]
+
+    def drop_revenue_triggers(self):
+        """For bulk loads: per-row upkeep is slower than one rebuild_revenue() at the end.
+        create_revenue_rollups() puts the triggers back."""
+        for name in REVENUE_TRIGGERS:
+            self.cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+    def rebuild_revenue(self, commit=True):
+        """Recompute the rollups from invoices (repairs drift; run after loading with triggers off).
+
+        Raises on error (after rolling back). Returns {table: rows written}.
+        """
+        amount, paid, unpaid = self._rollup_sums("invoices")
+        counts = {}
+        try:
+            for table, (key, expression) in REVENUE_ROLLUPS.items():
+                value = expression.format(row="invoices")
+                self.cursor.execute(f"DELETE FROM {table}")
+                self.cursor.execute(
+                    f"INSERT INTO {table} ({key}, invoices, total, paid, unpaid) "
+                    f"SELECT {value}, COUNT(*), SUM({amount}), SUM({paid}), SUM({unpaid}) "
+                    f"FROM invoices WHERE {value} IS NOT NULL GROUP BY {value}"
+                )
+                counts[table] = self.cursor.rowcount
+            if commit:
+                self.commit()
+        except Exception:
+            self.rollback()
+            raise
+        log.info("Revenue rollups rebuilt", extra=counts)
+        return counts
+
+    # ===== Payments and balances =====
+    def create_balances(self):
+        """Create client_balances and the balance triggers; fill them if client_balances is new"""
+        new = self.cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'client_balances'").fetchone() is None
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS client_balances (
+                client TEXT PRIMARY KEY,
+                invoices INTEGER NOT NULL DEFAULT 0,
+                billed REAL NOT NULL DEFAULT 0,
+                paid REAL NOT NULL DEFAULT 0,
+                balance REAL NOT NULL DEFAULT 0
+            ) WITHOUT ROWID
+        """)
+        self._sync_triggers(self._balance_trigger_sql(), self.rebuild_balances, rebuild=new)
+
+    @staticmethod
+    def _balance_trigger_sql():
+        return {name: f"CREATE TRIGGER {name} {event} BEGIN\n{body.strip()}\nEND"
+                for name, (event, body) in BALANCE_TRIGGERS.items()}
+
+    def drop_balance_triggers(self):
+        """For bulk loads, like drop_revenue_triggers(); rebuild_balances() puts them back"""
+        for name in BALANCE_TRIGGERS:
+            self.cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+    def rebuild_balances(self, commit=True):
+        """Recompute paid amounts and client balances from payments (repairs drift).
+
+        Paid invoices without payments (older databases, bulk loads) first
+        get a "Settled" payment for their amount. Raises on error (after
+        rolling back). Returns {"payments": settled payments added,
+        "client_balances": rows written}.
+        """
+        counts = {}
+        if not self.conn.in_transaction:
+            # the triggers are off until the end: keep other terminals out
+            self.cursor.execute("BEGIN IMMEDIATE")
+        try:
+            self.drop_balance_triggers()
+            # only rows with payments (or a stray paid_amount) are rewritten: after
+            # a bulk load most have neither
+            self.cursor.execute(
+                "UPDATE invoices SET paid_amount = COALESCE("
+                "(SELECT SUM(amount) FROM payments WHERE invoice_id = invoices.id), 0) "
+                "WHERE paid_amount <> 0 OR id IN (SELECT invoice_id FROM payments)"
+            )
+            unsettled = ("FROM invoices i WHERE status = 'Paid' "
+                         "AND NOT EXISTS (SELECT 1 FROM payments p WHERE p.invoice_id = i.id)")
+            self.cursor.execute(f"UPDATE invoices SET paid_amount = COALESCE(amount, 0) WHERE id IN (SELECT id {unsettled})")
+            self.cursor.execute(
+                f"INSERT INTO payments (invoice_id, amount, date, method) "
+                f"SELECT id, COALESCE(amount, 0), date, 'Settled' {unsettled}"
+            )
+            counts["payments"] = self.cursor.rowcount
+            self.cursor.execute("DELETE FROM client_balances")
+            self.cursor.execute(
+                "INSERT INTO client_balances (client, invoices, billed, paid, balance) "
+                "SELECT client, COUNT(*), SUM(COALESCE(amount, 0)), SUM(paid_amount), "
+                "SUM(COALESCE(amount, 0) - paid_amount) FROM invoices WHERE client IS NOT NULL GROUP BY client"
+            )
+            counts["client_balances"] = self.cursor.rowcount
+            for statement in self._balance_trigger_sql().values():
+                self.cursor.execute(statement)
+            self.changed("invoices")
+            if commit:
+                self.commit()
+        except Exception:
+            self.rollback()
+            raise
+        log.info("Balances rebuilt", extra=counts)
+        return counts
+
+    def insert_payment(self, invoice_id, amount, date, method="", notes=""):
+        """Record a payment; the triggers update the invoice and client balances. Returns the payment id."""
+        try:
+            self.cursor.execute(
+                "INSERT INTO payments (invoice_id, amount, date, method, notes) VALUES (?, ?, ?, ?, ?)",
+                (invoice_id, amount, date, method, notes)
+            )
+            payment_id = self.cursor.lastrowid
+            self.changed("invoices", (invoice_id,))
+            self.commit()
+            return payment_id
         except Exception as e:
-            print(f"Error creating tables: {e}")
+            log.exception("Error inserting payment: %s", e, extra={"table": "payments", "row_id": invoice_id})
+            return None
+
+    def fetch_payments(self, invoice_id):
+        """(id, amount, date, method, notes) of an invoice's payments, oldest first"""
+        try:
+            self.cursor.execute(
+                "SELECT id, amount, date, method, notes FROM payments WHERE invoice_id=? ORDER BY date, id",
+                (invoice_id,)
+            )
+            return self.cursor.fetchall()
+        except Exception as e:
+            log.exception("Error fetching payments: %s", e, extra={"table": "payments", "row_id": invoice_id})
+            return []
+
+    def fetch_client_balance(self, client):
+        """(invoices, billed, paid, balance) for a client from client_balances; zeros if none"""
+        try:
+            self.cursor.execute("SELECT invoices, billed, paid, balance FROM client_balances WHERE client=?",
+                                (client,))
+            return self.cursor.fetchone() or (0, 0.0, 0.0, 0.0)
+        except Exception as e:
+            log.exception("Error fetching client balance: %s", e, extra={"table": "client_balances", "client": client})
+            return (0, 0.0, 0.0, 0.0)
+
+    def fetch_revenue(self, period="daily", start=None, end=None):
+        """Rollup rows (day or month, invoices, total, paid, unpaid) between start and end, inclusive.
+
+        period is "daily" (start/end as YYYY-MM-DD) or "monthly" (YYYY-MM).
+        """
+        table = f"{period}_revenue"
+        key = REVENUE_ROLLUPS[table][0]
+        clauses, params = [], []
+        if start:
+            clauses.append(f"{key} >= ?")
+            params.append(start)
+        if end:
+            clauses.append(f"{key} <= ?")
+            params.append(end)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        try:
+            self.cursor.execute(f"SELECT {key}, invoices, total, paid, unpaid FROM {table}{where} ORDER BY {key}",
+                                params)
+            return self.cursor.fetchall()
+        except Exception as e:
+            log.exception("Error fetching revenue: %s", e, extra={"table": table})
+            return []
+
+    def bulk_insert(self, table, columns, rows, commit=True, rollback=True):
+        """Insert many rows with executemany in a single transaction.
+
+        Unlike the single-row insert_* methods this raises on error (after
+        rolling back) so bulk callers can find and reject the bad rows.
+        Pass commit=False to group several tables into one transaction, and
+        rollback=False when the caller undoes a failure itself (ROLLBACK TO
+        a savepoint) rather than lose the whole transaction.
+        """
+        query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['?'] * len(columns))})"
+        try:
+            self.cursor.executemany(query, rows)
+            self.changed(table, ())
+            if commit:
+                self.commit()
+        except Exception:
+            if rollback:
+                self.rollback()
+            raise
+        if table == "invoices":
+            INVOICES_CREATED.inc(len(rows))
+        return len(rows)
+
+    # ===== Paged lists (sorting / filtering done by SQLite) =====
+    @staticmethod
+    def filter_clause(column, text):
+        """SQL condition and parameter for one filter box.
+
+        Text starting with an operator (>=, <=, <>, !=, >, <, =) compares the
+        column with the rest, e.g. ">100" on amount or "=Paid" on status;
+        anything else on a text column is a case-insensitive "contains" match.
+        Raises ValueError for a non-numeric value on a numeric column.
+        """
+        text = text.strip()
+        for op in FILTER_OPERATORS:
+            if text.startswith(op):
+                value = text[len(op):].strip()
+                break
+        else:
+            op, value = None, text
+
+        if column in NUMERIC_COLUMNS:
+            try:
+                value = float(value)
+            except ValueError:
+                raise ValueError(f"'{text}' is not a number")
+            return f"{column} {op or '='} ?", value
+        if op:
+            return f"{column} {op} ?", value
+        value = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return f"{column} LIKE ? ESCAPE '\\'", f"%{value}%"
+
+    def _list_where(self, table, filters):
+        columns = LIST_COLUMNS[table]
+        conditions, params = [], []
+        for column, text in (filters or {}).items():
+            if column not in columns:
+                raise ValueError(f"Unknown column {column!r} for {table}")
+            if text is None or not str(text).strip():
+                continue
+            condition, param = self.filter_clause(column, str(text))
+            conditions.append(condition)
+            params.append(param)
+        return (" WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+    def fetch_page(self, table, sort="id", descending=False, filters=None, limit=200, offset=0):
+        """One page of LIST_COLUMNS[table], sorted and filtered in SQL.
+
+        `filters` maps column -> filter text (see filter_clause). Ties on the
+        sort column are broken by id (after SORT_TIES) so pages never overlap.
+        """
+        if sort not in SORT_COLUMNS[table]:
+            raise ValueError(f"Cannot sort {table} by {sort!r}")
+        where, params = self._list_where(table, filters)
+        direction = "DESC" if descending else "ASC"
+        keys = [sort] if sort == "id" else [sort, SORT_TIES.get((table, sort)), "id"]
+        order = ", ".join(f"{key} {direction}" for key in keys if key)
+        try:
+            self.cursor.execute(
+                f"SELECT {', '.join(LIST_COLUMNS[table])} FROM {table}{where} ORDER BY {order} LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            )
+            return self.cursor.fetchall()
+        except Exception as e:
+            log.exception("Error fetching %s page: %s", table, e, extra={"table": table})
+            return []
+
+    def count_rows(self, table, filters=None):
+        """Number of rows fetch_page can page through with these filters"""
+        where, params = self._list_where(table, filters)
+        try:
+            self.cursor.execute(f"SELECT COUNT(*) FROM {table}{where}", params)
+            return self.cursor.fetchone()[0]
+        except Exception as e:
+            log.exception("Error counting %s: %s", table, e, extra={"table": table})
+            return 0
 
     # Fetch clients for Dashboard
     def fetch_clients(self, keyword=""):
@@ -126,7 +795,7 @@ class Database:
             rows = self.cursor.fetchall()
             return rows
         except Exception as e:
-            print(f"Error fetching walk-ins: {e}")
+            log.exception("Error fetching walk-ins: %s", e, extra={"table": "walkins"})
             return []
 
     def insert_walkin(self, data):
@@ -136,9 +805,10 @@ class Database:
                 "INSERT INTO walkins (client_name, contact, address, pet_name, species, breed, age, reason, date) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
                 data
             )
-            self.conn.commit()
+            self.changed("walkins", ())
+            self.commit()
         except Exception as e:
-            print(f"Error inserting walk-in: {e}")
+            log.exception("Error inserting walk-in: %s", e, extra={"table": "walkins"})
 
     def fetch_animals(self):
         """Fetch all animals from the database"""
@@ -147,7 +817,7 @@ class Database:
             rows = self.cursor.fetchall()
             return rows
         except Exception as e:
-            print(f"Error fetching animals: {e}")
+            log.exception("Error fetching animals: %s", e, extra={"table": "animals"})
             return []
 
     def insert_animal(self, data):
@@ -157,17 +827,19 @@ class Database:
                 "INSERT INTO animals (pet_name, species, breed, age, owner_name) VALUES (?, ?, ?, ?, ?)",
                 data
             )
-            self.conn.commit()
+            self.changed("animals", ())
+            self.commit()
         except Exception as e:
-            print(f"Error inserting animal: {e}")
+            log.exception("Error inserting animal: %s", e, extra={"table": "animals"})
 
     def delete_animal(self, animal_id):
         """Delete an animal from the database"""
         try:
             self.cursor.execute("DELETE FROM animals WHERE id=?", (animal_id,))
-            self.conn.commit()
+            self.changed("animals", (animal_id,))
+            self.commit()
         except Exception as e:
-            print(f"Error deleting animal: {e}")
+            log.exception("Error deleting animal: %s", e, extra={"table": "animals", "row_id": animal_id})
 
     def fetch_appointments(self):
         """Fetch all appointments from the database"""
@@ -176,7 +848,7 @@ class Database:
             rows = self.cursor.fetchall()
             return rows
         except Exception as e:
-            print(f"Error fetching appointments: {e}")
+            log.exception("Error fetching appointments: %s", e, extra={"table": "appointments"})
             return []
 
     def insert_appointment(self, data):
@@ -186,26 +858,28 @@ class Database:
                 "INSERT INTO appointments (client_name, pet_name, date, time, reason) VALUES (?, ?, ?, ?, ?)",
                 data
             )
-            self.conn.commit()
+            self.changed("appointments", ())
+            self.commit()
         except Exception as e:
-            print(f"Error inserting appointment: {e}")
+            log.exception("Error inserting appointment: %s", e, extra={"table": "appointments"})
 
     def delete_appointment(self, appointment_id):
         """Delete an appointment from the database"""
         try:
             self.cursor.execute("DELETE FROM appointments WHERE id=?", (appointment_id,))
-            self.conn.commit()
+            self.changed("appointments", (appointment_id,))
+            self.commit()
         except Exception as e:
-            print(f"Error deleting appointment: {e}")
+            log.exception("Error deleting appointment: %s", e, extra={"table": "appointments", "row_id": appointment_id})
 
     def fetch_invoices(self):
         """Fetch all invoices from the database"""
         try:
-            self.cursor.execute("SELECT id, invoice_no, client, pet, amount, date, status FROM invoices ORDER BY date DESC")
+            self.cursor.execute("SELECT id, invoice_no, client, pet, amount, date, status, paid_amount FROM invoices ORDER BY date DESC")
             rows = self.cursor.fetchall()
             return rows
         except Exception as e:
-            print(f"Error fetching invoices: {e}")
+            log.exception("Error fetching invoices: %s", e, extra={"table": "invoices"})
             return []
 
     def insert_invoice(self, data):
@@ -216,33 +890,76 @@ class Database:
                 "INSERT INTO invoices (invoice_no, client, pet, amount, date, status) VALUES (?, ?, ?, ?, ?, ?)",
                 data
             )
-            self.conn.commit()
+            self.changed("invoices", ())
+            self.commit()
+            INVOICES_CREATED.inc()
         except Exception as e:
-            print(f"Error inserting invoice: {e}")
+            log.exception("Error inserting invoice: %s", e, extra={"table": "invoices"})
+
+    def create_invoice(self, client, pet, amount, date, status="Unpaid"):
+        """Insert an invoice under a newly allocated number; returns (id, invoice_no).
+
+        Allocation, insert and commit succeed or fail together: on any error
+        (a lock, a constraint) everything is rolled back and the error is
+        raised, so no number is handed out for a missing invoice and the
+        write lock is never left held.
+        """
+        try:
+            invoice_no = self.allocate_invoice_nos(date)[0]
+            self.cursor.execute(
+                "INSERT INTO invoices (invoice_no, client, pet, amount, date, status) VALUES (?, ?, ?, ?, ?, ?)",
+                (invoice_no, client, pet, amount, date, status)
+            )
+            invoice_id = self.cursor.lastrowid
+            self.changed("invoices", ())
+            self.commit()
+        except Exception:
+            self.rollback()
+            raise
+        INVOICES_CREATED.inc()
+        return invoice_id, invoice_no
 
     def update_invoice_amount(self, invoice_id, new_amount):
         """Update invoice amount"""
         try:
-            self.cursor.execute("UPDATE invoices SET amount=? WHERE id=?", (new_amount, invoice_id))
-            self.conn.commit()
+            # a settled invoice whose amount goes up is owed again (and vice versa)
+            self.cursor.execute(
+                "UPDATE invoices SET amount=:amount, "
+                "status=CASE WHEN :amount - paid_amount <= :tolerance THEN 'Paid' ELSE 'Unpaid' END WHERE id=:id",
+                {"amount": new_amount, "tolerance": SETTLED_TOLERANCE, "id": invoice_id})
+            self.changed("invoices", (invoice_id,))
+            self.commit()
         except Exception as e:
-            print(f"Error updating invoice: {e}")
+            log.exception("Error updating invoice: %s", e, extra={"table": "invoices", "row_id": invoice_id})
 
     def update_invoice_status(self, invoice_id, status):
         """Update invoice status (Paid/Unpaid)"""
         try:
             self.cursor.execute("UPDATE invoices SET status=? WHERE id=?", (status, invoice_id))
-            self.conn.commit()
+            self.changed("invoices", (invoice_id,))
+            self.commit()
         except Exception as e:
-            print(f"Error updating invoice status: {e}")
+            log.exception("Error updating invoice status: %s", e, extra={"table": "invoices", "row_id": invoice_id})
 
     def fetch_invoice_by_id(self, invoice_id):
         """Fetch single invoice by ID"""
         try:
-            self.cursor.execute("SELECT id, invoice_no, client, pet, amount, date, status FROM invoices WHERE id=?", (invoice_id,))
+            self.cursor.execute("SELECT id, invoice_no, client, pet, amount, date, status, paid_amount FROM invoices WHERE id=?", (invoice_id,))
             return self.cursor.fetchone()
         except Exception as e:
-            print(f"Error fetching invoice: {e}")
+            log.exception("Error fetching invoice: %s", e, extra={"table": "invoices", "row_id": invoice_id})
+            return None
+
+    def fetch_latest_invoice_for_client(self, client):
+        """Fetch the client's most recent invoice (same order as fetch_invoices)"""
+        try:
+            self.cursor.execute(
+                "SELECT id, invoice_no, client, pet, amount, date, status, paid_amount FROM invoices WHERE client=? ORDER BY date DESC LIMIT 1",
+                (client,)
+            )
+            return self.cursor.fetchone()
+        except Exception as e:
+            log.exception("Error fetching latest invoice: %s", e, extra={"table": "invoices", "client": client})
             return None
 
     def insert_treatment_with_type(self, data):
@@ -253,10 +970,11 @@ class Database:
                 "INSERT INTO treatments (reason, pet, client, treatment_type, date, confined, notes) VALUES (?, ?, ?, ?, ?, ?, ?)",
                 data
             )
-            self.conn.commit()
-            print(f"✅ Treatment added: {data}")
+            self.changed("treatments", ())
+            self.commit()
+            log.debug("Treatment added", extra={"table": "treatments", "row_id": self.cursor.lastrowid})
         except Exception as e:
-            print(f"Error inserting treatment: {e}")
+            log.exception("Error inserting treatment: %s", e, extra={"table": "treatments"})
 
     def fetch_treatments(self):
         """Fetch all treatments from the database"""
@@ -265,9 +983,53 @@ class Database:
             rows = self.cursor.fetchall()
             return rows
         except Exception as e:
-            print(f"Error fetching treatments: {e}")
+            log.exception("Error fetching treatments: %s", e, extra={"table": "treatments"})
             return []
 
+    def count_treatment_types(self, client, pet=None):
+        """Count treatments per treatment_type for a client (and optionally one pet)"""
+        try:
+            if pet is None:
+                self.cursor.execute(
+                    "SELECT treatment_type, COUNT(*) FROM treatments WHERE client=? GROUP BY treatment_type",
+                    (client,)
+                )
+            else:
+                self.cursor.execute(
+                    "SELECT treatment_type, COUNT(*) FROM treatments WHERE client=? AND pet=? GROUP BY treatment_type",
+                    (client, pet)
+                )
+            return self.cursor.fetchall()
+        except Exception as e:
+            log.exception("Error counting treatments: %s", e, extra={"table": "treatments", "client": client})
+            return []
+
+    def count_treatment_types_for(self, pets):
+        """count_treatment_types for many pets at once: {(client, pet): [(treatment_type, count)]}.
+
+        `pets` is a list of (client, pet). One grouped query per PETS_PER_QUERY
+        pets (a VALUES list joined to idx_treatments_client), instead of a
+        query per pet. Pets without treatments are missing from the result.
+        The index is named because, for a long list, the planner would
+        rather build an automatic index over the whole treatments table.
+        Unlike count_treatment_types this raises on error: it prices
+        discharges, and an empty result would bill every pet $0.
+        """
+        counts = {}
+        for start in range(0, len(pets), PETS_PER_QUERY):
+            chunk = pets[start:start + PETS_PER_QUERY]
+            self.cursor.execute(
+                f"WITH wanted (client, pet) AS (VALUES {', '.join(['(?, ?)'] * len(chunk))}) "
+                "SELECT t.client, t.pet, t.treatment_type, COUNT(*) "
+                "FROM wanted w JOIN treatments t INDEXED BY idx_treatments_client "
+                "ON t.client = w.client AND t.pet = w.pet "
+                "GROUP BY t.client, t.pet, t.treatment_type",
+                [value for pair in chunk for value in pair]
+            )
+            for client, pet, treatment_type, count in self.cursor.fetchall():
+                counts.setdefault((client, pet), []).append((treatment_type, count))
+        return counts
+
     def insert_client(self, data):
         """Insert a new client into the database"""
         try:
@@ -275,9 +1037,10 @@ class Database:
                 "INSERT INTO clients (name, contact, address) VALUES (?, ?, ?)",
                 data
             )
-            self.conn.commit()
+            self.changed("clients", ())
+            self.commit()
         except Exception as e:
-            print(f"Error inserting client: {e}")
+            log.exception("Error inserting client: %s", e, extra={"table": "clients"})
 
     def insert_pet_status(self, data):
         """Insert pet status record"""
@@ -287,9 +1050,10 @@ class Database:
                 "INSERT INTO pet_status (pet, client, status, date, notes) VALUES (?, ?, ?, ?, ?)",
                 data
             )
-            self.conn.commit()
+            self.changed("pet_status", ())
+            self.commit()
         except Exception as e:
-            print(f"Error inserting pet status: {e}")
+            log.exception("Error inserting pet status: %s", e, extra={"table": "pet_status"})
 
     def fetch_pet_status(self):
         """Fetch all pet status records"""
@@ -298,6 +1062,23 @@ class Database:
             rows = self.cursor.fetchall()
             return rows
         except Exception as e:
-            print(f"Error fetching pet status: {e}")
+            log.exception("Error fetching pet status: %s", e, extra={"table": "pet_status"})
+            return []
+
+    def fetch_confined_pets(self):
+        """Pets confined and not discharged since: [(client, pet, admitted date)], oldest first"""
+        try:
+            self.cursor.execute("""
+                SELECT c.client, c.pet, MIN(c.date)
+                FROM pet_status c
+                WHERE c.status = 'Confined' AND NOT EXISTS (
+                    SELECT 1 FROM pet_status d
+                    WHERE d.client = c.client AND d.pet = c.pet AND d.status = 'Discharged' AND d.id > c.id)
+                GROUP BY c.client, c.pet
+                ORDER BY MIN(c.date), c.client, c.pet
+            """)
+            return self.cursor.fetchall()
+        except Exception as e:
+            log.exception("Error fetching confined pets: %s", e, extra={"table": "pet_status"})
             return []
 
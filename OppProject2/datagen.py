@@ -0,0 +1,431 @@
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from database import Database
+from querystats import QUERY_STATS
+from services import TREATMENT_COSTS
+
+# Seeded synthetic clinic data for load tests, benchmarks and query-plan
+# checks. The same seed and options always produce the same rows.
+#
+# Clients get 1-4 pets. Visits are generated day by day over the date range
+# with seasonal and weekday volume, and each visit picks a pet weighted by
+# its owner's loyalty (Pareto distributed), so a few clients come back very
+# often and most rarely. A visit becomes an appointment (some also a walk-in
+# row), then a treatment and an invoice; some treatments confine the pet for
+# a few days (Confined / Daily Treatment / Discharged status rows plus a
+# discharge invoice). Recent invoices are more often unpaid. Stays running
+# past the end date leave the pet confined, and --future-days adds booked
+# appointments with nothing else yet.
+#
+# Run from the OppProject2 folder: "python -m cli generate big.db --clients 100000"
+
+FIRST_NAMES = (
+    "Maria", "Jose", "Juan", "Ana", "Mark", "John", "Michael", "Angel", "Christian", "Joshua",
+    "Daniel", "Gabriel", "Paolo", "Carlo", "Miguel", "Rafael", "Andrea", "Patricia", "Kristine", "Camille",
+    "Nicole", "Jasmine", "Bea", "Sofia", "Isabel", "Carmen", "Rosa", "Liza", "Grace", "Joy",
+    "Edrian", "Girbaud", "Zaijan", "Ramon", "Antonio", "Francis", "Kevin", "Ryan", "James", "Paul",
+    "Aileen", "Cristina", "Diana", "Elena", "Fe", "Gina", "Hazel", "Irene", "Janet", "Karen",
+    "Leo", "Manuel", "Nestor", "Oscar", "Pedro", "Quinn", "Rey", "Samuel", "Tomas", "Victor",
+)
+LAST_NAMES = (
+    "Santos", "Reyes", "Cruz", "Bautista", "Ocampo", "Garcia", "Mendoza", "Torres", "Tomas", "Andrada",
+    "Castillo", "Flores", "Villanueva", "Ramos", "Castro", "Rivera", "Aquino", "Navarro", "Salazar", "Mercado",
+    "Aguilar", "Dela Cruz", "De Leon", "Gonzales", "Lopez", "Fernandez", "Morales", "Domingo", "Pascual", "Soriano",
+    "Valdez", "Manalo", "Panganiban", "Dizon", "Lim", "Tan", "Sy", "Go", "Chua", "Co",
+    "Magbanua", "Macaraeg", "Robles", "Serrano", "Padilla", "Samonte", "Ilagan", "Umali", "Perez", "Marquez",
+)
+TOWNS = (
+    "Calatagan", "Sta Ana", "Tanagan", "Balayan", "Lian", "Nasugbu", "Tuy", "Batangas City",
+    "Lemery", "Taal", "San Luis", "Calaca", "Bauan", "Lipa", "Tanauan", "Rosario",
+)
+PET_NAMES = (
+    "Max", "Bella", "Luna", "Charlie", "Milo", "Coco", "Rocky", "Daisy", "Lucy", "Buddy",
+    "Bantay", "Brownie", "Choco", "Snow", "Tiger", "Kitty", "Mingming", "Oreo", "Peanut", "Shadow",
+    "Simba", "Nala", "Loki", "Thor", "Zeus", "Ginger", "Pepper", "Mocha", "Cookie", "Biscuit",
+    "Doggy", "Zero", "Blackie", "Whitey", "Princess", "Lucky", "Happy", "Sunny", "Bruno", "Cleo",
+)
+
+# species -> (weight, breeds); the breed lists follow the walk-in form
+SPECIES = {
+    "Dog": (52, ("Labrador Retriever", "German Shepherd", "Golden Retriever", "Bulldog", "Beagle",
+                 "Poodle", "Rottweiler", "Shih Tzu", "Aspin", "Mixed")),
+    "Cat": (33, ("Domestic Shorthair", "Domestic Longhair", "Persian", "Maine Coon", "Siamese",
+                 "Ragdoll", "Bengal", "Puspin", "Mixed")),
+    "Bird": (5, ("Parakeet", "Cockatiel", "Lovebird", "Canary", "Finch", "Parrot")),
+    "Small Mammal": (5, ("Rabbit", "Guinea Pig", "Hamster", "Ferret", "Chinchilla")),
+    "Reptile": (3, ("Bearded Dragon", "Leopard Gecko", "Corn Snake", "Ball Python")),
+    "Fish": (2, ("Goldfish", "Betta", "Guppy", "Tetra")),
+}
+
+# visit reason -> (weight, treatment type billed)
+REASONS = {
+    "Checkup": (30, "Checkup"),
+    "Vaccination": (22, "Vaccination"),
+    "Grooming": (9, "Grooming"),
+    "Illness": (8, "Medication"),
+    "Medication": (5, "Medication"),
+    "Dental Cleaning": (4, "Dental Cleaning"),
+    "Blood Test": (4, "Blood Test"),
+    "Injury": (4, "Wound Care"),
+    "Wound Care": (3, "Wound Care"),
+    "X-Ray": (3, "X-Ray"),
+    "Surgery": (2.5, "Surgery"),
+    "Post-Surgery Follow-up": (2, "Checkup"),
+    "Emergency": (1.5, "Wound Care"),
+    "Physical Therapy": (1, "Physical Therapy"),
+    "Behavioral Consultation": (0.5, "Checkup"),
+    "Nutrition Consultation": (0.5, "Checkup"),
+}
+
+# chance that a visit for this reason ends in confinement
+CONFINE_RATE = {"Surgery": 0.6, "Emergency": 0.3, "Injury": 0.1, "Illness": 0.05}
+DEFAULT_CONFINE_RATE = 0.005
+DAILY_CONFINEMENT_COST = 40
+
+# visit volume by month (Jan..Dec) and weekday (Mon..Sun)
+SEASON = (0.85, 0.85, 1.0, 1.1, 1.15, 1.2, 1.15, 1.1, 1.0, 0.95, 0.95, 1.05)
+WEEKDAY = (1.15, 1.05, 1.0, 1.05, 1.2, 0.9, 0.45)
+
+TIME_SLOTS = tuple(f"{hour:02d}:{minute:02d}" for hour in range(8, 17) for minute in (0, 30))
+WALKIN_RATE = 0.35
+NO_SHOW_RATE = 0.08
+
+# rows buffered per table before an executemany
+BATCH_SIZE = 50000
+
+
+# ===== Shared pieces =====
+class _Picker:
+    """Fast repeated weighted choice over a {key: (weight, ...)} table"""
+
+    def __init__(self, rnd, table):
+        self.rnd = rnd
+        self.keys = list(table)
+        total = 0
+        self.cum = []
+        for key in self.keys:
+            total += table[key][0]
+            self.cum.append(total)
+
+    def __call__(self, k=1):
+        return self.rnd.choices(self.keys, cum_weights=self.cum, k=k)
+
+
+def make_clients(rnd, count):
+    """[(name, contact, address)], plus each client's loyalty weight"""
+    clients, loyalty = [], []
+    for _ in range(count):
+        name = f"{rnd.choice(FIRST_NAMES)} {rnd.choice('ABCDEFGHIJKLMNOPRSTV')}. {rnd.choice(LAST_NAMES)}"
+        contact = f"09{rnd.randrange(10 ** 9):09d}"
+        clients.append((name, contact, rnd.choice(TOWNS)))
+        loyalty.append(min(rnd.paretovariate(1.6), 40.0))
+    return clients, loyalty
+
+
+def make_pets(rnd, clients, loyalty):
+    """[(pet name, species, breed, age, owner index)] and cumulative visit weights per pet"""
+    species = _Picker(rnd, SPECIES)
+    pets, cum, total = [], [], 0.0
+    for owner, weight in enumerate(loyalty):
+        count = rnd.choices((1, 2, 3, 4), weights=(60, 25, 10, 5))[0]
+        for kind in species(count):
+            pets.append((rnd.choice(PET_NAMES), kind, rnd.choice(SPECIES[kind][1]),
+                         int(rnd.triangular(0, 16, 3)), owner))
+            total += weight
+            cum.append(total)
+    return pets, cum
+
+
+def visit_days(start, end, visits):
+    """(day, expected visits) for every day, shaped by SEASON and WEEKDAY"""
+    days = [start + timedelta(n) for n in range((end - start).days + 1)]
+    weights = [SEASON[d.month - 1] * WEEKDAY[d.weekday()] for d in days]
+    scale = visits / sum(weights)
+    return [(d, w * scale) for d, w in zip(days, weights)]
+
+
+def _visits_on(rnd, expected):
+    """Visit count for one day: expected +-20% noise, rounded at random"""
+    value = expected * rnd.uniform(0.8, 1.2)
+    count = int(value)
+    return count + (1 if rnd.random() < value - count else 0)
+
+
+class _Writer:
+    """Buffers rows per table and bulk inserts them in BATCH_SIZE batches"""
+
+    def __init__(self, insert):
+        self.insert = insert  # insert(table, columns, rows)
+        self.buffers = {}
+        self.counts = {}
+
+    def add(self, table, columns, row):
+        buffer = self.buffers.get(table)
+        if buffer is None:
+            buffer = self.buffers[table] = (columns, [])
+        buffer[1].append(row)
+        if len(buffer[1]) >= BATCH_SIZE:
+            self.flush(table)
+
+    def flush(self, table=None):
+        for name in ([table] if table else list(self.buffers)):
+            columns, rows = self.buffers[name]
+            if rows:
+                self.insert(name, columns, rows)
+                self.counts[name] = self.counts.get(name, 0) + len(rows)
+                self.buffers[name] = (columns, [])
+
+
+def _prepare(conn):
+    # one connection, one transaction, no fsyncs: a crash leaves a file to delete
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA cache_size=-262144")  # 256 MB for the index B-trees
+
+
+# ===== OppProject2 schema =====
+INVOICE_COLUMNS = ("invoice_no", "client", "pet", "amount", "date", "status")
+TREATMENT_COLUMNS = ("reason", "pet", "client", "treatment_type", "date", "confined", "notes")
+STATUS_COLUMNS = ("pet", "client", "status", "date", "notes")
+WALKIN_COLUMNS = ("client_name", "contact", "address", "pet_name", "species", "breed", "age", "reason", "date")
+
+
+def _unpaid_rate(age_days):
+    if age_days > 90:
+        return 0.02
+    if age_days > 30:
+        return 0.1
+    return 0.35
+
+
+def generate_clinic(db, clients=10000, visits_per_client=5.0, start=None, end=None,
+                    future_days=14, seed=1):
+    """Fill an OppProject2 Database; returns {table: rows inserted}"""
+    rnd = random.Random(seed)
+    end = end or date.today()
+    start = start or end - timedelta(days=730)
+    _prepare(db.conn)
+    # the rollups and balances are rebuilt once at the end
+    db.drop_revenue_triggers()
+    db.drop_balance_triggers()
+
+    writer = _Writer(lambda table, columns, rows: db.bulk_insert(table, columns, rows, commit=False))
+    client_rows, loyalty = make_clients(rnd, clients)
+    for row in client_rows:
+        writer.add("clients", ("name", "contact", "address"), row)
+    pets, cum = make_pets(rnd, client_rows, loyalty)
+    for pet_name, species, breed, age, owner in pets:
+        writer.add("animals", ("pet_name", "species", "breed", "age", "owner_name"),
+                   (pet_name, species, breed, age, client_rows[owner][0]))
+    writer.flush()
+
+    reasons = _Picker(rnd, REASONS)
+    pending_status = {}  # day -> [pet_status rows] for stays in progress
+    invoice_seq = {}
+
+    def invoice_no(day):
+        key = day.strftime("%Y%m%d")
+        invoice_seq[key] = invoice_seq.get(key, 0) + 1
+        return f"INV-{key}-{invoice_seq[key]:04d}"
+
+    days = visit_days(start, end + timedelta(days=future_days), clients * visits_per_client)
+    for day, expected in days:
+        today = day.isoformat()
+        age_days = (end - day).days
+        for row in pending_status.pop(day, ()):
+            writer.add("pet_status", STATUS_COLUMNS, row[:5])
+            if row[2] == "Discharged":
+                writer.add("invoices", INVOICE_COLUMNS, (invoice_no(day), row[1], row[0], row[5], today,
+                                                         "Unpaid" if rnd.random() < _unpaid_rate(age_days) else "Paid"))
+        count = _visits_on(rnd, expected)
+        if not count:
+            continue
+        for index, reason in zip(rnd.choices(range(len(pets)), cum_weights=cum, k=count), reasons(count)):
+            pet_name, species, breed, age, owner = pets[index]
+            client, contact, address = client_rows[owner]
+            slot = rnd.choice(TIME_SLOTS)
+            writer.add("appointments", ("client_name", "pet_name", "date", "time", "reason"),
+                       (client, pet_name, today, slot, reason))
+            if age_days < 0:
+                continue  # booked, not happened yet
+            if rnd.random() < WALKIN_RATE:
+                writer.add("walkins", WALKIN_COLUMNS,
+                           (client, contact, address, pet_name, species, breed, age, reason, today))
+            if rnd.random() < NO_SHOW_RATE:
+                continue
+
+            treatment_type = REASONS[reason][1]
+            confined = rnd.random() < CONFINE_RATE.get(reason, DEFAULT_CONFINE_RATE)
+            writer.add("treatments", TREATMENT_COLUMNS,
+                       (reason, pet_name, client, treatment_type, today, "Yes" if confined else "No",
+                        "Confined for observation" if confined else "Initial assessment"))
+            amount = TREATMENT_COSTS[treatment_type]
+            if rnd.random() < 0.2:
+                amount += rnd.choice((15, 25, 40, 60))  # medicines / supplies
+            writer.add("invoices", INVOICE_COLUMNS, (invoice_no(day), client, pet_name, float(amount), today,
+                                                     "Unpaid" if rnd.random() < _unpaid_rate(age_days) else "Paid"))
+
+            if confined:
+                stay = min(1 + int(rnd.expovariate(0.45)), 14)
+                writer.add("pet_status", STATUS_COLUMNS, (pet_name, client, "Confined", today, f"Admitted: {reason}"))
+                for n in range(1, stay + 1):
+                    later = day + timedelta(n)
+                    status = "Discharged" if n == stay else "Daily Treatment"
+                    if later > end:
+                        break  # still confined at the end date
+                    pending_status.setdefault(later, []).append(
+                        (pet_name, client, status, later.isoformat(), f"Day {n}", float(stay * DAILY_CONFINEMENT_COST)))
+    writer.flush()
+    db.rebuild_balances(commit=False)  # paid invoices get their "Settled" payment
+    db.create_revenue_rollups()  # puts the triggers back and rebuilds the rollups from paid_amount
+    db.commit()
+    return writer.counts
+
+
+# ===== vetclinic.py schema =====
+VET_SPECIALIZATIONS = ("General Practice", "Surgery", "Dentistry", "Dermatology", "Internal Medicine",
+                       "Exotic Animals", "Emergency Care")
+DIAGNOSES = {
+    "Checkup": "Healthy", "Vaccination": "Vaccinated", "Grooming": "Groomed", "Illness": "Gastroenteritis",
+    "Medication": "Ongoing medication", "Dental Cleaning": "Dental tartar", "Blood Test": "Bloodwork done",
+    "Injury": "Laceration", "Wound Care": "Healing wound", "X-Ray": "Imaging done", "Surgery": "Post-operative",
+    "Post-Surgery Follow-up": "Recovering", "Emergency": "Stabilized", "Physical Therapy": "Improving mobility",
+    "Behavioral Consultation": "Anxiety", "Nutrition Consultation": "Overweight",
+}
+
+
+def vetclinic_module():
+    """The standalone vetclinic.py from the repository root (imported lazily: it pulls in tkinter)"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if root not in sys.path:
+        sys.path.insert(0, root)
+    import vetclinic
+    return vetclinic
+
+
+def generate_vetclinic(path, clients=10000, visits_per_client=5.0, start=None, end=None,
+                       future_days=14, seed=1):
+    """Fill a (new, empty) vetclinic.py database; returns {table: rows inserted}"""
+    rnd = random.Random(seed)
+    end = end or date.today()
+    start = start or end - timedelta(days=730)
+    vdb = vetclinic_module().Database(path)
+    conn = vdb.conn
+    conn.execute("PRAGMA foreign_keys = OFF")  # ids below are consistent by construction
+    _prepare(conn)
+
+    def insert(table, columns, rows):
+        conn.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['?'] * len(columns))})",
+                         rows)
+
+    writer = _Writer(insert)
+    vets = max(3, min(50, clients // 2000))
+    for n in range(vets):
+        writer.add("Veterinarian", ("name", "specialization", "contactNo"),
+                   (f"Dr. {rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}",
+                    VET_SPECIALIZATIONS[n % len(VET_SPECIALIZATIONS)], f"09{rnd.randrange(10 ** 9):09d}"))
+    treatment_ids = {}
+    for n, (name, cost) in enumerate(TREATMENT_COSTS.items(), 1):
+        writer.add("Treatment", ("treatmentName", "description", "cost"), (name, f"{name} service", cost))
+        treatment_ids[name] = n
+
+    client_rows, loyalty = make_clients(rnd, clients)
+    for name, contact, address in client_rows:
+        writer.add("Client", ("name", "address", "contactNo"), (name, address, contact))
+    pets, cum = make_pets(rnd, client_rows, loyalty)
+    for pet_name, species, breed, age, owner in pets:
+        born = end - timedelta(days=age * 365 + rnd.randrange(365))
+        writer.add("Pet", ("name", "species", "breed", "gender", "birthDate", "ownerID"),
+                   (pet_name, species, breed, rnd.choice(("Male", "Female")), born.isoformat(), owner + 1))
+    writer.flush()
+
+    reasons = _Picker(rnd, REASONS)
+    record_id = 0
+    treatment_names = list(TREATMENT_COSTS)
+    days = visit_days(start, end + timedelta(days=future_days), clients * visits_per_client)
+    for day, expected in days:
+        today = day.isoformat()
+        count = _visits_on(rnd, expected)
+        if not count:
+            continue
+        for index, reason in zip(rnd.choices(range(len(pets)), cum_weights=cum, k=count), reasons(count)):
+            if day > end:
+                status = "scheduled"
+            else:
+                status = "cancelled" if rnd.random() < NO_SHOW_RATE else "completed"
+            writer.add("Appointment", ("petID", "vetID", "date", "time", "status", "reason"),
+                       (index + 1, rnd.randrange(vets) + 1, today, rnd.choice(TIME_SLOTS), status, reason))
+            if status != "completed":
+                continue
+            record_id += 1
+            writer.add("MedicalRecord", ("petID", "visitDate", "diagnosis", "notes"),
+                       (index + 1, today, DIAGNOSES[reason], f"{reason} visit"))
+            billed = {REASONS[reason][1]}
+            if rnd.random() < 0.3:
+                billed.add(rnd.choice(treatment_names))
+            for name in sorted(billed):
+                writer.add("MedicalRecord_Treatment", ("recordID", "treatmentID", "quantity"),
+                           (record_id, treatment_ids[name], 1 if rnd.random() < 0.9 else 2))
+    writer.flush()
+    conn.commit()
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.close()
+    return writer.counts
+
+
+# ===== Command line =====
+def add_arguments(parser):
+    parser.add_argument("dest", help="database file to create")
+    parser.add_argument("--schema", choices=("clinic", "vetclinic"), default="clinic",
+                        help="OppProject2 tables (clinic) or the vetclinic.py tables")
+    parser.add_argument("--clients", type=int, default=10000, help="number of clients (scales everything)")
+    parser.add_argument("--visits-per-client", type=float, default=5.0, help="average visits over the period")
+    parser.add_argument("--days", type=int, default=730, help="days of history before --end")
+    parser.add_argument("--end", type=date.fromisoformat, help="last day of history, YYYY-MM-DD (default today)")
+    parser.add_argument("--future-days", type=int, default=14, help="days of booked appointments after --end")
+    parser.add_argument("--seed", type=int, default=1, help="same seed and options, same data")
+    parser.add_argument("--replace", action="store_true", help="delete dest first if it exists")
+
+
+def run(args):
+    if os.path.exists(args.dest):
+        if not args.replace:
+            print(f"Error: {args.dest} exists (use --replace to overwrite it)", file=sys.stderr)
+            return 2
+        os.remove(args.dest)
+    end = args.end or date.today()
+    options = dict(clients=args.clients, visits_per_client=args.visits_per_client,
+                   start=end - timedelta(days=args.days), end=end, future_days=args.future_days, seed=args.seed)
+    started = time.perf_counter()
+    # bulk batches are slow by design; keep them out of the slow-query log
+    QUERY_STATS.enabled = False
+    try:
+        if args.schema == "vetclinic":
+            counts = generate_vetclinic(args.dest, **options)
+        else:
+            db = Database(args.dest)
+            try:
+                counts = generate_clinic(db, **options)
+            finally:
+                db.conn.close()
+    finally:
+        QUERY_STATS.enabled = True
+    elapsed = time.perf_counter() - started
+    for table, count in counts.items():
+        print(f"{table:<25} {count:>12,}")
+    print(f"{'total':<25} {sum(counts.values()):>12,} rows in {elapsed:.1f} s")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic clinic database")
+    add_arguments(parser)
+    return run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
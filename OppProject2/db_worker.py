@@ -0,0 +1,98 @@
+import contextvars
+import queue
+import threading
+from concurrent.futures import Future
+
+import applog
+
+log = applog.get_logger("db_worker")
+
+
+class DatabaseWorker:
+    """Runs database jobs on a dedicated thread so the Tk mainloop never waits on SQLite.
+
+    The worker owns its own Database (sqlite3 connections are tied to the
+    thread that created them). A job is any callable taking that Database as
+    its first argument. submit() returns a concurrent.futures.Future; the
+    optional on_done / on_error callbacks are run on the Tk thread, via a
+    queue drained with after(), once the job finishes. Jobs run in a copy of
+    the submitter's context, so their log records carry its frame/operation.
+    """
+
+    def __init__(self, db_factory, tk_root, poll_ms=15):
+        self.db_factory = db_factory
+        self.root = tk_root
+        self.poll_ms = poll_ms
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self.pending = 0
+        self.polling = False
+        self.thread = threading.Thread(target=self._run, name="db-worker", daemon=True)
+        self.thread.start()
+
+    # ===== worker thread =====
+    def _run(self):
+        db = self.db_factory()
+        try:
+            while True:
+                job = self.jobs.get()
+                if job is None:
+                    break
+                fn, args, kwargs, context, future, on_done, on_error = job
+                if not future.set_running_or_notify_cancel():
+                    self.results.put((None, None, future))
+                    continue
+                try:
+                    future.set_result(context.run(fn, db, *args, **kwargs))
+                except BaseException as e:
+                    future.set_exception(e)
+                self.results.put((on_done, on_error, future))
+        finally:
+            db.conn.close()
+
+    # ===== Tk thread =====
+    def submit(self, fn, *args, on_done=None, on_error=None, **kwargs):
+        """Queue fn(db, *args, **kwargs); must be called from the Tk thread"""
+        future = Future()
+        self.pending += 1
+        self.jobs.put((fn, args, kwargs, contextvars.copy_context(), future, on_done, on_error))
+        self._schedule_poll()
+        return future
+
+    def call(self, method, *args, on_done=None, on_error=None):
+        """Queue a Database method by name, e.g. call("insert_invoice", data)"""
+        return self.submit(lambda db: getattr(db, method)(*args), on_done=on_done, on_error=on_error)
+
+    def _schedule_poll(self):
+        if not self.polling:
+            self.polling = True
+            self.root.after(self.poll_ms, self._drain)
+
+    def _drain(self):
+        self.polling = False
+        while True:
+            try:
+                on_done, on_error, future = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.pending -= 1
+            if future.cancelled():
+                continue
+            error = future.exception()
+            try:
+                if error is not None:
+                    if on_error:
+                        on_error(error)
+                    else:
+                        log.error("Database job failed: %s", error, exc_info=error)
+                elif on_done:
+                    on_done(future.result())
+            except Exception as e:
+                log.exception("Error in database job callback: %s", e)
+        if self.pending > 0:
+            self._schedule_poll()
+
+    def stop(self, timeout=5):
+        """Finish queued jobs, then close the worker's connection"""
+        self.jobs.put(None)
+        self.thread.join(timeout)
@@ -0,0 +1,388 @@
+import argparse
+import re
+from collections import defaultdict
+
+import applog
+from database import Database, DB_FILE
+
+log = applog.get_logger("dedup")
+
+# Scores at or above this are treated as confirmed duplicates
+DEFAULT_THRESHOLD = 0.85
+
+# Rows compared with each neighbour inside a sorted block (sorted neighbourhood)
+DEFAULT_WINDOW = 8
+
+# Two records of one pet may be entered a birthday apart
+AGE_TOLERANCE = 1
+
+
+# ===== Normalization / blocking keys =====
+def normalize_name(name):
+    """Lowercase, drop punctuation and collapse whitespace"""
+    name = re.sub(r"[^a-z0-9 ]", " ", str(name or "").lower())
+    return " ".join(name.split())
+
+
+def normalize_phone(contact):
+    """Keep digits only; compare on the last 10 so 09xx and +639xx match"""
+    digits = re.sub(r"\D", "", str(contact or ""))
+    return digits[-10:]
+
+
+SOUNDEX_CODES = {}
+for _letters, _code in (("bfpv", "1"), ("cgjkqsxz", "2"), ("dt", "3"),
+                        ("l", "4"), ("mn", "5"), ("r", "6")):
+    for _ch in _letters:
+        SOUNDEX_CODES[_ch] = _code
+
+
+def soundex(word):
+    """American soundex code of a single word ("" for empty input)"""
+    word = re.sub(r"[^a-z]", "", str(word or "").lower())
+    if not word:
+        return ""
+    code = word[0].upper()
+    last = SOUNDEX_CODES.get(word[0], "")
+    for ch in word[1:]:
+        digit = SOUNDEX_CODES.get(ch, "")
+        if digit and digit != last:
+            code += digit
+            if len(code) == 4:
+                break
+        if ch not in "hw":
+            last = digit
+    return code.ljust(4, "0")
+
+
+def trigrams(text):
+    """Character trigrams of a normalized string, padded at both ends"""
+    text = f"  {text} "
+    return frozenset(text[i:i + 3] for i in range(len(text) - 2))
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def phone_similarity(a, b):
+    """1.0 for equal numbers, partial credit for a single typo, None if unknown"""
+    if not a or not b:
+        return None
+    if a == b:
+        return 1.0
+    if len(a) == len(b):
+        mismatches = sum(1 for x, y in zip(a, b) if x != y)
+        if mismatches == 1:
+            return 0.8
+    return 0.0
+
+
+# ===== Candidate records =====
+class _Candidate:
+    __slots__ = ("id", "name", "key", "grams", "phone", "owner", "traits")
+
+    def __init__(self, row_id, name, key, phone="", owner="", traits=None):
+        self.id = row_id
+        self.name = name
+        self.key = key
+        self.grams = trigrams(key)
+        self.phone = phone
+        self.owner = owner
+        self.traits = traits  # pets: (species, breed, age), normalized
+
+
+def pet_traits(species, breed, age):
+    """(species, breed, age) as compared by traits_compatible; age None when unknown"""
+    try:
+        age = int(age)
+    except (TypeError, ValueError):
+        age = None
+    return normalize_name(species), normalize_name(breed), age
+
+
+def traits_compatible(a, b):
+    """Could two pet records describe the same animal?
+
+    Species must be equal (a blank one only matches another blank one);
+    breed must be equal unless either is blank, and age within
+    AGE_TOLERANCE unless either is unknown.
+    """
+    if a is None or b is None:
+        return True
+    (species_a, breed_a, age_a), (species_b, breed_b, age_b) = a, b
+    if species_a != species_b:
+        return False
+    if breed_a and breed_b and breed_a != breed_b:
+        return False
+    return age_a is None or age_b is None or abs(age_a - age_b) <= AGE_TOLERANCE
+
+
+def score_pair(a, b):
+    """Similarity in [0, 1] from name trigrams and (when known) phone; 0 for different pets"""
+    if not traits_compatible(a.traits, b.traits):
+        return 0.0
+    name_score = 1.0 if a.key == b.key else jaccard(a.grams, b.grams)
+    phone_score = phone_similarity(a.phone, b.phone)
+    if phone_score is None:
+        return name_score
+    return 0.6 * name_score + 0.4 * phone_score
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, x):
+        parent = self.parent
+        root = x
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while parent.get(x, x) != root:
+            parent[x], x = root, parent[x]
+        return root
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            # lowest id becomes the root, which is the record we keep
+            if rb < ra:
+                ra, rb = rb, ra
+            self.parent[rb] = ra
+
+
+def _cluster(candidates, blocking, threshold, window):
+    """Group candidates into duplicate clusters using blocking keys.
+
+    Each candidate is only compared with the `window` records that follow it
+    in its block (sorted by normalized name), so work grows with
+    n * window instead of n²  even when a block is very large.
+    """
+    blocks = defaultdict(list)
+    for cand in candidates:
+        for key in blocking(cand):
+            if key:
+                blocks[key].append(cand)
+
+    uf = _UnionFind()
+    scores = {}
+    matches = []
+    for members in blocks.values():
+        if len(members) < 2:
+            continue
+        members.sort(key=lambda c: (c.key, c.id))
+        for i, a in enumerate(members):
+            for b in members[i + 1:i + 1 + window]:
+                pair = (a.id, b.id) if a.id < b.id else (b.id, a.id)
+                if pair in scores:
+                    continue
+                score = score_pair(a, b)
+                scores[pair] = score
+                if score >= threshold:
+                    uf.union(a.id, b.id)
+                    matches.append((a.id, score))
+
+    by_id = {c.id: c for c in candidates}
+    groups = defaultdict(list)
+    for cand_id in uf.parent:
+        groups[uf.find(cand_id)].append(cand_id)
+
+    # weakest accepted link per cluster, reported so borderline merges stand out
+    weakest = {}
+    for cand_id, score in matches:
+        root = uf.find(cand_id)
+        weakest[root] = min(weakest.get(root, score), score)
+
+    clusters = []
+    for root, ids in groups.items():
+        ids = sorted(set(ids) | {root})
+        clusters.append({
+            "keep": by_id[ids[0]],
+            "duplicates": [by_id[i] for i in ids[1:]],
+            "score": round(weakest.get(root, threshold), 3),
+        })
+    clusters.sort(key=lambda c: c["keep"].id)
+    return clusters
+
+
+# ===== Clients =====
+def _client_blocking(cand):
+    parts = cand.key.split()
+    keys = []
+    if cand.phone:
+        keys.append("p:" + cand.phone)
+    if parts:
+        keys.append("s:" + soundex(parts[0]) + soundex(parts[-1]))
+    return keys
+
+
+def find_client_duplicates(db, threshold=DEFAULT_THRESHOLD, window=DEFAULT_WINDOW):
+    """Return duplicate client clusters without changing anything"""
+    db.cursor.execute("SELECT id, name, contact FROM clients")
+    candidates = [
+        _Candidate(row[0], row[1], normalize_name(row[1]), normalize_phone(row[2]))
+        for row in db.cursor.fetchall()
+    ]
+    return _cluster(candidates, _client_blocking, threshold, window)
+
+
+def _shared_name(cur, sql, params, cluster):
+    """Ids of rows matched by `sql` (SELECT id ...) that are not part of the cluster"""
+    members = {cluster["keep"].id} | {dup.id for dup in cluster["duplicates"]}
+    return [row[0] for row in cur.execute(sql, params).fetchall() if row[0] not in members]
+
+
+def merge_client_cluster(db, cluster):
+    """Re-point every record of the duplicates to the kept client and delete them.
+
+    Records are linked by client name, so renamed variants are rewritten to the
+    kept name in animals, appointments, treatments, invoices and pet_status.
+    A duplicate whose name another client outside the cluster also has is
+    skipped: its records can't be told apart from that client's. The whole
+    cluster is merged in a single transaction; returns the number of
+    duplicates merged (0 on error).
+    """
+    keep = cluster["keep"]
+    cur = db.conn.cursor()
+    merged = 0
+    try:
+        for dup in cluster["duplicates"]:
+            if dup.name != keep.name:
+                others = _shared_name(cur, "SELECT id FROM clients WHERE name=?", (dup.name,), cluster)
+                if others:
+                    log.warning("Not merging client %s into %s: client %s has the same name",
+                                dup.id, keep.id, others[0], extra={"table": "clients", "row_id": dup.id})
+                    continue
+                cur.execute("UPDATE animals SET owner_name=? WHERE owner_name=?", (keep.name, dup.name))
+                cur.execute("UPDATE appointments SET client_name=? WHERE client_name=?", (keep.name, dup.name))
+                cur.execute("UPDATE treatments SET client=? WHERE client=?", (keep.name, dup.name))
+                cur.execute("UPDATE invoices SET client=? WHERE client=?", (keep.name, dup.name))
+                cur.execute("UPDATE pet_status SET client=? WHERE client=?", (keep.name, dup.name))
+                cur.execute("UPDATE walkins SET client_name=? WHERE client_name=?", (keep.name, dup.name))
+            cur.execute("DELETE FROM clients WHERE id=?", (dup.id,))
+            merged += 1
+        for table in ("clients", "animals", "appointments", "treatments", "invoices", "pet_status", "walkins"):
+            db.changed(table)
+        db.commit()
+        return merged
+    except Exception as e:
+        db.rollback()
+        log.exception("Error merging client %s: %s", keep.id, e, extra={"table": "clients", "row_id": keep.id})
+        return 0
+
+
+# ===== Animals =====
+def _animal_blocking(cand):
+    owner, _, pet = cand.key.partition("|")
+    return ["o:" + owner + "|" + cand.traits[0] + "|" + soundex(pet)]
+
+
+def find_animal_duplicates(db, threshold=DEFAULT_THRESHOLD, window=DEFAULT_WINDOW):
+    """Return duplicate pet clusters (same owner and species, similar pet name, compatible breed and age)"""
+    db.cursor.execute("SELECT id, pet_name, owner_name, species, breed, age FROM animals")
+    candidates = []
+    for row in db.cursor.fetchall():
+        key = normalize_name(row[2]) + "|" + normalize_name(row[1])
+        candidates.append(_Candidate(row[0], row[1], key, owner=row[2], traits=pet_traits(row[3], row[4], row[5])))
+    return _cluster(candidates, _animal_blocking, threshold, window)
+
+
+def merge_animal_cluster(db, cluster):
+    """Re-point the duplicates' records to the kept pet and delete them (one transaction).
+
+    Pets only match within a normalized owner name, so a duplicate's records
+    are found under its own owner spelling and rewritten to the kept pet and
+    owner names. As with clients, a duplicate sharing its owner and name
+    with a pet outside the cluster is skipped. Returns the number merged.
+    """
+    keep = cluster["keep"]
+    cur = db.conn.cursor()
+    merged = 0
+    try:
+        for dup in cluster["duplicates"]:
+            if (dup.name, dup.owner) != (keep.name, keep.owner):
+                others = _shared_name(cur, "SELECT id FROM animals WHERE owner_name=? AND pet_name=?",
+                                      (dup.owner, dup.name), cluster)
+                if others:
+                    log.warning("Not merging pet %s into %s: pet %s has the same owner and name",
+                                dup.id, keep.id, others[0], extra={"table": "animals", "row_id": dup.id})
+                    continue
+                new, old = (keep.name, keep.owner), (dup.owner, dup.name)
+                cur.execute("UPDATE appointments SET pet_name=?, client_name=? WHERE client_name=? AND pet_name=?", new + old)
+                cur.execute("UPDATE treatments SET pet=?, client=? WHERE client=? AND pet=?", new + old)
+                cur.execute("UPDATE invoices SET pet=?, client=? WHERE client=? AND pet=?", new + old)
+                cur.execute("UPDATE pet_status SET pet=?, client=? WHERE client=? AND pet=?", new + old)
+                cur.execute("UPDATE walkins SET pet_name=?, client_name=? WHERE client_name=? AND pet_name=?", new + old)
+            cur.execute("DELETE FROM animals WHERE id=?", (dup.id,))
+            merged += 1
+        for table in ("animals", "appointments", "treatments", "invoices", "pet_status", "walkins"):
+            db.changed(table)
+        db.commit()
+        return merged
+    except Exception as e:
+        db.rollback()
+        log.exception("Error merging animal %s: %s", keep.id, e, extra={"table": "animals", "row_id": keep.id})
+        return 0
+
+
+# ===== Batch run =====
+def run_dedup(db, threshold=DEFAULT_THRESHOLD, window=DEFAULT_WINDOW, apply=False):
+    """Detect (and optionally merge) duplicate clients, then duplicate pets.
+
+    Clients are merged first so pets of merged owners share one owner name
+    before pets are compared.
+    """
+    summary = {"client_clusters": 0, "clients_merged": 0, "animal_clusters": 0, "animals_merged": 0}
+
+    client_clusters = find_client_duplicates(db, threshold, window)
+    summary["client_clusters"] = len(client_clusters)
+    if apply:
+        for cluster in client_clusters:
+            summary["clients_merged"] += merge_client_cluster(db, cluster)
+
+    animal_clusters = find_animal_duplicates(db, threshold, window)
+    summary["animal_clusters"] = len(animal_clusters)
+    if apply:
+        for cluster in animal_clusters:
+            summary["animals_merged"] += merge_animal_cluster(db, cluster)
+
+    summary["clusters"] = client_clusters
+    summary["animal_cluster_list"] = animal_clusters
+    return summary
+
+
+def format_cluster(cluster):
+    dups = ", ".join(f"#{d.id} {d.name}" for d in cluster["duplicates"])
+    return f"keep #{cluster['keep'].id} {cluster['keep'].name:<25} <- {dups}  (score {cluster['score']})"
+
+
+def add_arguments(parser):
+    parser.add_argument("--db", default=DB_FILE, help="database file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW)
+    parser.add_argument("--apply", action="store_true", help="merge the duplicates (default: report only)")
+
+
+def run(args):
+    db = Database(args.db)
+    summary = run_dedup(db, args.threshold, args.window, args.apply)
+    for cluster in summary["clusters"]:
+        print("client  " + format_cluster(cluster))
+    for cluster in summary["animal_cluster_list"]:
+        print("pet     " + format_cluster(cluster))
+    print(f"Client clusters: {summary['client_clusters']}  merged: {summary['clients_merged']}")
+    print(f"Pet clusters:    {summary['animal_clusters']}  merged: {summary['animals_merged']}")
+    db.conn.close()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find and merge duplicate clients and pets")
+    add_arguments(parser)
+    return run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+import argparse
+import csv
+import gzip
+import json
+import os
+import sys
+
+from database import Database, DB_FILE
+
+DEFAULT_FETCH_SIZE = 2000
+
+# table -> column used for --from/--to filtering (None: no date column)
+TABLE_DATE_COLUMNS = {
+    "clients": None,
+    "animals": None,
+    "walkins": "date",
+    "appointments": "date",
+    "treatments": "date",
+    "invoices": "date",
+    "pet_status": "date",
+    "payments": "date",
+}
+
+# Report queries; {where} receives the date-range filter on the named date column
+REPORTS = {
+    # the revenue rollups (see database.REVENUE_ROLLUPS); months cover the
+    # days of the range only, so they are summed from the daily rollup
+    "daily_revenue": ("""
+        SELECT date, invoices, total, paid, unpaid
+        FROM daily_revenue {where}
+        ORDER BY date""", "date"),
+    "monthly_revenue": ("""
+        SELECT substr(date, 1, 7) AS month,
+               SUM(invoices) AS invoices,
+               SUM(total) AS total,
+               SUM(paid) AS paid,
+               SUM(unpaid) AS unpaid
+        FROM daily_revenue {where}
+        GROUP BY month ORDER BY month""", "date"),
+    "outstanding_invoices": ("""
+        SELECT id, invoice_no, client, pet, amount, date
+        FROM invoices WHERE status = 'Unpaid' {and_where}
+        ORDER BY date""", "date"),
+    "treatment_summary": ("""
+        SELECT treatment_type, COUNT(*) AS treatments
+        FROM treatments {where}
+        GROUP BY treatment_type ORDER BY treatment_type""", "date"),
+    "appointment_summary": ("""
+        SELECT reason, COUNT(*) AS appointments
+        FROM appointments {where}
+        GROUP BY reason ORDER BY reason""", "date"),
+    "species": ("""
+        SELECT species, breed, pet_name, owner_name
+        FROM animals {where}
+        ORDER BY species, pet_name""", None),
+}
+
+
+def _date_filter(column, date_from, date_to):
+    clauses, params = [], []
+    if column and date_from:
+        clauses.append(f"{column} >= ?")
+        params.append(date_from)
+    if column and date_to:
+        clauses.append(f"{column} <= ?")
+        params.append(date_to)
+    return " AND ".join(clauses), params
+
+
+def table_columns(db, table):
+    cur = db.conn.cursor()
+    cur.execute(f"PRAGMA table_info({table})")
+    return [row[1] for row in cur.fetchall()]
+
+
+def table_query(db, table, columns=None, date_from=None, date_to=None):
+    """Build (sql, params) selecting `columns` of `table` within a date range"""
+    if table not in TABLE_DATE_COLUMNS:
+        raise ValueError(f"Unknown table '{table}'")
+    available = table_columns(db, table)
+    columns = list(columns) if columns else available
+    unknown = [c for c in columns if c not in available]
+    if unknown:
+        raise ValueError(f"Unknown column(s) for {table}: {', '.join(unknown)}")
+    condition, params = _date_filter(TABLE_DATE_COLUMNS[table], date_from, date_to)
+    sql = f"SELECT {', '.join(columns)} FROM {table}"
+    if condition:
+        sql += " WHERE " + condition
+    sql += " ORDER BY id"
+    return sql, params
+
+
+def report_query(name, date_from=None, date_to=None):
+    """Build (sql, params) for one of the REPORTS"""
+    if name not in REPORTS:
+        raise ValueError(f"Unknown report '{name}'")
+    sql, date_column = REPORTS[name]
+    condition, params = _date_filter(date_column, date_from, date_to)
+    return sql.format(where=("WHERE " + condition) if condition else "",
+                      and_where=("AND " + condition) if condition else ""), params
+
+
+# ===== Writers =====
+def _open_output(path, compress):
+    if compress:
+        return gzip.open(path, "wt", encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+def _format_for(path):
+    base = path[:-3] if path.endswith(".gz") else path
+    if base.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    return "csv"
+
+
+def export_query(db, sql, params, path, fmt=None, compress=None, columns=None, fetch_size=DEFAULT_FETCH_SIZE):
+    """Stream the result of `sql` to `path` as CSV or JSON Lines.
+
+    Rows are pulled with fetchmany and written as they arrive, so memory use
+    does not depend on the size of the result. The file is written to a
+    temporary name and renamed at the end, so a failed export never leaves a
+    truncated file behind. Returns the number of rows written.
+    """
+    fmt = fmt or _format_for(path)
+    compress = path.endswith(".gz") if compress is None else compress
+    cur = db.conn.cursor()
+    cur.row_factory = None  # plain tuples: nothing here needs records
+    cur.execute(sql, params)
+    header = columns or [d[0] for d in cur.description]
+
+    tmp_path = path + ".part"
+    count = 0
+    try:
+        with _open_output(tmp_path, compress) as f:
+            if fmt == "csv":
+                writer = csv.writer(f)
+                writer.writerow(header)
+                while True:
+                    rows = cur.fetchmany(fetch_size)
+                    if not rows:
+                        break
+                    writer.writerows(rows)
+                    count += len(rows)
+            elif fmt == "jsonl":
+                dumps = json.dumps
+                while True:
+                    rows = cur.fetchmany(fetch_size)
+                    if not rows:
+                        break
+                    f.write("".join(dumps(dict(zip(header, row)), default=str) + "\n" for row in rows))
+                    count += len(rows)
+            else:
+                raise ValueError(f"Unknown export format '{fmt}' (use csv or jsonl)")
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        cur.close()
+    return count
+
+
+def export_table(db, table, path, columns=None, date_from=None, date_to=None, **kwargs):
+    sql, params = table_query(db, table, columns, date_from, date_to)
+    return export_query(db, sql, params, path, **kwargs)
+
+
+def export_report(db, name, path, date_from=None, date_to=None, **kwargs):
+    sql, params = report_query(name, date_from, date_to)
+    return export_query(db, sql, params, path, **kwargs)
+
+
+def export(db, source, path, columns=None, date_from=None, date_to=None, **kwargs):
+    """Export a table or a named report (used by the GUI and the CLI)"""
+    if source in REPORTS:
+        if columns:
+            raise ValueError("Column selection applies to tables, not reports")
+        return export_report(db, source, path, date_from, date_to, **kwargs)
+    return export_table(db, source, path, columns, date_from, date_to, **kwargs)
+
+
+def export_sources():
+    return sorted(TABLE_DATE_COLUMNS) + sorted(REPORTS)
+
+
+def add_arguments(parser):
+    parser.add_argument("source", choices=export_sources(), help="table or report name")
+    parser.add_argument("output", help="output file (.csv or .jsonl, add .gz to compress)")
+    parser.add_argument("--db", default=DB_FILE, help="database file")
+    parser.add_argument("--from", dest="date_from", help="first date (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="date_to", help="last date (YYYY-MM-DD)")
+    parser.add_argument("--columns", help="comma separated column list (tables only)")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="override the format implied by the file name")
+    parser.add_argument("--gzip", action="store_true", help="compress even without a .gz suffix")
+
+
+def run(args):
+    columns = [c.strip() for c in args.columns.split(",")] if args.columns else None
+    db = Database(args.db)
+    try:
+        count = export(db, args.source, args.output, columns, args.date_from, args.date_to,
+                       fmt=args.format, compress=True if args.gzip else None)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    finally:
+        db.conn.close()
+    print(f"Exported {count} rows from {args.source} to {args.output}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a table or report to CSV / JSON Lines")
+    add_arguments(parser)
+    return run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
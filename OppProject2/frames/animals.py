@@ -1,5 +1,6 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+
+from frames.paged_table import PagedTable
 
 class AnimalsFrame(tk.Frame):
     def __init__(self, parent, controller):
@@ -13,22 +14,21 @@ class AnimalsFrame(tk.Frame):
         self.create_back_button()
 
     def create_table(self):
-        frame = tk.Frame(self, bg="#f4f6f9")
-        frame.pack(pady=10, fill="both", expand=True)
-
-        columns = ("ID", "Pet Name", "Species", "Breed", "Age", "Owner Name")
-        self.tree = ttk.Treeview(frame, columns=columns, show="headings")
-        for col in columns:
-            self.tree.heading(col, text=col)
-            self.tree.column(col, width=120)
-
-        self.tree.pack(fill="both", expand=True, padx=20, pady=20)
+        columns = [
+            ("ID", "id"),
+            ("Pet Name", "pet_name"),
+            ("Species", "species"),
+            ("Breed", "breed"),
+            ("Age", "age"),
+            ("Owner Name", "owner_name"),
+        ]
+        self.table = PagedTable(self, self.controller.db, "animals", columns, width=120)
+        self.table.pack(pady=10, padx=20, fill="both", expand=True)
+        self.tree = self.table.tree
+        self.filler = self.table.filler
 
     def load_animals(self):
-        self.tree.delete(*self.tree.get_children())
-        rows = self.controller.db.fetch_animals()
-        for row in rows:
-            self.tree.insert("", "end", values=row)
+        self.table.reload()
 
     def create_back_button(self):
         tk.Button(self, text="Back to Dashboard", bg="#334155", fg="white", 
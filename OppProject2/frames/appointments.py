@@ -1,7 +1,8 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
 from datetime import datetime
 
+from frames.paged_table import PagedTable
+
 class AppointmentsFrame(tk.Frame):
     def __init__(self, parent, controller):
         super().__init__(parent, bg="#f4f6f9")
@@ -14,22 +15,21 @@ class AppointmentsFrame(tk.Frame):
         self.create_back_button()
 
     def create_table(self):
-        frame = tk.Frame(self, bg="#f4f6f9")
-        frame.pack(pady=10, fill="both", expand=True)
-
-        columns = ("ID", "Client Name", "Pet Name", "Date", "Time", "Reason")
-        self.tree = ttk.Treeview(frame, columns=columns, show="headings")
-        for col in columns:
-            self.tree.heading(col, text=col)
-            self.tree.column(col, width=120)
-
-        self.tree.pack(fill="both", expand=True, padx=20, pady=20)
+        columns = [
+            ("ID", "id"),
+            ("Client Name", "client_name"),
+            ("Pet Name", "pet_name"),
+            ("Date", "date"),
+            ("Time", "time"),
+            ("Reason", "reason"),
+        ]
+        self.table = PagedTable(self, self.controller.db, "appointments", columns, width=120)
+        self.table.pack(pady=10, padx=20, fill="both", expand=True)
+        self.tree = self.table.tree
+        self.filler = self.table.filler
 
     def load_appointments(self):
-        self.tree.delete(*self.tree.get_children())
-        rows = self.controller.db.fetch_appointments()
-        for row in rows:
-            self.tree.insert("", "end", values=row)
+        self.table.reload()
 
     def create_back_button(self):
         tk.Button(self, text="Back to Dashboard", bg="#334155", fg="white", 
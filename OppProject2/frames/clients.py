@@ -1,5 +1,6 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+
+from frames.paged_table import PagedTable
 
 class ClientsFrame(tk.Frame):
     def __init__(self, parent, controller):
@@ -14,16 +15,16 @@ class ClientsFrame(tk.Frame):
 
     # ===== Table (readonly) =====
     def create_table(self):
-        frame = tk.Frame(self, bg="#f4f6f9")
-        frame.pack(pady=10, fill="both", expand=True)
-
-        columns = ("ID", "Name", "Contact", "Address")
-        self.tree = ttk.Treeview(frame, columns=columns, show="headings")
-        for col in columns:
-            self.tree.heading(col, text=col)
-            self.tree.column(col, width=150)
-
-        self.tree.pack(fill="both", expand=True, padx=20, pady=20)
+        columns = [
+            ("ID", "id"),
+            ("Name", "name"),
+            ("Contact", "contact"),
+            ("Address", "address"),
+        ]
+        self.table = PagedTable(self, self.controller.db, "clients", columns, width=150)
+        self.table.pack(pady=10, padx=20, fill="both", expand=True)
+        self.tree = self.table.tree
+        self.filler = self.table.filler
 
     # ===== Back to Dashboard button =====
     def create_back_button(self):
@@ -37,7 +38,4 @@ class ClientsFrame(tk.Frame):
 
     # ===== Load clients from database =====
     def load_clients(self):
-        self.tree.delete(*self.tree.get_children())
-        rows = self.controller.db.fetch_clients()
-        for row in rows:
-            self.tree.insert("", "end", values=row)
+        self.table.reload()
@@ -1,11 +1,15 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import messagebox
 from datetime import datetime
 
+import services
+from frames.paged_table import PagedTable
+
 class ConfineFrame(tk.Frame):
     def __init__(self, parent, controller):
         super().__init__(parent, bg="#f4f6f9")
         self.controller = controller
+        self.saving = False
 
         tk.Label(self, text="Confined Pets", font=("Segoe UI", 20), bg="#f4f6f9").pack(pady=10)
 
@@ -15,21 +19,22 @@ class ConfineFrame(tk.Frame):
         self.create_back_button()
 
     def create_table(self):
-        frame = tk.Frame(self, bg="#f4f6f9")
-        frame.pack(fill="both", expand=True, padx=20, pady=10)
-
-        columns = ("ID", "Pet", "Client", "Status", "Date", "Notes")
-        self.tree = ttk.Treeview(frame, columns=columns, show="headings", selectmode="browse")
-        for col in columns:
-            self.tree.heading(col, text=col)
-            self.tree.column(col, width=120)
-        self.tree.pack(fill="both", expand=True, side="left")
+        columns = [
+            ("ID", "id"),
+            ("Pet", "pet"),
+            ("Client", "client"),
+            ("Status", "status"),
+            ("Date", "date"),
+            ("Notes", "notes"),
+        ]
+        self.table = PagedTable(self, self.controller.db, "pet_status", columns,
+                                sort="date", descending=True, fixed_filters={"status": "=Confined"},
+                                width=120, selectmode="extended")
+        self.table.pack(pady=10, padx=20, fill="both", expand=True)
+        self.tree = self.table.tree
+        self.filler = self.table.filler
         self.tree.bind("<<TreeviewSelect>>", self.on_select)
 
-        scrollbar = ttk.Scrollbar(frame, orient="vertical", command=self.tree.yview)
-        scrollbar.pack(side="right", fill="y")
-        self.tree.configure(yscrollcommand=scrollbar.set)
-
     def create_actions(self):
         btn_frame = tk.Frame(self, bg="#f4f6f9")
         btn_frame.pack(pady=8)
@@ -37,17 +42,13 @@ class ConfineFrame(tk.Frame):
         tk.Button(btn_frame, text="Refresh", bg="#2563eb", fg="white", width=14, command=self.load_confined).pack(side="left", padx=5)
         tk.Button(btn_frame, text="Add Note", bg="#6b7280", fg="white", width=14, command=self.add_note_to_selected).pack(side="left", padx=5)
         tk.Button(btn_frame, text="Daily Treatment", bg="#10b981", fg="white", width=14, command=lambda: self.update_selected_status("Daily Treatment")).pack(side="left", padx=5)
-        tk.Button(btn_frame, text="Discharge", bg="#f59e0b", fg="white", width=14, command=lambda: self.update_selected_status("Discharged")).pack(side="left", padx=5)
+        tk.Button(btn_frame, text="Discharge", bg="#f59e0b", fg="white", width=14, command=self.discharge_selected).pack(side="left", padx=5)
+        tk.Button(btn_frame, text="Discharge All", bg="#dc2626", fg="white", width=14, command=self.discharge_all).pack(side="left", padx=5)
 
     def load_confined(self):
         """Load pet_status rows where status == 'Confined'"""
         try:
-            self.tree.delete(*self.tree.get_children())
-            rows = self.controller.db.fetch_pet_status()
-            for row in rows:
-                # row: (id, pet, client, status, date, notes)
-                if str(row[3]).lower() == "confined":
-                    self.tree.insert("", "end", values=row)
+            self.table.reload()
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load confined pets: {e}")
 
@@ -95,46 +96,70 @@ class ConfineFrame(tk.Frame):
         confirm = messagebox.askyesno("Confirm", f"Set status for {pet} ({client}) to '{new_status}'?")
         if not confirm:
             return
+        if self.saving:
+            return
+        self.saving = True
+
+        # If discharged, the service auto-creates the invoice from this pet's treatments
+        date = datetime.now().strftime("%Y-%m-%d")
+        self.controller.worker.submit(services.update_pet_status, pet, client, new_status, date, "",
+                                      on_done=lambda invoice: self.on_status_saved(pet, new_status, invoice),
+                                      on_error=self.on_status_failed)
+
+    def on_status_saved(self, pet, new_status, invoice):
+        self.saving = False
         try:
-            date = datetime.now().strftime("%Y-%m-%d")
-            self.controller.db.insert_pet_status([pet, client, new_status, date, ""])
             messagebox.showinfo("Updated", f"Status set to {new_status}.")
-
-            # If discharged, auto-create invoice from treatments for this pet/client
-            if new_status == "Discharged":
-                self._create_discharge_invoice(client, pet)
-
-            # refresh views
-            self.load_confined()
-            fn = getattr(self.controller.frames.get("PetStatusFrame"), "load_pet_status", None)
-            if callable(fn):
-                fn()
-            fn2 = getattr(self.controller.frames.get("InvoicesFrame"), "load_invoices", None)
-            if callable(fn2):
-                fn2()
+            self.refresh_views()
         except Exception as e:
             messagebox.showerror("Error", f"Failed to update status: {e}")
 
-    def _create_discharge_invoice(self, client, pet):
-        try:
-            treatments = self.controller.db.fetch_treatments()
-            treatment_costs = {
-                "Checkup": 50, "Vaccination": 75, "Surgery": 500,
-                "Dental Cleaning": 150, "X-Ray": 100, "Blood Test": 80,
-                "Grooming": 60, "Wound Care": 120, "Physical Therapy": 100,
-                "Medication": 40
-            }
-            total = 0
-            for t in treatments:
-                # treatment format: (id, reason, pet, client, treatment_type, date, confined, notes)
-                if t[3] == client and t[2] == pet:
-                    total += treatment_costs.get(t[4], 50)
-            invoice_no = "INV-" + datetime.now().strftime("%Y%m%d%H%M%S")
-            date = datetime.now().strftime("%Y-%m-%d")
-            self.controller.db.insert_invoice([invoice_no, client, pet, total, date, "Unpaid"])
-            messagebox.showinfo("Invoice Created", f"Invoice {invoice_no} created for {pet}. Amount: ${total:.2f}")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to create invoice: {e}")
+    # ===== Batch discharge =====
+    def discharge_selected(self):
+        """Discharge every selected pet in one transaction (one summary at the end)"""
+        sel = self.tree.selection()
+        if not sel:
+            messagebox.showwarning("Select", "Please select one or more confined pets first.")
+            return
+        pets = list(dict.fromkeys(tuple(self.tree.item(item, "values")[1:3]) for item in sel))
+        if not messagebox.askyesno("Confirm", f"Discharge {len(pets)} pet(s) and create their invoices?"):
+            return
+        # the list shows every Confined row, including pets discharged since
+        self.start_discharge(services.discharge_still_confined, pets, services.today(), "", requested=len(pets))
+
+    def discharge_all(self):
+        """End of day: discharge every pet still confined"""
+        if not messagebox.askyesno("Confirm", "Discharge every confined pet and create their invoices?"):
+            return
+        self.start_discharge(services.discharge_confined, services.today())
+
+    def start_discharge(self, fn, *args, requested=None):
+        if self.saving:
+            return
+        self.saving = True
+        self.controller.worker.submit(fn, *args, on_done=lambda discharged: self.on_discharged(discharged, requested),
+                                      on_error=self.on_status_failed)
+
+    def on_discharged(self, discharged, requested=None):
+        self.saving = False
+        summary = services.discharge_summary(discharged)
+        if requested and len(discharged) < requested:
+            summary += f"\n\n{requested - len(discharged)} selected pet(s) were no longer confined and were skipped."
+        messagebox.showinfo("Discharged", summary)
+        self.refresh_views()
+
+    def refresh_views(self):
+        self.load_confined()
+        fn = getattr(self.controller.frames.get("PetStatusFrame"), "load_pet_status", None)
+        if callable(fn):
+            fn()
+        fn2 = getattr(self.controller.frames.get("InvoicesFrame"), "load_invoices", None)
+        if callable(fn2):
+            fn2()
+
+    def on_status_failed(self, error):
+        self.saving = False
+        messagebox.showerror("Error", f"Failed to update status: {error}")
 
     def create_back_button(self):
         tk.Button(self, text="Back to Dashboard", bg="#334155", fg="white",
@@ -42,7 +42,8 @@ class DashboardFrame(tk.Frame):
             ("Appointments", "AppointmentsFrame"),
             ("Treatments", "TreatmentsFrame"),
             ("Invoices", "InvoicesFrame"),
-            ("Reports", "ReportsFrame")
+            ("Reports", "ReportsFrame"),
+            ("Diagnostics", "DiagnosticsFrame")
         ]
 
         for text, frame_name in buttons:
@@ -0,0 +1,308 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+import memprofile
+from querystats import QUERY_STATS
+
+KEEP_SNAPSHOTS = 2  # plus the first one, for "compare with first"
+
+
+class DiagnosticsFrame(tk.Frame):
+    """Where the time and memory go: query statistics, slow queries, UI stalls, allocations"""
+
+    def __init__(self, parent, controller):
+        super().__init__(parent, bg="#f4f6f9")
+        self.controller = controller
+        self.slow_entries = []
+        self.stall_entries = []
+        self.snapshots = []
+
+        tk.Label(self, text="Diagnostics", font=("Segoe UI", 20), bg="#f4f6f9").pack(pady=10)
+
+        self.notebook = ttk.Notebook(self)
+        self.notebook.pack(fill="both", expand=True, padx=20)
+        self.create_queries_tab()
+        self.create_event_loop_tab()
+        self.create_memory_tab()
+        self.create_back_button()
+        self.after(1000, self.tick)
+
+    # ===== Queries =====
+    def create_queries_tab(self):
+        tab = tk.Frame(self.notebook, bg="#f4f6f9")
+        self.notebook.add(tab, text="Queries")
+
+        bar = tk.Frame(tab, bg="#f4f6f9")
+        bar.pack(fill="x", pady=5)
+        tk.Button(bar, text="Refresh", bg="#2563eb", fg="white", width=12,
+                  command=self.load_queries).pack(side="left", padx=5)
+        tk.Button(bar, text="Reset", bg="#6b7280", fg="white", width=12,
+                  command=self.reset_queries).pack(side="left", padx=5)
+        tk.Label(bar, text="Slow query threshold (ms):", bg="#f4f6f9").pack(side="left", padx=(20, 5))
+        self.threshold_entry = tk.Entry(bar, width=8)
+        self.threshold_entry.insert(0, "" if QUERY_STATS.slow_ms is None else f"{QUERY_STATS.slow_ms:g}")
+        self.threshold_entry.pack(side="left")
+        self.threshold_entry.bind("<Return>", lambda e: self.set_threshold())
+        tk.Button(bar, text="Set", command=self.set_threshold).pack(side="left", padx=5)
+        self.query_label = tk.Label(bar, text="", bg="#f4f6f9", fg="#6b7280")
+        self.query_label.pack(side="left", padx=10)
+
+        panes = ttk.PanedWindow(tab, orient="vertical")
+        panes.pack(fill="both", expand=True)
+
+        columns = ("Source", "Calls", "Total ms", "Mean", "p95", "Max", "Rows", "Errors", "SQL")
+        widths = {"Source": 170, "SQL": 420}
+        self.statement_tree = self.create_tree(panes, columns, widths)
+        panes.add(self.statement_tree.master, weight=3)
+
+        columns = ("Time", "ms", "Rows", "Source", "SQL")
+        widths = {"Time": 140, "Source": 170, "SQL": 480}
+        self.slow_tree = self.create_tree(panes, columns, widths)
+        self.slow_tree.bind("<<TreeviewSelect>>", self.show_slow_query)
+        panes.add(self.slow_tree.master, weight=2)
+
+        self.plan_text = tk.Text(panes, height=7, font=("Courier", 9), bg="white")
+        panes.add(self.plan_text, weight=1)
+
+        self.load_queries()
+
+    def create_tree(self, parent, columns, widths):
+        frame = tk.Frame(parent, bg="#f4f6f9")
+        tree = ttk.Treeview(frame, columns=columns, show="headings", height=8)
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, width=widths.get(col, 70), anchor="w" if col in widths else "e")
+        scrollbar = ttk.Scrollbar(frame, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side="right", fill="y")
+        tree.pack(fill="both", expand=True)
+        return tree
+
+    def load_queries(self):
+        statements = QUERY_STATS.snapshot()
+        self.statement_tree.delete(*self.statement_tree.get_children())
+        for row in statements:
+            source = ", ".join(row["sources"])
+            self.statement_tree.insert("", "end", values=(
+                source, row["calls"], f"{row['total_ms']:.1f}", f"{row['mean_ms']:.2f}",
+                f"{row['p95_ms']:.2f}", f"{row['max_ms']:.2f}", row["rows"], row["errors"], row["sql"]
+            ))
+
+        self.slow_entries = QUERY_STATS.slow_queries()
+        self.slow_tree.delete(*self.slow_tree.get_children())
+        for index, entry in enumerate(self.slow_entries):
+            self.slow_tree.insert("", "end", iid=str(index), values=(
+                entry["time"], f"{entry['ms']:.1f}", entry["rows"], entry["source"], entry["sql"]
+            ))
+
+        calls = sum(row["calls"] for row in statements)
+        total = sum(row["total_ms"] for row in statements)
+        self.query_label.config(
+            text=f"{len(statements)} statements, {calls:,} calls, {total:,.0f} ms, {len(self.slow_entries)} slow"
+        )
+        self.plan_text.delete(1.0, tk.END)
+
+    def show_slow_query(self, event=None):
+        sel = self.slow_tree.selection()
+        if not sel:
+            return
+        entry = self.slow_entries[int(sel[0])]
+        lines = [entry["sql"], "", f"Parameters: {entry['params']}",
+                 f"{entry['ms']:.1f} ms, {entry['rows']} rows, {entry['source']} on {entry['thread']}"]
+        if entry["error"]:
+            lines.append(f"Error: {entry['error']}")
+        lines += ["", "Query plan:"] + (entry["plan"] or ["(none)"])
+        self.plan_text.delete(1.0, tk.END)
+        self.plan_text.insert(1.0, "\n".join(lines))
+
+    def reset_queries(self):
+        QUERY_STATS.reset()
+        self.load_queries()
+
+    def set_threshold(self):
+        text = self.threshold_entry.get().strip()
+        try:
+            QUERY_STATS.slow_ms = float(text) if text else None
+        except ValueError:
+            messagebox.showerror("Threshold", f"'{text}' is not a number of milliseconds")
+
+    # ===== Event loop =====
+    def create_event_loop_tab(self):
+        tab = tk.Frame(self.notebook, bg="#f4f6f9")
+        self.notebook.add(tab, text="Event loop")
+
+        bar = tk.Frame(tab, bg="#f4f6f9")
+        bar.pack(fill="x", pady=5)
+        tk.Button(bar, text="Refresh", bg="#2563eb", fg="white", width=12,
+                  command=self.load_stalls).pack(side="left", padx=5)
+        tk.Button(bar, text="Reset", bg="#6b7280", fg="white", width=12,
+                  command=self.reset_stalls).pack(side="left", padx=5)
+        self.latency_label = tk.Label(bar, text="", bg="#f4f6f9", font=("Courier", 10))
+        self.latency_label.pack(side="left", padx=15)
+
+        panes = ttk.PanedWindow(tab, orient="vertical")
+        panes.pack(fill="both", expand=True)
+
+        columns = ("Time", "ms", "Frame", "Where")
+        widths = {"Time": 170, "Frame": 150, "Where": 520}
+        self.stall_tree = self.create_tree(panes, columns, widths)
+        self.stall_tree.bind("<<TreeviewSelect>>", self.show_stall)
+        panes.add(self.stall_tree.master, weight=2)
+
+        self.stack_text = tk.Text(panes, height=12, font=("Courier", 9), bg="white")
+        panes.add(self.stack_text, weight=3)
+
+    def tick(self):
+        """Keep the latency line current while this frame is on screen"""
+        if self.controller.current_frame == "DiagnosticsFrame":
+            self.update_latency()
+        self.after(1000, self.tick)
+
+    def update_latency(self):
+        monitor = getattr(self.controller, "lag_monitor", None)
+        if monitor is None:
+            return
+        s = monitor.summary()
+        self.latency_label.config(
+            text=f"Event loop lag  p50 {s['p50_ms']:.1f}  p90 {s['p90_ms']:.1f}  p99 {s['p99_ms']:.1f}  "
+                 f"max {s['max_ms']:.1f} ms   ({s['samples']} beats)   stalls: {s['stalls']}"
+        )
+
+    def load_stalls(self):
+        monitor = getattr(self.controller, "lag_monitor", None)
+        if monitor is None:
+            return
+        self.update_latency()
+        self.stall_entries = monitor.stall_log()
+        self.stall_tree.delete(*self.stall_tree.get_children())
+        for index, stall in enumerate(self.stall_entries):
+            where = stall["stacks"][0][-1] if stall["stacks"] and stall["stacks"][0] else ""
+            self.stall_tree.insert("", "end", iid=str(index), values=(
+                stall["time"], f"{stall['ms']:.0f}", stall["frame"], where
+            ))
+        self.stack_text.delete(1.0, tk.END)
+
+    def show_stall(self, event=None):
+        sel = self.stall_tree.selection()
+        if not sel:
+            return
+        stall = self.stall_entries[int(sel[0])]
+        lines = [f"{stall['time']}  {stall['ms']:.0f} ms on {stall['frame']}"]
+        for number, stack in enumerate(stall["stacks"], 1):
+            lines += ["", f"Sample {number} (innermost last):"] + ["  " + line for line in stack]
+        self.stack_text.delete(1.0, tk.END)
+        self.stack_text.insert(1.0, "\n".join(lines))
+
+    def reset_stalls(self):
+        monitor = getattr(self.controller, "lag_monitor", None)
+        if monitor is not None:
+            monitor.reset()
+        self.load_stalls()
+
+    # ===== Memory =====
+    def create_memory_tab(self):
+        tab = tk.Frame(self.notebook, bg="#f4f6f9")
+        self.notebook.add(tab, text="Memory")
+
+        bar = tk.Frame(tab, bg="#f4f6f9")
+        bar.pack(fill="x", pady=5)
+        tk.Button(bar, text="Snapshot", bg="#2563eb", fg="white", width=12,
+                  command=self.take_snapshot).pack(side="left", padx=5)
+        tk.Button(bar, text="Clear", bg="#6b7280", fg="white", width=12,
+                  command=self.clear_snapshots).pack(side="left", padx=5)
+        tk.Label(bar, text="Group by:", bg="#f4f6f9").pack(side="left", padx=(20, 5))
+        self.group_combo = ttk.Combobox(bar, values=("line", "module"), state="readonly", width=8)
+        self.group_combo.set("line")
+        self.group_combo.pack(side="left")
+        tk.Label(bar, text="Compare with:", bg="#f4f6f9").pack(side="left", padx=(15, 5))
+        self.compare_combo = ttk.Combobox(bar, values=("previous", "first"), state="readonly", width=9)
+        self.compare_combo.set("previous")
+        self.compare_combo.pack(side="left")
+        for combo in (self.group_combo, self.compare_combo):
+            combo.bind("<<ComboboxSelected>>", lambda e: self.show_snapshot())
+        self.memory_label = tk.Label(bar, text="", bg="#f4f6f9", fg="#6b7280")
+        self.memory_label.pack(side="left", padx=10)
+
+        panes = ttk.PanedWindow(tab, orient="vertical")
+        panes.pack(fill="both", expand=True)
+
+        columns = ("Where", "KB", "Blocks", "+KB", "+Blocks", "Line")
+        widths = {"Where": 220, "Line": 420}
+        self.site_tree = self.create_tree(panes, columns, widths)
+        panes.add(self.site_tree.master, weight=3)
+
+        lower = ttk.PanedWindow(panes, orient="horizontal")
+        panes.add(lower, weight=2)
+        columns = ("Frame", "Trees", "Items", "+Items", "Held")
+        widths = {"Frame": 140, "Held": 300}
+        self.frame_tree = self.create_tree(lower, columns, widths)
+        lower.add(self.frame_tree.master, weight=3)
+        columns = ("Cache", "Entries", "+Entries")
+        widths = {"Cache": 220}
+        self.cache_tree = self.create_tree(lower, columns, widths)
+        lower.add(self.cache_tree.master, weight=2)
+
+        self.update_memory_label()
+
+    def update_memory_label(self):
+        if not memprofile.tracing():
+            text = "Not tracing: the first snapshot starts tracemalloc (or start the app with --tracemalloc)"
+        else:
+            current, peak = memprofile.traced_kb()
+            text = f"Traced {current:,.0f} KB (peak {peak:,.0f} KB), {len(self.snapshots)} snapshot(s)"
+        self.memory_label.config(text=text)
+
+    def take_snapshot(self):
+        try:
+            snapshot = memprofile.take(f"snapshot {len(self.snapshots) + 1}", self.controller)
+        except Exception as e:
+            messagebox.showerror("Memory", f"Could not take a snapshot: {e}")
+            return
+        # snapshots are large: keep the first (baseline) and the last few
+        self.snapshots.append(snapshot)
+        if len(self.snapshots) > KEEP_SNAPSHOTS + 1:
+            del self.snapshots[1]
+        self.show_snapshot()
+
+    def clear_snapshots(self):
+        self.snapshots = []
+        for tree in (self.site_tree, self.frame_tree, self.cache_tree):
+            tree.delete(*tree.get_children())
+        self.update_memory_label()
+
+    def show_snapshot(self):
+        self.update_memory_label()
+        if not self.snapshots:
+            return
+        current = self.snapshots[-1]
+        older = None
+        if len(self.snapshots) > 1:
+            older = self.snapshots[0] if self.compare_combo.get() == "first" else self.snapshots[-2]
+        key = "filename" if self.group_combo.get() == "module" else "lineno"
+
+        self.site_tree.delete(*self.site_tree.get_children())
+        if older is None:
+            for where, kb, count, line in current.top(key):
+                self.site_tree.insert("", "end", values=(where, f"{kb:,.1f}", f"{count:,}", "", "", line))
+        else:
+            for where, change, kb, blocks, line in current.diff(older, key):
+                self.site_tree.insert("", "end", values=(
+                    where, f"{kb:,.1f}", "", f"{change:+,.1f}", f"{blocks:+,}", line
+                ))
+
+        self.frame_tree.delete(*self.frame_tree.get_children())
+        for name, counts in current.frames.items():
+            before = older.frames.get(name, {}).get("items", 0) if older else counts["items"]
+            held = ", ".join(f"{attr} {size:,}" for attr, size in counts["held"].items())
+            self.frame_tree.insert("", "end", values=(
+                name, counts["trees"], f"{counts['items']:,}", f"{counts['items'] - before:+,}", held
+            ))
+
+        self.cache_tree.delete(*self.cache_tree.get_children())
+        for name, size in current.caches.items():
+            before = older.caches.get(name, 0) if older else size
+            self.cache_tree.insert("", "end", values=(name, f"{size:,}", f"{size - before:+,}"))
+
+    def create_back_button(self):
+        tk.Button(self, text="Back to Dashboard", bg="#334155", fg="white",
+                  command=lambda: self.controller.show_frame("DashboardFrame")).pack(pady=10)
@@ -1,11 +1,18 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, simpledialog
 from datetime import datetime
 
+import applog
+import services
+from frames.paged_table import PagedTable
+
+log = applog.get_logger("frames.invoices")
+
 class InvoicesFrame(tk.Frame):
     def __init__(self, parent, controller):
         super().__init__(parent, bg="#f4f6f9")
         self.controller = controller
+        self.saving = False
 
         tk.Label(self, text="Invoices Module", font=("Segoe UI", 20), bg="#f4f6f9").pack(pady=10)
 
@@ -46,27 +53,25 @@ class InvoicesFrame(tk.Frame):
     def load_clients(self):
         """Load clients into dropdown"""
         try:
-            rows = self.controller.db.fetch_clients()
-            client_names = [row[1] for row in rows]  # Get client names from second column
-            self.client_combo['values'] = client_names
-            self.client_data = {row[1]: row for row in rows}  # Store full client data
+            clients = self.controller.repo.fetch_clients()
+            # invoices are linked by client name, so list each name once
+            self.client_names = list(dict.fromkeys(client.name for client in clients))
+            self.client_combo['values'] = self.client_names
         except Exception as e:
-            print(f"Error loading clients: {e}")
+            log.exception("Error loading clients: %s", e)
 
     def on_client_select(self, event):
         """Auto-populate pet name and total amount when client is selected"""
         try:
             selected_client = self.client_combo.get()
-            if selected_client in self.client_data:
+            if selected_client in self.client_names:
                 # Fetch pet for this client
-                rows = self.controller.db.fetch_animals()
-                for row in rows:
-                    if row[5] == selected_client:  # row[5] is owner_name
-                        self.pet_entry.config(state="normal")
-                        self.pet_entry.delete(0, tk.END)
-                        self.pet_entry.insert(0, row[1])  # row[1] is pet_name
-                        self.pet_entry.config(state="readonly")
-                        break
+                rows = self.controller.repo.find("animals", "owner_name", selected_client)
+                if rows:
+                    self.pet_entry.config(state="normal")
+                    self.pet_entry.delete(0, tk.END)
+                    self.pet_entry.insert(0, rows[0].pet_name)
+                    self.pet_entry.config(state="readonly")
                 
                 # Calculate total from treatments for this client
                 total_amount = self.calculate_treatment_total(selected_client)
@@ -75,61 +80,43 @@ class InvoicesFrame(tk.Frame):
                 self.amount_entry.insert(0, str(total_amount))
                 self.amount_entry.config(state="readonly")
         except Exception as e:
-            print(f"Error selecting client: {e}")
+            log.exception("Error selecting client: %s", e)
 
     def calculate_treatment_total(self, client_name):
         """Calculate total amount from all treatments for this client"""
         try:
-            treatment_costs = {
-                "Checkup": 50,
-                "Vaccination": 75,
-                "Surgery": 500,
-                "Dental Cleaning": 150,
-                "X-Ray": 100,
-                "Blood Test": 80,
-                "Grooming": 60,
-                "Wound Care": 120,
-                "Physical Therapy": 100,
-                "Medication": 40
-            }
-            
-            treatments = self.controller.db.fetch_treatments()
-            total = 0
-            for treatment in treatments:
-                # treatment format: (id, reason, pet, client, treatment_type, date, confined, notes)
-                if treatment[3] == client_name:  # treatment[3] is client name
-                    treatment_type = treatment[4]  # treatment[4] is treatment_type
-                    total += treatment_costs.get(treatment_type, 50)
-            
-            return total
+            return services.calculate_treatment_total(self.controller.db, client_name)
         except Exception as e:
-            print(f"Error calculating total: {e}")
+            log.exception("Error calculating total: %s", e)
             return 0
 
     def create_table(self):
-        frame = tk.Frame(self, bg="#f4f6f9")
-        frame.pack(pady=10, fill="both", expand=True)
-
-        columns = ("ID", "Invoice No", "Client", "Pet", "Amount", "Date", "Status", "Action")
-        self.tree = ttk.Treeview(frame, columns=columns, show="headings")
-        for col in columns:
-            self.tree.heading(col, text=col)
-            if col == "Action":
-                self.tree.column(col, width=150)
-            else:
-                self.tree.column(col, width=100)
-
-        self.tree.pack(fill="both", expand=True, padx=20, pady=20)
+        columns = [
+            ("ID", "id"),
+            ("Invoice No", "invoice_no"),
+            ("Client", "client"),
+            ("Pet", "pet"),
+            ("Amount", "amount"),
+            ("Due", None),
+            ("Date", "date"),
+            ("Status", "status"),
+            ("Action", None),
+        ]
+        self.table = PagedTable(self, self.controller.db, "invoices", columns,
+                                sort="date", descending=True, transform=self.invoice_values,
+                                widths={"Action": 150})
+        self.table.pack(pady=10, padx=20, fill="both", expand=True)
+        self.tree = self.table.tree
+        self.filler = self.table.filler
         self.tree.bind("<Double-1>", self.on_row_double_click)
 
     def load_invoices(self):
-        self.tree.delete(*self.tree.get_children())
-        rows = self.controller.db.fetch_invoices()
-        for row in rows:
-            # row = (id, invoice_no, client, pet, amount, date, status)
-            self.tree.insert("", "end", values=(
-                row[0], row[1], row[2], row[3], f"${row[4]:.2f}", row[5], row[6], "Click to manage"
-            ))
+        self.table.reload()
+
+    @staticmethod
+    def invoice_values(row):
+        return (row.id, row.invoice_no, row.client, row.pet, f"${row.amount:.2f}", f"${row.due:.2f}",
+                row.date, row.status, "Click to manage")
 
     def on_row_double_click(self, event):
         """Show options on double-click"""
@@ -138,7 +125,7 @@ class InvoicesFrame(tk.Frame):
             item = selection[0]
             values = self.tree.item(item, "values")
             invoice_id = values[0]
-            status = values[6]
+            status = values[7]
             
             self.show_invoice_options(invoice_id, status)
 
@@ -146,7 +133,7 @@ class InvoicesFrame(tk.Frame):
         """Show invoice management options"""
         options_win = tk.Toplevel(self)
         options_win.title(f"Invoice {invoice_id} - Options")
-        options_win.geometry("350x280")
+        options_win.geometry("350x320")
 
         tk.Label(options_win, text=f"Invoice ID: {invoice_id}", font=("Arial", 12, "bold")).pack(pady=10)
         tk.Label(options_win, text=f"Current Status: {status}", font=("Arial", 11)).pack(pady=5)
@@ -156,6 +143,8 @@ class InvoicesFrame(tk.Frame):
 
         # Mark as Paid button
         if status == "Unpaid":
+            tk.Button(button_frame, text="$  Record Payment...", bg="#0ea5e9", fg="white", width=25,
+                      command=lambda: self.record_payment(invoice_id, options_win)).pack(pady=5)
             tk.Button(button_frame, text="✓ Mark as Paid", bg="#2563eb", fg="white", width=25,
                       command=lambda: self.mark_paid_and_close(invoice_id, options_win)).pack(pady=5)
         else:
@@ -188,6 +177,25 @@ class InvoicesFrame(tk.Frame):
         window.destroy()
         messagebox.showinfo("Success", "Invoice marked as Unpaid!")
 
+    def record_payment(self, invoice_id, window):
+        """Ask for an amount (default: everything due) and record it"""
+        invoice = self.controller.repo.get("invoices", invoice_id)
+        if invoice is None:
+            return
+        amount = simpledialog.askfloat("Record Payment", f"Amount paid (${invoice.due:.2f} due):",
+                                       initialvalue=round(invoice.due, 2), minvalue=0.01, parent=window)
+        if amount is None:
+            return
+        try:
+            self.controller.record_payment(invoice.id, amount)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e), parent=window)
+            return
+        self.load_invoices()
+        window.destroy()
+        invoice = self.controller.repo.get("invoices", invoice.id)
+        messagebox.showinfo("Success", f"Payment of ${amount:.2f} recorded. Balance due: ${invoice.due:.2f}")
+
     def print_receipt_and_close(self, invoice_id, window):
         """Print receipt and close window"""
         self.controller.print_receipt(invoice_id)
@@ -197,17 +205,19 @@ class InvoicesFrame(tk.Frame):
     def view_invoice(self, invoice_id):
         """View invoice details"""
         try:
-            invoice = self.controller.db.fetch_invoice_by_id(invoice_id)
+            invoice = self.controller.repo.get("invoices", invoice_id)
             if invoice:
                 details = f"""
 Invoice Details:
 {'='*50}
-Invoice No:      {invoice[1]}
-Client:          {invoice[2]}
-Pet:             {invoice[3]}
-Amount:          ${invoice[4]:.2f}
-Date:            {invoice[5]}
-Status:          {invoice[6]}
+Invoice No:      {invoice.invoice_no}
+Client:          {invoice.client}
+Pet:             {invoice.pet}
+Amount:          ${invoice.amount:.2f}
+Paid:            ${invoice.paid_amount:.2f}
+Balance Due:     ${invoice.due:.2f}
+Date:            {invoice.date}
+Status:          {invoice.status}
 {'='*50}
 """
                 messagebox.showinfo("Invoice Details", details)
@@ -231,12 +241,17 @@ Status:          {invoice[6]}
             messagebox.showerror("Error", "Amount must be a number!")
             return
 
-        # Generate invoice number
-        invoice_no = "INV-" + date.replace("-", "")
-        
-        data = [invoice_no, client, pet, amount, date, "Unpaid"]
-        self.controller.db.insert_invoice(data)
-        messagebox.showinfo("Success", "Invoice created successfully!")
+        if self.saving:
+            return
+        self.saving = True
+
+        # the invoice number is allocated in the same transaction as the insert
+        self.controller.worker.submit(services.create_invoice, client, pet, amount, date,
+                                      on_done=self.on_invoice_saved, on_error=self.on_invoice_failed)
+
+    def on_invoice_saved(self, invoice_no):
+        self.saving = False
+        messagebox.showinfo("Success", f"Invoice {invoice_no} created successfully!")
 
         # Clear form
         self.client_combo.set("")
@@ -252,6 +267,10 @@ Status:          {invoice[6]}
         # Refresh table
         self.load_invoices()
 
+    def on_invoice_failed(self, error):
+        self.saving = False
+        messagebox.showerror("Error", f"Failed to create invoice: {error}")
+
     def create_back_button(self):
         tk.Button(self, text="Back to Dashboard", bg="#334155", fg="white", 
                   command=lambda: self.controller.show_frame("DashboardFrame")).pack(pady=10)
@@ -0,0 +1,163 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+from database import SORT_COLUMNS
+from frames.table_filler import TreeFiller
+
+
+class PagedTable(tk.Frame):
+    """Treeview over one table, a page at a time, with sorting and filtering done in SQL.
+
+    `columns` is a list of (heading, db column) pairs; use None as the db
+    column for display-only columns (filled in by `transform`). Clicking a
+    sortable heading (Database.SORT_COLUMNS) sorts by it, clicking again
+    reverses. Each db column gets a filter box above the table; Enter applies
+    the filters. `fixed_filters` are always applied (e.g. {"status": "=Confined"}).
+    """
+
+    def __init__(self, parent, db, table, columns, sort="id", descending=False,
+                 page_size=200, transform=None, fixed_filters=None, width=100, widths=None,
+                 bg="#f4f6f9", **tree_options):
+        super().__init__(parent, bg=bg)
+        self.db = db
+        self.table = table
+        self.columns = columns
+        self.sort = sort
+        self.descending = descending
+        self.page_size = page_size
+        self.transform = transform
+        self.fixed_filters = fixed_filters or {}
+        self.page = 0
+        self.total = 0
+        self.filters = {}
+        self.filter_entries = {}
+
+        widths = widths or {}
+        headings = [heading for heading, column in columns]
+        self.create_filter_row(widths, width, bg)
+
+        self.tree = ttk.Treeview(self, columns=headings, show="headings", **tree_options)
+        for heading, column in columns:
+            if column in SORT_COLUMNS[table]:
+                self.tree.heading(heading, text=heading, command=lambda c=column: self.sort_by(c))
+            else:
+                self.tree.heading(heading, text=heading)
+            self.tree.column(heading, width=widths.get(heading, width))
+        self.tree.grid(row=1, column=0, sticky="nsew")
+
+        scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.tree.yview)
+        scrollbar.grid(row=1, column=1, sticky="ns")
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.grid_rowconfigure(1, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        self.create_pager(bg)
+        self.filler = TreeFiller(self.tree)
+        self.update_headings()
+
+    # ===== Filters =====
+    def create_filter_row(self, widths, width, bg):
+        row = tk.Frame(self, bg=bg)
+        row.grid(row=0, column=0, sticky="ew", pady=(0, 4))
+        tk.Label(row, text="Filter:", bg=bg).pack(side="left", padx=(0, 5))
+        for heading, column in self.columns:
+            if column is None or column in self.fixed_filters:
+                continue
+            entry = tk.Entry(row, width=max(6, widths.get(heading, width) // 10))
+            entry.pack(side="left", padx=2)
+            entry.bind("<Return>", lambda e: self.apply_filters())
+            self.filter_entries[column] = entry
+            self.set_placeholder(entry, heading)
+        tk.Button(row, text="Apply", command=self.apply_filters).pack(side="left", padx=5)
+        tk.Button(row, text="Clear", command=self.clear_filters).pack(side="left")
+
+    @staticmethod
+    def set_placeholder(entry, text):
+        """Grey heading text shown while the filter box is empty"""
+        def show(event=None):
+            if not entry.get():
+                entry.insert(0, text)
+                entry.config(fg="#9ca3af")
+                entry.placeholder = True
+
+        def hide(event=None):
+            if getattr(entry, "placeholder", False):
+                entry.delete(0, "end")
+                entry.config(fg="black")
+                entry.placeholder = False
+
+        entry.bind("<FocusIn>", hide, add="+")
+        entry.bind("<FocusOut>", show, add="+")
+        entry.show_placeholder = show
+        show()
+
+    def filter_text(self, entry):
+        return "" if getattr(entry, "placeholder", False) else entry.get().strip()
+
+    def apply_filters(self):
+        self.filters = {column: self.filter_text(entry) for column, entry in self.filter_entries.items()}
+        self.page = 0
+        self.reload()
+
+    def clear_filters(self):
+        for entry in self.filter_entries.values():
+            if not getattr(entry, "placeholder", False):
+                entry.delete(0, "end")
+                entry.show_placeholder()
+        self.apply_filters()
+
+    # ===== Sorting =====
+    def sort_by(self, column):
+        if column == self.sort:
+            self.descending = not self.descending
+        else:
+            self.sort, self.descending = column, False
+        self.page = 0
+        self.update_headings()
+        self.reload()
+
+    def update_headings(self):
+        for heading, column in self.columns:
+            arrow = (" ▼" if self.descending else " ▲") if column == self.sort else ""
+            self.tree.heading(heading, text=heading + arrow)
+
+    # ===== Paging =====
+    def create_pager(self, bg):
+        pager = tk.Frame(self, bg=bg)
+        pager.grid(row=2, column=0, sticky="ew", pady=(4, 0))
+        self.prev_button = tk.Button(pager, text="◀ Prev", command=lambda: self.go_to(self.page - 1))
+        self.prev_button.pack(side="left")
+        self.next_button = tk.Button(pager, text="Next ▶", command=lambda: self.go_to(self.page + 1))
+        self.next_button.pack(side="left", padx=5)
+        self.page_label = tk.Label(pager, text="", bg=bg, fg="#6b7280")
+        self.page_label.pack(side="left", padx=10)
+
+    def go_to(self, page):
+        last = max(0, (self.total - 1) // self.page_size)
+        page = min(max(page, 0), last)
+        if page != self.page:
+            self.page = page
+            self.reload(count=False)
+
+    def reload(self, count=True):
+        """Fetch the current page (and, unless count=False, the matching row count)"""
+        filters = dict(self.filters)
+        filters.update(self.fixed_filters)
+        try:
+            if count:
+                self.total = self.db.count_rows(self.table, filters)
+                self.page = min(self.page, max(0, (self.total - 1) // self.page_size))
+            rows = self.db.fetch_page(self.table, self.sort, self.descending, filters,
+                                      limit=self.page_size, offset=self.page * self.page_size)
+        except ValueError as e:
+            messagebox.showerror("Filter", str(e))
+            return
+        self.filler.load(rows, self.transform)
+
+        first = self.page * self.page_size
+        if self.total:
+            self.page_label.config(text=f"{first + 1:,}–{first + len(rows):,} of {self.total:,}")
+        else:
+            self.page_label.config(text="No rows")
+        self.prev_button.config(state="normal" if self.page > 0 else "disabled")
+        self.next_button.config(state="normal" if first + len(rows) < self.total else "disabled")
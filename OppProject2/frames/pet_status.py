@@ -2,10 +2,17 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime
 
+import applog
+import services
+from frames.paged_table import PagedTable
+
+log = applog.get_logger("frames.pet_status")
+
 class PetStatusFrame(tk.Frame):
     def __init__(self, parent, controller):
         super().__init__(parent, bg="#f4f6f9")
         self.controller = controller
+        self.saving = False
 
         tk.Label(self, text="Pet Status Tracking", font=("Segoe UI", 20), bg="#f4f6f9").pack(pady=10)
 
@@ -57,57 +64,55 @@ class PetStatusFrame(tk.Frame):
     def load_appointments(self):
         """Load appointments into dropdown"""
         try:
-            rows = self.controller.db.fetch_appointments()
-            appointment_display = [f"{row[1]} - {row[2]} ({row[5]})" for row in rows]
-            self.appointment_combo['values'] = appointment_display
-            self.appointment_data = {f"{row[1]} - {row[2]} ({row[5]})": row for row in rows}
+            self.appointments = self.controller.repo.fetch_appointments()
+            # the id keeps entries unique when client, pet and reason repeat
+            self.appointment_combo['values'] = [appt.label() for appt in self.appointments]
         except Exception as e:
-            print(f"Error loading appointments: {e}")
+            log.exception("Error loading appointments: %s", e)
 
     def on_appointment_select(self, event):
         """Auto-populate fields when appointment is selected"""
         try:
-            selected = self.appointment_combo.get()
-            if selected in self.appointment_data:
-                appt = self.appointment_data[selected]
-                # appt = (ID, client_name, pet_name, date, time, reason)
-                
+            index = self.appointment_combo.current()
+            if index >= 0:
+                appt = self.appointments[index]
+
                 self.client_entry.config(state="normal")
                 self.client_entry.delete(0, tk.END)
-                self.client_entry.insert(0, appt[1])
+                self.client_entry.insert(0, appt.client_name)
                 self.client_entry.config(state="readonly")
 
                 self.pet_entry.config(state="normal")
                 self.pet_entry.delete(0, tk.END)
-                self.pet_entry.insert(0, appt[2])
+                self.pet_entry.insert(0, appt.pet_name)
                 self.pet_entry.config(state="readonly")
 
                 # Set initial status
                 self.status_combo.set("Appointment")
         except Exception as e:
-            print(f"Error selecting appointment: {e}")
+            log.exception("Error selecting appointment: %s", e)
 
     def create_table(self):
-        frame = tk.Frame(self, bg="#f4f6f9")
-        frame.pack(pady=10, fill="both", expand=True)
-
-        columns = ("ID", "Pet", "Client", "Status", "Date", "Notes")
-        self.tree = ttk.Treeview(frame, columns=columns, show="headings")
-        for col in columns:
-            self.tree.heading(col, text=col)
-            self.tree.column(col, width=100)
-
-        self.tree.pack(fill="both", expand=True, padx=20, pady=20)
+        columns = [
+            ("ID", "id"),
+            ("Pet", "pet"),
+            ("Client", "client"),
+            ("Status", "status"),
+            ("Date", "date"),
+            ("Notes", "notes"),
+        ]
+        self.table = PagedTable(self, self.controller.db, "pet_status", columns,
+                                sort="date", descending=True)
+        self.table.pack(pady=10, padx=20, fill="both", expand=True)
+        self.tree = self.table.tree
+        self.filler = self.table.filler
 
     def load_pet_status(self):
         """Load pet status records"""
-        self.tree.delete(*self.tree.get_children())
         try:
-            rows = self.controller.db.fetch_pet_status()
-            for row in rows:
-                self.tree.insert("", "end", values=row)
+            self.table.reload()
         except Exception as e:
-            print(f"Error loading pet status: {e}")
+            log.exception("Error loading pet status: %s", e)
 
     def update_status(self):
         """Update pet status and auto-create invoice when discharged"""
@@ -121,14 +126,22 @@ class PetStatusFrame(tk.Frame):
             messagebox.showerror("Error", "Please fill all required fields!")
             return
 
+        if self.saving:
+            return
+        self.saving = True
+
+        # If discharged, the service auto-creates the invoice
+        self.controller.worker.submit(services.update_pet_status, pet, client, status, date, notes,
+                                      on_done=lambda invoice: self.on_status_saved(status, invoice),
+                                      on_error=self.on_status_failed)
+
+    def on_status_saved(self, status, invoice):
+        self.saving = False
         try:
-            data = [pet, client, status, date, notes if notes else ""]
-            self.controller.db.insert_pet_status(data)
             messagebox.showinfo("Success", f"Pet status updated to: {status}")
 
-            # If discharged, auto-create invoice
-            if status == "Discharged":
-                self.auto_create_discharge_invoice(client, pet)
+            if invoice:
+                self.show_discharge_invoice(*invoice)
 
             # Refresh table
             self.load_pet_status()
@@ -148,30 +161,13 @@ class PetStatusFrame(tk.Frame):
         except Exception as e:
             messagebox.showerror("Error", f"Error updating status: {e}")
 
-    def auto_create_discharge_invoice(self, client, pet):
-        """Auto-create invoice when pet is discharged"""
+    def on_status_failed(self, error):
+        self.saving = False
+        messagebox.showerror("Error", f"Error updating status: {error}")
+
+    def show_discharge_invoice(self, invoice_no, total_amount):
+        """Report the discharge invoice and refresh the invoices list"""
         try:
-            # Calculate total treatment costs
-            treatments = self.controller.db.fetch_treatments()
-            treatment_costs = {
-                "Checkup": 50, "Vaccination": 75, "Surgery": 500,
-                "Dental Cleaning": 150, "X-Ray": 100, "Blood Test": 80,
-                "Grooming": 60, "Wound Care": 120, "Physical Therapy": 100,
-                "Medication": 40
-            }
-            
-            total_amount = 0
-            for treatment in treatments:
-                if treatment[3] == client and treatment[2] == pet:  # client and pet match
-                    treatment_type = treatment[4]
-                    total_amount += treatment_costs.get(treatment_type, 50)
-
-            # Create invoice
-            invoice_no = "INV-" + datetime.now().strftime("%Y%m%d%H%M%S")
-            date = datetime.now().strftime("%Y-%m-%d")
-            
-            invoice_data = [invoice_no, client, pet, total_amount, date, "Unpaid"]
-            self.controller.db.insert_invoice(invoice_data)
             messagebox.showinfo("Success", f"Invoice automatically created: {invoice_no}\nAmount: ${total_amount:.2f}")
 
             # Refresh invoices frame
@@ -180,7 +176,7 @@ class PetStatusFrame(tk.Frame):
                 if callable(fn):
                     fn()
         except Exception as e:
-            print(f"Error creating discharge invoice: {e}")
+            log.exception("Error showing discharge invoice: %s", e)
 
     def create_back_button(self):
         tk.Button(self, text="Back to Dashboard", bg="#334155", fg="white", 
@@ -1,7 +1,10 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 from datetime import datetime, timedelta
 
+import reporting
+from exporter import export, export_sources
+
 class ReportsFrame(tk.Frame):
     def __init__(self, parent, controller):
         super().__init__(parent, bg="#f4f6f9")
@@ -38,6 +41,12 @@ class ReportsFrame(tk.Frame):
         tk.Button(button_frame, text="Print Report", bg="#6366f1", fg="white", width=18,
                   command=self.print_report).grid(row=1, column=3, padx=5, pady=5)
 
+        # Row 3
+        tk.Button(button_frame, text="Export Data...", bg="#0ea5e9", fg="white", width=18,
+                  command=self.show_export_dialog).grid(row=2, column=0, padx=5, pady=5)
+        tk.Button(button_frame, text="AR Aging", bg="#dc2626", fg="white", width=18,
+                  command=self.generate_ar_aging).grid(row=2, column=1, padx=5, pady=5)
+
     def create_report_area(self):
         """Create area to display reports"""
         frame = tk.Frame(self, bg="white")
@@ -55,336 +64,56 @@ class ReportsFrame(tk.Frame):
     def generate_daily_revenue(self):
         """Generate daily revenue report"""
         try:
-            today = datetime.now().strftime("%Y-%m-%d")
-            invoices = self.controller.db.fetch_invoices()
-            
-            total_revenue = 0
-            paid_revenue = 0
-            unpaid_revenue = 0
-            count = 0
-            
-            for invoice in invoices:
-                if invoice[5] == today:  # invoice[5] is date
-                    count += 1
-                    amount = invoice[4]  # invoice[4] is amount
-                    total_revenue += amount
-                    
-                    if invoice[6] == "Paid":  # invoice[6] is status
-                        paid_revenue += amount
-                    else:
-                        unpaid_revenue += amount
-
-            report = f"""
-{'='*60}
-                   DAILY REVENUE REPORT
-{'='*60}
-Date:                    {today}
-Generated:               {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
-
-{'='*60}
-SUMMARY
-{'='*60}
-Total Invoices:          {count}
-Total Revenue:           ${total_revenue:.2f}
-Paid Revenue:            ${paid_revenue:.2f}
-Unpaid Revenue:          ${unpaid_revenue:.2f}
-
-{'='*60}
-END OF REPORT
-{'='*60}
-"""
-            self.display_report(report)
+            self.display_report(reporting.daily_revenue(self.controller.repo))
         except Exception as e:
             messagebox.showerror("Error", f"Error generating report: {e}")
 
     def generate_monthly_revenue(self):
         """Generate monthly revenue report"""
         try:
-            today = datetime.now()
-            month_start = today.strftime("%Y-%m-01")
-            month_end = today.strftime("%Y-%m-%d")
-            
-            invoices = self.controller.db.fetch_invoices()
-            
-            total_revenue = 0
-            paid_revenue = 0
-            unpaid_revenue = 0
-            count = 0
-            
-            for invoice in invoices:
-                invoice_date = invoice[5]  # invoice[5] is date
-                if month_start <= invoice_date <= month_end:
-                    count += 1
-                    amount = invoice[4]  # invoice[4] is amount
-                    total_revenue += amount
-                    
-                    if invoice[6] == "Paid":  # invoice[6] is status
-                        paid_revenue += amount
-                    else:
-                        unpaid_revenue += amount
-
-            month_name = today.strftime("%B %Y")
-            
-            report = f"""
-{'='*60}
-                   MONTHLY REVENUE REPORT
-{'='*60}
-Month:                   {month_name}
-Period:                  {month_start} to {month_end}
-Generated:               {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
-
-{'='*60}
-SUMMARY
-{'='*60}
-Total Invoices:          {count}
-Total Revenue:           ${total_revenue:.2f}
-Paid Revenue:            ${paid_revenue:.2f}
-Unpaid Revenue:          ${unpaid_revenue:.2f}
-
-{'='*60}
-END OF REPORT
-{'='*60}
-"""
-            self.display_report(report)
+            self.display_report(reporting.monthly_revenue(self.controller.repo))
         except Exception as e:
             messagebox.showerror("Error", f"Error generating report: {e}")
 
     def generate_treatment_summary(self):
         """Generate treatment summary report"""
         try:
-            treatments = self.controller.db.fetch_treatments()
-            
-            treatment_types = {}
-            total_treatments = 0
-            
-            for treatment in treatments:
-                treatment_type = treatment[4]  # treatment[4] is treatment_type
-                total_treatments += 1
-                
-                if treatment_type not in treatment_types:
-                    treatment_types[treatment_type] = 0
-                treatment_types[treatment_type] += 1
-
-            # Calculate revenue by treatment
-            treatment_costs = {
-                "Checkup": 50,
-                "Vaccination": 75,
-                "Surgery": 500,
-                "Dental Cleaning": 150,
-                "X-Ray": 100,
-                "Blood Test": 80,
-                "Grooming": 60,
-                "Wound Care": 120,
-                "Physical Therapy": 100,
-                "Medication": 40
-            }
-
-            report = f"""
-{'='*60}
-                   TREATMENT SUMMARY REPORT
-{'='*60}
-Generated:               {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
-
-{'='*60}
-TREATMENT BREAKDOWN
-{'='*60}
-Total Treatments:        {total_treatments}
-
-"""
-            total_treatment_revenue = 0
-            for treatment_type, count in sorted(treatment_types.items()):
-                cost = treatment_costs.get(treatment_type, 0)
-                revenue = cost * count
-                total_treatment_revenue += revenue
-                report += f"{treatment_type:<30} {count:>5} (${revenue:.2f})\n"
-
-            report += f"""
-{'='*60}
-Total Treatment Revenue: ${total_treatment_revenue:.2f}
-{'='*60}
-END OF REPORT
-{'='*60}
-"""
-            self.display_report(report)
+            self.display_report(reporting.treatment_summary(self.controller.repo))
         except Exception as e:
             messagebox.showerror("Error", f"Error generating report: {e}")
 
     def generate_client_summary(self):
         """Generate client summary report"""
         try:
-            clients = self.controller.db.fetch_clients()
-            animals = self.controller.db.fetch_animals()
-            invoices = self.controller.db.fetch_invoices()
-            
-            total_clients = len(clients)
-            total_animals = len(animals)
-            total_invoices = len(invoices)
-            
-            # Count animals by species
-            species_count = {}
-            for animal in animals:
-                species = animal[2]  # animal[2] is species
-                if species not in species_count:
-                    species_count[species] = 0
-                species_count[species] += 1
-
-            # Calculate payment status
-            paid_count = sum(1 for inv in invoices if inv[6] == "Paid")
-            unpaid_count = sum(1 for inv in invoices if inv[6] == "Unpaid")
-
-            report = f"""
-{'='*60}
-                   CLIENT SUMMARY REPORT
-{'='*60}
-Generated:               {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
-
-{'='*60}
-STATISTICS
-{'='*60}
-Total Clients:           {total_clients}
-Total Animals:           {total_animals}
-Total Invoices:          {total_invoices}
-
-{'='*60}
-ANIMALS BY SPECIES
-{'='*60}
-"""
-            for species, count in sorted(species_count.items()):
-                report += f"{species:<30} {count:>5}\n"
-
-            report += f"""
-{'='*60}
-PAYMENT STATUS
-{'='*60}
-Paid Invoices:           {paid_count}
-Unpaid Invoices:         {unpaid_count}
-
-{'='*60}
-END OF REPORT
-{'='*60}
-"""
-            self.display_report(report)
+            self.display_report(reporting.client_summary(self.controller.repo))
         except Exception as e:
             messagebox.showerror("Error", f"Error generating report: {e}")
 
     def generate_appointment_summary(self):
         """Generate appointment summary report"""
         try:
-            appointments = self.controller.db.fetch_appointments()
-            
-            total_appointments = len(appointments)
-            reason_count = {}
-            
-            for appt in appointments:
-                reason = appt[5]  # appt[5] is reason
-                if reason not in reason_count:
-                    reason_count[reason] = 0
-                reason_count[reason] += 1
-
-            report = f"""
-{'='*60}
-                   APPOINTMENT SUMMARY REPORT
-{'='*60}
-Generated:               {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
-
-{'='*60}
-APPOINTMENT STATISTICS
-{'='*60}
-Total Appointments:      {total_appointments}
-
-{'='*60}
-APPOINTMENTS BY REASON
-{'='*60}
-"""
-            for reason, count in sorted(reason_count.items()):
-                report += f"{reason:<40} {count:>5}\n"
-
-            report += f"""
-{'='*60}
-END OF REPORT
-{'='*60}
-"""
-            self.display_report(report)
+            self.display_report(reporting.appointment_summary(self.controller.repo))
         except Exception as e:
             messagebox.showerror("Error", f"Error generating report: {e}")
 
     def generate_species_report(self):
         """Generate detailed species report"""
         try:
-            animals = self.controller.db.fetch_animals()
-            
-            species_data = {}
-            
-            for animal in animals:
-                species = animal[2]  # animal[2] is species
-                breed = animal[3]  # animal[3] is breed
-                pet_name = animal[1]  # animal[1] is pet_name
-                owner = animal[5]  # animal[5] is owner_name
-                
-                if species not in species_data:
-                    species_data[species] = []
-                
-                species_data[species].append({
-                    'name': pet_name,
-                    'breed': breed,
-                    'owner': owner
-                })
-
-            report = f"""
-{'='*60}
-                   SPECIES DETAILED REPORT
-{'='*60}
-Generated:               {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
-
-"""
-            for species in sorted(species_data.keys()):
-                animals_list = species_data[species]
-                report += f"""
-{'='*60}
-{species.upper()} ({len(animals_list)} total)
-{'='*60}
-"""
-                for animal in animals_list:
-                    report += f"Name: {animal['name']:<20} Breed: {animal['breed']:<25} Owner: {animal['owner']}\n"
+            self.display_report(reporting.species_report(self.controller.repo))
+        except Exception as e:
+            messagebox.showerror("Error", f"Error generating report: {e}")
 
-            report += f"""
-{'='*60}
-END OF REPORT
-{'='*60}
-"""
-            self.display_report(report)
+    def generate_ar_aging(self):
+        """Generate accounts receivable aging report"""
+        try:
+            self.display_report(reporting.ar_aging(self.controller.db))
         except Exception as e:
             messagebox.showerror("Error", f"Error generating report: {e}")
 
     def generate_outstanding_invoices(self):
         """Generate outstanding (unpaid) invoices report"""
         try:
-            invoices = self.controller.db.fetch_invoices()
-            
-            outstanding = [inv for inv in invoices if inv[6] == "Unpaid"]
-            total_outstanding = sum(inv[4] for inv in outstanding)
-
-            report = f"""
-{'='*60}
-                   OUTSTANDING INVOICES REPORT
-{'='*60}
-Generated:               {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
-
-{'='*60}
-UNPAID INVOICES: {len(outstanding)}
-TOTAL OUTSTANDING: ${total_outstanding:.2f}
-{'='*60}
-
-"""
-            for inv in sorted(outstanding, key=lambda x: x[5]):
-                report += f"Invoice: {inv[1]:<15} Client: {inv[2]:<20} Amount: ${inv[4]:>8.2f}  Date: {inv[5]}\n"
-
-            report += f"""
-{'='*60}
-END OF REPORT
-{'='*60}
-"""
-            self.display_report(report)
+            self.display_report(reporting.outstanding_invoices(self.controller.db))
         except Exception as e:
             messagebox.showerror("Error", f"Error generating report: {e}")
 
@@ -411,6 +140,48 @@ END OF REPORT
         except Exception as e:
             messagebox.showerror("Error", f"Error printing report: {e}")
 
+    def show_export_dialog(self):
+        """Export a table or report to CSV / JSON Lines"""
+        win = tk.Toplevel(self)
+        win.title("Export Data")
+
+        tk.Label(win, text="Table / Report:").grid(row=0, column=0, sticky="w", padx=6, pady=4)
+        source_combo = ttk.Combobox(win, width=28, state="readonly", values=export_sources())
+        source_combo.set("invoices")
+        source_combo.grid(row=0, column=1, padx=6, pady=4)
+
+        tk.Label(win, text="From (YYYY-MM-DD):").grid(row=1, column=0, sticky="w", padx=6, pady=4)
+        from_entry = tk.Entry(win, width=30)
+        from_entry.insert(0, datetime.now().strftime("%Y-01-01"))
+        from_entry.grid(row=1, column=1, padx=6, pady=4)
+
+        tk.Label(win, text="To (YYYY-MM-DD):").grid(row=2, column=0, sticky="w", padx=6, pady=4)
+        to_entry = tk.Entry(win, width=30)
+        to_entry.insert(0, datetime.now().strftime("%Y-%m-%d"))
+        to_entry.grid(row=2, column=1, padx=6, pady=4)
+
+        tk.Label(win, text="Columns (optional):").grid(row=3, column=0, sticky="w", padx=6, pady=4)
+        columns_entry = tk.Entry(win, width=30)
+        columns_entry.grid(row=3, column=1, padx=6, pady=4)
+
+        def do_export():
+            path = filedialog.asksaveasfilename(
+                parent=win, defaultextension=".csv",
+                filetypes=[("CSV", "*.csv"), ("CSV (gzip)", "*.csv.gz"),
+                           ("JSON Lines", "*.jsonl"), ("JSON Lines (gzip)", "*.jsonl.gz")])
+            if not path:
+                return
+            columns = [c.strip() for c in columns_entry.get().split(",") if c.strip()] or None
+            try:
+                count = export(self.controller.db, source_combo.get(), path, columns,
+                               from_entry.get().strip() or None, to_entry.get().strip() or None)
+                messagebox.showinfo("Export", f"Exported {count} rows to {path}", parent=win)
+                win.destroy()
+            except Exception as e:
+                messagebox.showerror("Error", f"Export failed: {e}", parent=win)
+
+        tk.Button(win, text="Export", bg="#2563eb", fg="white", command=do_export).grid(row=4, column=0, columnspan=2, pady=8)
+
     def create_back_button(self):
         tk.Button(self, text="Back to Dashboard", bg="#334155", fg="white", 
                   command=lambda: self.controller.show_frame("DashboardFrame")).pack(pady=10)
\ No newline at end of file
@@ -1,6 +1,8 @@
 import tkinter as tk
 from tkinter import ttk
 
+from frames.table_filler import TreeFiller
+
 class SearchFrame(tk.Frame):
     def __init__(self,parent,controller):
         super().__init__(parent,bg="#f4f6f9")
@@ -22,12 +24,12 @@ class SearchFrame(tk.Frame):
         for col in ("ID","Name","Type","Info"):
             self.table.heading(col,text=col)
             self.table.column(col,width=150)
+        self.count_label=tk.Label(table_frame,text="",bg="#f4f6f9",fg="#6b7280")
+        self.count_label.pack(anchor="w")
+        self.filler=TreeFiller(self.table,self.count_label)
 
         tk.Button(self,text="Back to Dashboard",bg="#334155",fg="white",command=lambda:self.controller.show_frame("DashboardFrame")).pack(pady=10)
 
     def perform_search(self):
         keyword=self.entry.get()
-        self.table.delete(*self.table.get_children())
-        rows=self.controller.db.search_all(keyword)
-        for row in rows:
-            self.table.insert("", "end", values=row)
+        self.filler.load(self.controller.db.search_all(keyword))
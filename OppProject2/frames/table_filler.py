@@ -0,0 +1,109 @@
+import time
+
+
+class TreeFiller:
+    """Fill a ttk.Treeview in small time-boxed slices so the window keeps repainting.
+
+    load() clears the tree and inserts rows a slice at a time, giving each
+    slice at most `budget_ms` of the event loop before rescheduling itself
+    with after(). A new load() cancels the previous one; suspend()/resume()
+    pause filling while the owning frame is hidden. `label` (optional) shows
+    the running row count.
+    """
+
+    def __init__(self, tree, label=None, budget_ms=8, check_every=32, on_done=None):
+        self.tree = tree
+        self.label = label
+        self.budget = budget_ms / 1000.0
+        self.check_every = check_every
+        self.on_done = on_done
+        self.rows = []
+        self.transform = None
+        self.position = 0
+        self.job = None
+        self.generation = 0
+        self.suspended = False
+
+    @property
+    def count(self):
+        return self.position
+
+    @property
+    def loading(self):
+        return self.position < len(self.rows)
+
+    def load(self, rows, transform=None):
+        """Replace the tree contents with `rows` (each passed through `transform`)"""
+        self.cancel()
+        self.generation += 1
+        self.rows = rows if isinstance(rows, list) else list(rows)
+        self.transform = transform
+        self.position = 0
+        self.tree.delete(*self.tree.get_children())
+        self._update_label()
+        if not self.suspended:
+            self._schedule()
+
+    def cancel(self):
+        if self.job is not None:
+            try:
+                self.tree.after_cancel(self.job)
+            except Exception:
+                pass
+            self.job = None
+
+    def suspend(self):
+        """Stop filling (frame hidden); resume() continues where it stopped"""
+        self.suspended = True
+        self.cancel()
+
+    def resume(self):
+        self.suspended = False
+        if self.loading and self.job is None:
+            self._schedule()
+
+    def _schedule(self):
+        generation = self.generation
+        self.job = self.tree.after(1, lambda: self._fill_slice(generation))
+
+    def _fill_slice(self, generation):
+        self.job = None
+        if generation != self.generation or self.suspended:
+            return
+        try:
+            if not self.tree.winfo_exists():
+                return
+        except Exception:
+            return
+
+        rows, transform, insert = self.rows, self.transform, self.tree.insert
+        end = len(rows)
+        deadline = time.perf_counter() + self.budget
+        pos = self.position
+        while pos < end:
+            stop = min(pos + self.check_every, end)
+            for row in rows[pos:stop]:
+                # Tk only splits real tuples/lists into columns
+                insert("", "end", values=transform(row) if transform else tuple(row))
+            pos = stop
+            if time.perf_counter() >= deadline:
+                break
+        self.position = pos
+        self._update_label()
+
+        if pos < end:
+            self._schedule()
+        else:
+            self.rows = []  # the tree holds the values now
+            self.position = end
+            if self.on_done:
+                self.on_done(end)
+
+    def _update_label(self):
+        if self.label is None:
+            return
+        total = len(self.rows) if self.rows else self.position
+        if self.position < total:
+            self.label.config(text=f"Loading... {self.position:,} of {total:,} rows")
+        else:
+            self.label.config(text=f"{self.position:,} rows")
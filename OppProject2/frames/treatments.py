@@ -1,6 +1,11 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 
+import applog
+from frames.paged_table import PagedTable
+
+log = applog.get_logger("frames.treatments")
+
 class TreatmentsFrame(tk.Frame):
     def __init__(self, parent, controller):
         super().__init__(parent, bg="#f4f6f9")
@@ -82,47 +87,45 @@ class TreatmentsFrame(tk.Frame):
     def load_appointments(self):
         """Load appointments into dropdown"""
         try:
-            rows = self.controller.db.fetch_appointments()
-            appointment_display = [f"{row[1]} - {row[2]} ({row[5]})" for row in rows]  # Client - Pet (Reason)
-            self.appointment_combo['values'] = appointment_display
-            self.appointment_data = {f"{row[1]} - {row[2]} ({row[5]})": row for row in rows}
+            self.appointments = self.controller.repo.fetch_appointments()
+            # the id keeps entries unique when client, pet and reason repeat
+            self.appointment_combo['values'] = [appt.label() for appt in self.appointments]
         except Exception as e:
-            print(f"Error loading appointments: {e}")
+            log.exception("Error loading appointments: %s", e)
 
     def on_appointment_select(self, event):
         """Auto-populate fields when appointment is selected"""
         try:
-            selected = self.appointment_combo.get()
-            if selected in self.appointment_data:
-                appt = self.appointment_data[selected]
-                # appt = (ID, client_name, pet_name, date, time, reason)
-                
+            index = self.appointment_combo.current()
+            if index >= 0:
+                appt = self.appointments[index]
+
                 self.client_entry.config(state="normal")
                 self.client_entry.delete(0, tk.END)
-                self.client_entry.insert(0, appt[1])
+                self.client_entry.insert(0, appt.client_name)
                 self.client_entry.config(state="readonly")
 
                 self.pet_entry.config(state="normal")
                 self.pet_entry.delete(0, tk.END)
-                self.pet_entry.insert(0, appt[2])
+                self.pet_entry.insert(0, appt.pet_name)
                 self.pet_entry.config(state="readonly")
 
                 self.reason_entry.config(state="normal")
                 self.reason_entry.delete(0, tk.END)
-                self.reason_entry.insert(0, appt[5])
+                self.reason_entry.insert(0, appt.reason)
                 self.reason_entry.config(state="readonly")
 
                 self.date_entry.config(state="normal")
                 self.date_entry.delete(0, tk.END)
-                self.date_entry.insert(0, appt[3])
+                self.date_entry.insert(0, appt.date)
                 self.date_entry.config(state="readonly")
                 
                 # Auto-suggest treatment type based on reason
-                reason = appt[5].lower()
+                reason = (appt.reason or "").lower()
                 suggested_treatment = self.suggest_treatment(reason)
                 self.treatment_combo.current(self.treatment_types.index(suggested_treatment) if suggested_treatment in self.treatment_types else 0)
         except Exception as e:
-            print(f"Error selecting appointment: {e}")
+            log.exception("Error selecting appointment: %s", e)
 
     def suggest_treatment(self, reason):
         """Suggest treatment type based on appointment reason"""
@@ -148,22 +151,24 @@ class TreatmentsFrame(tk.Frame):
         return "Checkup"  # Default
 
     def create_table(self):
-        frame = tk.Frame(self, bg="#f4f6f9")
-        frame.pack(pady=10, fill="both", expand=True)
-
-        columns = ("ID", "Reason", "Pet", "Client", "Treatment Type", "Date", "Confined", "Notes")
-        self.tree = ttk.Treeview(frame, columns=columns, show="headings")
-        for col in columns:
-            self.tree.heading(col, text=col)
-            self.tree.column(col, width=90)
-
-        self.tree.pack(fill="both", expand=True, padx=20, pady=20)
+        columns = [
+            ("ID", "id"),
+            ("Reason", "reason"),
+            ("Pet", "pet"),
+            ("Client", "client"),
+            ("Treatment Type", "treatment_type"),
+            ("Date", "date"),
+            ("Confined", "confined"),
+            ("Notes", "notes"),
+        ]
+        self.table = PagedTable(self, self.controller.db, "treatments", columns,
+                                sort="date", descending=True, width=90)
+        self.table.pack(pady=10, padx=20, fill="both", expand=True)
+        self.tree = self.table.tree
+        self.filler = self.table.filler
 
     def load_treatments(self):
-        self.tree.delete(*self.tree.get_children())
-        rows = self.controller.db.fetch_treatments()
-        for row in rows:
-            self.tree.insert("", "end", values=row)
+        self.table.reload()
 
     def add_treatment(self):
         """Add treatment and refresh table"""
@@ -2,10 +2,13 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime
 
+import services
+
 class WalkInFrame(tk.Frame):
     def __init__(self, parent, controller):
         super().__init__(parent, bg="#f4f6f9")
         self.controller = controller
+        self.saving = False
 
         tk.Label(self, text="Walk-In / New Appointment", font=("Segoe UI", 20), bg="#f4f6f9").pack(pady=10)
 
@@ -143,14 +146,18 @@ class WalkInFrame(tk.Frame):
         data.append(datetime.now().strftime("%Y-%m-%d"))
         # data format now: [client_name, contact, address, pet_name, species, breed, age, reason, date]
 
-        # Insert walk-in and process to other tables
-        try:
-            self.controller.db.insert_walkin(data)
-            self.controller.process_walkin(data)
-            messagebox.showinfo("Success", "Walk-In added and records created in all modules!")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to add walk-in: {e}")
+        if self.saving:
             return
+        self.saving = True
+
+        # Insert walk-in and process to other tables on the database worker
+        self.controller.worker.submit(services.process_walkin, data, record_walkin=True,
+                                      on_done=self.on_walkin_saved, on_error=self.on_walkin_failed)
+
+    def on_walkin_saved(self, result):
+        self.saving = False
+        self.controller.refresh_all_frames()
+        messagebox.showinfo("Success", "Walk-In added and records created in all modules!")
 
         # Clear form
         for key, widget in list(self.entries.items()):
@@ -162,6 +169,10 @@ class WalkInFrame(tk.Frame):
             except Exception:
                 pass
 
+    def on_walkin_failed(self, error):
+        self.saving = False
+        messagebox.showerror("Error", f"Failed to add walk-in: {error}")
+
     def create_back_button(self):
         tk.Button(self, text="Back to Dashboard", bg="#334155", fg="white",
                   command=lambda: self.controller.show_frame("DashboardFrame")).pack(pady=10)
\ No newline at end of file
@@ -0,0 +1,517 @@
+import argparse
+import csv
+import gzip
+import json
+import sys
+import time
+from itertools import islice
+from operator import itemgetter
+
+from database import Database, DB_FILE
+from normalize import clean_str, normalize_species, normalize_breed, coerce_age, parse_date, normalize_pet_status
+from services import walkin_records
+
+DEFAULT_BATCH_SIZE = 5000
+
+# values remembered per memoized column converter (dates, species, amounts...)
+MEMO_LIMIT = 10000
+
+# table -> (columns in insert order, required columns)
+TABLES = {
+    "clients": (("name", "contact", "address"), ("name",)),
+    "animals": (("pet_name", "species", "breed", "age", "owner_name"), ("pet_name",)),
+    "appointments": (("client_name", "pet_name", "date", "time", "reason"), ("client_name",)),
+    "treatments": (("reason", "pet", "client", "treatment_type", "date", "confined", "notes"), ("pet", "client")),
+    "invoices": (("invoice_no", "client", "pet", "amount", "date", "status"), ("invoice_no", "client", "amount")),
+    "pet_status": (("pet", "client", "status", "date", "notes"), ("pet", "client", "status")),
+    "walkins": (("client_name", "contact", "address", "pet_name", "species", "breed", "age", "reason", "date"),
+                ("client_name", "pet_name")),
+}
+
+
+# ===== Column rules =====
+def _amount(value):
+    value = clean_str(value)
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        value = value.replace("$", "").replace(",", "")
+    return float(value)
+
+
+def _invoice_status(value):
+    value = (clean_str(value) or "Unpaid").title()
+    if value not in ("Paid", "Unpaid"):
+        raise ValueError(f"invalid status '{value}' (expected Paid/Unpaid)")
+    return value
+
+
+def _yes_no(value):
+    value = clean_str(value)
+    if isinstance(value, str):
+        return "Yes" if value.lower() in ("yes", "y", "true", "1") else "No"
+    return "Yes" if value else "No"
+
+
+def _appointment_time(value):
+    return clean_str(value) or "09:00"
+
+
+# same rules as VetClinicApp.process_walkin for species/breed/age
+COLUMN_RULES = {
+    "species": normalize_species,
+    "breed": normalize_breed,
+    "age": coerce_age,
+    "date": parse_date,
+    "amount": _amount,
+}
+
+TABLE_RULES = {
+    ("invoices", "status"): _invoice_status,
+    ("pet_status", "status"): normalize_pet_status,
+    ("treatments", "confined"): _yes_no,
+    ("appointments", "time"): _appointment_time,
+}
+
+
+def _rules_for(table):
+    columns, required = TABLES[table]
+    rules = [TABLE_RULES.get((table, col)) or COLUMN_RULES.get(col, clean_str) for col in columns]
+    required_idx = [columns.index(col) for col in required]
+    return rules, required_idx
+
+
+def _memoized(rule):
+    """`rule` with its results remembered (up to MEMO_LIMIT values): the columns
+    with rules repeat a few thousand values at most"""
+    cache = {}
+
+    def convert(value):
+        try:
+            return cache[value]
+        except KeyError:
+            result = rule(value)
+            if len(cache) < MEMO_LIMIT:
+                cache[value] = result
+            return result
+        except TypeError:  # unhashable JSON value
+            return rule(value)
+    return convert
+
+
+def _converters(table, text):
+    """Column converters for one file, same results as the normalize_row rules.
+
+    text: every value is a str (CSV), so plain columns are stripped with
+    str.strip directly (a short row's None makes it raise, and the batch
+    falls back to normalize_row). The other rules are memoized.
+    """
+    rules, _ = _rules_for(table)
+    return [(str.strip if text else clean_str) if rule is clean_str else _memoized(rule) for rule in rules]
+
+
+def normalize_row(table, values, rules=None, required_idx=None):
+    """Clean and validate one row (values aligned to TABLES[table] columns).
+
+    Raises ValueError with a readable message when the row must be rejected.
+    """
+    if rules is None:
+        rules, required_idx = _rules_for(table)
+    columns = TABLES[table][0]
+    try:
+        row = [rule(value) for rule, value in zip(rules, values)]
+    except Exception:
+        # redo column by column to report which value is bad
+        for col, rule, value in zip(columns, rules, values):
+            try:
+                rule(value)
+            except Exception as e:
+                raise ValueError(f"{col}: {e}")
+        raise
+    for i in required_idx:
+        if row[i] is None or row[i] == "":
+            raise ValueError(f"{columns[i]} is required")
+    return row
+
+
+# ===== Streaming readers =====
+class BadRecord(ValueError):
+    """Yielded by the readers in place of the values of a record that can't be
+    decoded (or isn't an object), so the importer rejects it and carries on"""
+
+    def __init__(self, message, raw):
+        super().__init__(message)
+        self.raw = raw
+
+
+def _header_key(name):
+    return str(name or "").strip().lower().replace(" ", "_").replace("-", "_")
+
+
+def _open_text(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+def _iter_csv(f, columns):
+    reader = csv.reader(f)
+    header = next(reader, None)
+    if header is None:
+        return
+    index = {_header_key(h): i for i, h in enumerate(header)}
+    positions = [index.get(col) for col in columns]
+    # every column present: a full-length row is picked in C (a tuple)
+    pick = itemgetter(*positions) if None not in positions and len(positions) > 1 else None
+    width = max(p for p in positions if p is not None) + 1 if any(p is not None for p in positions) else 0
+    for values in reader:
+        if not values:
+            continue
+        n = len(values)
+        if pick is not None and n >= width:
+            yield reader.line_num, pick(values)
+        else:
+            yield reader.line_num, [values[p] if p is not None and p < n else None for p in positions]
+
+
+def _iter_json_lines(f, columns):
+    for line_no, line in enumerate(f, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_no, BadRecord(f"invalid JSON: {e}", line)
+            continue
+        yield line_no, _json_values(record, columns, line)
+
+
+def _json_values(record, columns, raw):
+    if not isinstance(record, dict):
+        return BadRecord(f"expected a JSON object, got {type(record).__name__}", raw)
+    record = {_header_key(k): v for k, v in record.items()}
+    return [record.get(col) for col in columns]
+
+
+def _element_end(buf, pos):
+    """Index of the ',' or ']' ending the array element at pos, or None if buf ends first.
+
+    Only used after raw_decode fails, to skip one malformed element.
+    """
+    depth = 0
+    in_string = escaped = False
+    for i in range(pos, len(buf)):
+        c = buf[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif c == "\\":
+                escaped = True
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+        elif c in "[{":
+            depth += 1
+        elif c in "]}":
+            if depth == 0:
+                return i
+            depth -= 1
+        elif c == "," and depth == 0:
+            return i
+    return None
+
+
+def _iter_json_array(f, columns, chunk_size=1 << 16):
+    """Decode a top-level JSON array one object at a time"""
+    decoder = json.JSONDecoder()
+    buf = ""
+    started = False
+    index = 0
+    eof = False
+    while True:
+        pos = 0
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if not started and pos < len(buf):
+                if buf[pos] != "[":
+                    raise ValueError("JSON file must contain an array of objects")
+                started = True
+                pos += 1
+                continue
+            if pos < len(buf) and buf[pos] == "]":
+                return
+            try:
+                record, end = decoder.raw_decode(buf, pos)
+            except ValueError as e:
+                # malformed, or cut off by the end of the chunk: find where the element ends
+                end = _element_end(buf, pos)
+                if end is None and not eof:
+                    break
+                index += 1
+                raw = buf[pos:end]
+                yield index, BadRecord(f"invalid JSON: {e}", raw.strip())
+                if end is None:
+                    return  # truncated file: nothing after this
+                pos = end
+                continue
+            index += 1
+            yield index, _json_values(record, columns, buf[pos:end])
+            pos = end
+        buf = buf[pos:]
+        chunk = f.read(chunk_size)
+        if not chunk:
+            if eof or not buf.strip():
+                return
+            eof = True
+        buf += chunk
+
+
+def file_format(path):
+    """"csv", "jsonl" or "json" from the file name (a .gz suffix is ignored)"""
+    base = path[:-3] if path.endswith(".gz") else path
+    if base.endswith(".csv"):
+        return "csv"
+    if base.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    if base.endswith(".json"):
+        return "json"
+    raise ValueError(f"Unsupported file type: {path} (use .csv, .jsonl or .json)")
+
+
+def iter_rows(path, table):
+    """Yield (line/record number, raw values aligned to the table columns) from a file.
+
+    A JSON record that can't be decoded, or isn't an object, comes as a
+    BadRecord instead of the values.
+    """
+    columns = TABLES[table][0]
+    reader = {"csv": _iter_csv, "jsonl": _iter_json_lines, "json": _iter_json_array}[file_format(path)]
+    with _open_text(path) as f:
+        yield from reader(f, columns)
+
+
+# ===== Loader =====
+class Importer:
+    """Stream rows from a file into one table in batched executemany transactions.
+
+    Rows are cleaned a batch at a time, column by column. An import that
+    changes the schema while it loads -- invoices (rollup and balance
+    triggers dropped) or a table that is empty when it starts (non-unique
+    indexes dropped) -- runs as one BEGIN IMMEDIATE transaction that puts
+    everything back and rebuilds the rollups and balances before its single
+    commit, so no other terminal writes while a trigger or index is
+    missing (the rule Database._sync_triggers follows). Batches are then
+    savepoints. Other imports commit batch by batch.
+    """
+
+    def __init__(self, db, table, batch_size=DEFAULT_BATCH_SIZE, rejects_path=None,
+                 expand_walkins=True, progress=None):
+        if table not in TABLES:
+            raise ValueError(f"Unknown table '{table}'. Choose from: {', '.join(TABLES)}")
+        self.db = db
+        self.table = table
+        self.columns = TABLES[table][0]
+        self.rules, self.required_idx = _rules_for(table)
+        self.batch_size = batch_size
+        self.rejects_path = rejects_path
+        self.expand_walkins = expand_walkins and table == "walkins"
+        # per-row rollup/balance upkeep is slower than one rebuild at the end
+        self.rebuild_after = table == "invoices"
+        self.locked = False  # whole import in one transaction (see class docstring)
+        self.deferred_indexes = []
+        self.converters = None
+        self.progress = progress
+        self.rejects_file = None
+        self.stats = {"read": 0, "imported": 0, "rejected": 0, "seconds": 0.0}
+
+    def reject(self, line_no, values, error):
+        """Count a rejected row; `values` are the row's values or, for a record that
+        could not be decoded, its raw text"""
+        self.stats["rejected"] += 1
+        if not self.rejects_path:
+            return
+        if self.rejects_file is None:
+            self.rejects_file = open(self.rejects_path, "w", encoding="utf-8")
+        record = {"line": line_no, "error": str(error)}
+        if isinstance(values, str):
+            record["raw"] = values
+        else:
+            record["values"] = dict(zip(self.columns, values))
+        self.rejects_file.write(json.dumps(record, default=str) + "\n")
+
+    def normalize(self, batch):
+        """Clean a batch of (line_no, raw values); returns [(line_no, row)] and rejects the rest.
+
+        Each column goes through its converter in one pass. If one raises, a
+        required value is missing or a record is a BadRecord, the batch is
+        redone row by row with normalize_row to find the bad rows.
+        """
+        if not batch:
+            return []
+        try:
+            columns = [list(map(convert, values))
+                       for convert, values in zip(self.converters, zip(*(values for _, values in batch)))]
+        except Exception:
+            columns = None
+        if columns is not None and not any(None in columns[i] or "" in columns[i] for i in self.required_idx):
+            return list(zip([line_no for line_no, _ in batch], zip(*columns)))
+        rows = []
+        for line_no, values in batch:
+            if isinstance(values, BadRecord):
+                self.reject(line_no, values.raw, values)
+                continue
+            try:
+                rows.append((line_no, normalize_row(self.table, values, self.rules, self.required_idx)))
+            except ValueError as e:
+                self.reject(line_no, values, e)
+        return rows
+
+    def _insert(self, rows):
+        """Insert one batch (plus walk-in expansions) in a single transaction, or savepoint when locked"""
+        if self.locked:
+            self.db.cursor.execute("SAVEPOINT import_batch")
+        try:
+            self.db.bulk_insert(self.table, self.columns, rows, commit=False, rollback=not self.locked)
+            if self.expand_walkins:
+                extra = {"clients": [], "animals": [], "appointments": []}
+                for row in rows:
+                    # same records VetClinicApp.process_walkin creates
+                    for table, values in zip(extra, walkin_records(row)):
+                        extra[table].append(values)
+                for table, values in extra.items():
+                    self.db.bulk_insert(table, TABLES[table][0], values, commit=False, rollback=not self.locked)
+        except Exception:
+            if self.locked:
+                self.db.cursor.execute("ROLLBACK TO import_batch")
+                self.db.cursor.execute("RELEASE import_batch")
+            raise
+        if self.locked:
+            self.db.cursor.execute("RELEASE import_batch")
+        else:
+            self.db.commit()
+
+    def flush(self, batch):
+        if not batch:
+            return
+        rows = [row for _, row in batch]
+        try:
+            self._insert(rows)
+            self.stats["imported"] += len(rows)
+        except Exception:
+            # something slipped past validation: retry row by row to isolate it
+            for line_no, row in batch:
+                try:
+                    self._insert([row])
+                    self.stats["imported"] += 1
+                except Exception as e:
+                    self.reject(line_no, row, e)
+
+    def _begin(self):
+        """Take the write lock for the whole import if it drops triggers or indexes (see class docstring)"""
+        tables = [self.table] + (["clients", "animals", "appointments"] if self.expand_walkins else [])
+        self.db.cursor.execute("BEGIN IMMEDIATE")
+        # checked under the lock: another terminal may have written meanwhile
+        empty = [table for table in tables
+                 if self.db.cursor.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone() is None]
+        self.locked = self.rebuild_after or bool(empty)
+        if not self.locked:
+            self.db.commit()
+            return
+        for table in empty:
+            self.deferred_indexes += self.db.drop_indexes(table)
+        if self.rebuild_after:
+            self.db.drop_revenue_triggers()
+            self.db.drop_balance_triggers()
+
+    def _finish(self):
+        """Put the indexes and triggers back, rebuild what the triggers keep and commit"""
+        if not self.locked:
+            return
+        if self.rebuild_after:
+            # gives imported Paid invoices their "Settled" payment, then the rollups
+            # (built from paid_amount) get their triggers back and are rebuilt
+            self.db.rebuild_balances(commit=False)
+            self.db.create_revenue_rollups()
+        # after the rebuild, which rewrites paid_amount (in idx_invoices_due)
+        for statement in self.deferred_indexes:
+            self.db.cursor.execute(statement)
+        self.db.commit()
+
+    def run(self, path):
+        """Import every row of `path`; returns the stats dict"""
+        start = time.perf_counter()
+        self.converters = _converters(self.table, text=file_format(path) == "csv")
+        rows = iter_rows(path, self.table)
+        self._begin()
+        try:
+            while True:
+                batch = list(islice(rows, self.batch_size))
+                if not batch:
+                    break
+                self.stats["read"] += len(batch)
+                self.flush(self.normalize(batch))
+                self._report(start)
+            self._finish()
+        except BaseException:
+            if self.locked:
+                # all or nothing: the rollback also restores the triggers and indexes
+                self.db.rollback()
+                self.stats["imported"] = 0
+            raise
+        finally:
+            if self.rejects_file is not None:
+                self.rejects_file.close()
+            self.stats["seconds"] = time.perf_counter() - start
+        self._report(start)
+        return self.stats
+
+    def _report(self, start):
+        if self.progress:
+            elapsed = time.perf_counter() - start
+            self.progress(dict(self.stats, seconds=elapsed))
+
+
+def import_file(db, table, path, **kwargs):
+    """Convenience wrapper: Importer(db, table, **kwargs).run(path)"""
+    return Importer(db, table, **kwargs).run(path)
+
+
+def print_progress(stats):
+    rate = stats["imported"] / stats["seconds"] if stats["seconds"] else 0
+    sys.stderr.write(f"\rRead {stats['read']}  imported {stats['imported']}  "
+                     f"rejected {stats['rejected']}  ({rate:,.0f} rows/s)")
+    sys.stderr.flush()
+
+
+def add_arguments(parser):
+    parser.add_argument("table", choices=sorted(TABLES))
+    parser.add_argument("file", help=".csv, .jsonl or .json file (optionally .gz)")
+    parser.add_argument("--db", default=DB_FILE, help="database file")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--rejects", help="write rejected rows to this JSONL file")
+    parser.add_argument("--no-expand", action="store_true",
+                        help="walkins only: do not create client/animal/appointment rows")
+
+
+def run(args):
+    db = Database(args.db)
+    stats = import_file(db, args.table, args.file, batch_size=args.batch_size, rejects_path=args.rejects,
+                        expand_walkins=not args.no_expand, progress=print_progress)
+    sys.stderr.write("\n")
+    print(f"Imported {stats['imported']} of {stats['read']} rows into {args.table} "
+          f"in {stats['seconds']:.2f}s ({stats['rejected']} rejected)")
+    db.conn.close()
+    return 1 if stats["rejected"] else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import CSV / JSON Lines / JSON into the clinic database")
+    add_arguments(parser)
+    return run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
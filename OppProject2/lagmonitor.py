@@ -0,0 +1,189 @@
+import json
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime, timedelta
+
+import applog
+import metrics
+
+# Tk event loop watchdog. A heartbeat scheduled with after() every
+# `interval_ms` measures how late the mainloop runs it (the lag every click
+# and repaint sees at that moment). A sampler thread watches the heartbeat;
+# when none has run for `stall_ms` it grabs the main thread's Python stack
+# (sys._current_frames) every `stall_ms` until the loop recovers, and the
+# stall goes into the stall log with its start time, length, the frame on
+# screen and the stacks.
+
+
+log = applog.get_logger("lagmonitor")
+
+UI_LAG = metrics.histogram("vetclinic_ui_lag_seconds", "How late the Tk event loop ran its heartbeat")
+UI_STALLS = metrics.counter("vetclinic_ui_stalls_total", "Times the Tk event loop was blocked past the stall threshold")
+
+
+def main_thread_stack(limit=40):
+    """Current Python stack of the main thread as "file:line function" lines, innermost last"""
+    frame = sys._current_frames().get(threading.main_thread().ident)
+    if frame is None:
+        return []
+    return [f"{entry.filename}:{entry.lineno} {entry.name}"
+            for entry in traceback.extract_stack(frame, limit=limit)]
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(p / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class LagMonitor:
+    """Event loop latency and stall log for a Tk root.
+
+    `active` is a callable returning the name of the frame on screen.
+    Samples are kept for the last `window` heartbeats, stalls for the last
+    `max_stalls`; each finished stall is also appended to `log_path` as a
+    JSON line when set.
+    """
+
+    def __init__(self, root, active=None, interval_ms=50, stall_ms=250, log_path=None,
+                 window=6000, max_stalls=100, max_stacks=5):
+        self.root = root
+        self.active = active or (lambda: "")
+        self.interval = interval_ms / 1000.0
+        self.stall_ms = stall_ms
+        self.log_path = log_path
+        self.max_stacks = max_stacks
+        self.latencies = deque(maxlen=window)  # ms late, per heartbeat
+        self.stalls = deque(maxlen=max_stalls)
+        self.stall_count = 0
+        self.current = None  # stall in progress (sampler thread fills in stacks)
+        self.last_beat = time.perf_counter()
+        self.expected = None
+        self.job = None
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.stopping.clear()
+        self.last_beat = time.perf_counter()
+        self._schedule()
+        self.thread = threading.Thread(target=self._watch, name="lag-sampler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        if self.job is not None:
+            try:
+                self.root.after_cancel(self.job)
+            except Exception:
+                pass
+            self.job = None
+        if self.thread is not None:
+            self.thread.join(1)
+            self.thread = None
+
+    # ===== Tk thread =====
+    def _schedule(self):
+        self.expected = time.perf_counter() + self.interval
+        self.job = self.root.after(int(self.interval * 1000), self._beat)
+
+    def _beat(self):
+        now = time.perf_counter()
+        lag = max(0.0, (now - self.expected) * 1000)
+        with self.lock:
+            self.latencies.append(lag)
+            self.last_beat = now
+            stall, self.current = self.current, None
+        UI_LAG.observe(lag / 1000)
+        if stall is not None:
+            self._finish_stall(stall, now)
+        if not self.stopping.is_set():
+            self._schedule()
+
+    def _finish_stall(self, stall, now):
+        stall["ms"] = round((now - stall["started"]) * 1000, 1)
+        del stall["started"]
+        where = stall["stacks"][0][-1] if stall["stacks"] and stall["stacks"][0] else "?"
+        log.warning("UI stall: %.0f ms on %s (%s)", stall["ms"], stall["frame"], where,
+                    extra={"ms": stall["ms"], "stalled_frame": stall["frame"], "where": where})
+        with self.lock:
+            self.stalls.append(stall)
+            log_path = self.log_path
+        if log_path:
+            try:
+                with open(log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(stall) + "\n")
+            except OSError as e:
+                log.error("Error writing stall log: %s", e)
+
+    # ===== Sampler thread =====
+    def _watch(self):
+        threshold = self.stall_ms / 1000.0
+        while not self.stopping.wait(min(threshold / 4, 0.05)):
+            with self.lock:
+                last_beat = self.last_beat
+                stall = self.current
+            # the next heartbeat is only due `interval` after the last one
+            if time.perf_counter() - last_beat - self.interval < threshold:
+                continue
+            if stall is None:
+                started = last_beat + self.interval
+                stall = {
+                    "time": (datetime.now() - timedelta(seconds=time.perf_counter() - started))
+                    .isoformat(timespec="milliseconds"),
+                    "started": started,
+                    "frame": self._active_frame(),
+                    "stacks": [],
+                }
+                stall_sampled = 0.0
+            elif len(stall["stacks"]) >= self.max_stacks or time.perf_counter() - stall_sampled < threshold:
+                continue
+            stack = main_thread_stack()
+            stall_sampled = time.perf_counter()
+            with self.lock:
+                if self.last_beat != last_beat:
+                    continue  # the loop recovered meanwhile
+                if self.current is None:
+                    self.current = stall
+                    self.stall_count += 1
+                    UI_STALLS.inc()
+                stall["stacks"].append(stack)
+
+    def _active_frame(self):
+        try:
+            return self.active()
+        except Exception:
+            return "?"
+
+    # ===== Reading =====
+    def summary(self):
+        """Latency percentiles (ms) over the recent heartbeats, plus stall counts"""
+        with self.lock:
+            values = sorted(self.latencies)
+            stalls = self.stall_count
+            stalling = self.current is not None
+        return {
+            "samples": len(values),
+            "p50_ms": percentile(values, 50),
+            "p90_ms": percentile(values, 90),
+            "p99_ms": percentile(values, 99),
+            "max_ms": values[-1] if values else 0.0,
+            "stalls": stalls,
+            "stalling": stalling,
+        }
+
+    def stall_log(self):
+        """Finished stalls, newest first"""
+        with self.lock:
+            return list(reversed(self.stalls))
+
+    def reset(self):
+        with self.lock:
+            self.latencies.clear()
+            self.stalls.clear()
+            self.stall_count = 0
@@ -0,0 +1,387 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import random
+import sqlite3
+import sys
+import time
+from collections import defaultdict
+
+import datagen
+import reporting
+import services
+from database import Database
+from lagmonitor import percentile
+
+# Load test for several front-desk PCs sharing one database file. Each worker
+# process opens its own Database on the file and runs the flows the frames
+# run (through services, no Tk) at a target rate, for a fixed duration:
+#     walkin     process_walkin (client, animal, appointment, walk-in rows)
+#     treatment  insert a treatment, then add its cost to the latest invoice
+#     billing    page unpaid invoices, mark one paid, build its receipt
+#     status     update_pet_status (Discharged also bills the stay)
+#     report     one of the reporting builders
+# Arrivals are Poisson at --rate flows/s per worker (0: back to back).
+#
+# "database is locked" shows up two ways: raised (bulk_insert, used by the
+# walk-in flow) or swallowed and logged by the single-row Database methods.
+# Both are counted -- the logged ones by a handler on the "vetclinic"
+# logger -- and the step that failed is retried after a short backoff, as
+# the user would click again, up to --retries times. A flow is one step
+# unless it commits more than once (treatment): steps already committed are
+# not run again, or a retry would insert the same treatment twice.
+#
+#     python -m cli loadtest load.db --workers 6 --duration 30 --wal
+
+FLOWS = ("walkin", "treatment", "billing", "status", "report")
+DEFAULT_MIX = "walkin=3,treatment=3,billing=2,status=1,report=1"
+RETRY_BACKOFF = 0.05  # seconds, doubled per attempt
+POLL_INTERVAL = 0.5  # seconds between checks for dead workers while collecting results
+
+
+def _is_locked(error):
+    return isinstance(error, sqlite3.OperationalError) and (
+        "locked" in str(error) or "busy" in str(error))
+
+
+class LockCounter(logging.Handler):
+    """Counts lock errors that Database methods caught and logged"""
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.locked = 0
+        self.other = 0
+
+    def emit(self, record):
+        error = record.exc_info[1] if record.exc_info else None
+        if _is_locked(error):
+            self.locked += 1
+        elif error is not None:
+            self.other += 1
+
+
+class Worker:
+    """The flows of one simulated front-desk PC"""
+
+    def __init__(self, db, rnd, max_retries):
+        self.db = db
+        self.rnd = rnd
+        self.max_retries = max_retries
+        self.errors = LockCounter()
+        logger = logging.getLogger("vetclinic")
+        logger.addHandler(self.errors)
+        logger.propagate = False  # no traceback on stderr per swallowed error
+        self.pets = db.conn.execute(
+            "SELECT owner_name, pet_name FROM animals ORDER BY RANDOM() LIMIT 2000").fetchall()
+        self.serial = 0
+
+    def _pet(self):
+        if self.pets:
+            return self.rnd.choice(self.pets)
+        return ("Load Client", "Load Pet")
+
+    # ===== Flows =====
+    def walkin(self):
+        self.serial += 1
+        pet = self.rnd.choice(datagen.PET_NAMES)
+        walkin = (f"Load Client {os.getpid()}-{self.serial}", "09170000000", "Calatagan", pet,
+                  "Dog", "Mixed", 3, "Checkup", services.today())
+        services.process_walkin(self.db, walkin, record_walkin=True)
+
+    def treatment_steps(self):
+        # two commits, retried separately (see run)
+        client, pet = self._pet()
+        treatment_type = self.rnd.choice(list(services.TREATMENT_COSTS))
+        return [
+            lambda: self.db.insert_treatment_with_type(
+                [treatment_type, pet, client, treatment_type, services.today(), "No", ""]),
+            lambda: services.add_treatment_cost(self.db, client, treatment_type),
+        ]
+
+    def billing(self):
+        unpaid = self.db.fetch_page("invoices", "date", True, {"status": "Unpaid"}, limit=50)
+        if unpaid:
+            invoice = self.rnd.choice(unpaid)
+            services.mark_invoice_paid(self.db, invoice.id)
+            services.receipt_for(self.db, invoice.id)
+
+    def status(self):
+        client, pet = self._pet()
+        status = self.rnd.choice(("Confined", "Daily Treatment", "Daily Treatment", "Discharged"))
+        services.update_pet_status(self.db, pet, client, status, notes="load test")
+
+    def report(self):
+        name = self.rnd.choice(sorted(reporting.REPORTS))
+        reporting.REPORTS[name](self.db)
+
+    def _steps(self, flow):
+        """The flow's separately retried steps: `<flow>_steps()` if defined, else the flow itself"""
+        steps = getattr(self, f"{flow}_steps", None)
+        return steps() if steps else [getattr(self, flow)]
+
+    def run(self, flow):
+        """Run a flow with retries: (ms including retries, attempts, locked errors, error or None)
+
+        attempts is 1 plus the retries of all steps.
+        """
+        started = time.perf_counter()
+        locked = 0
+        attempt = 1
+        for step in self._steps(flow):
+            for retry in range(self.max_retries + 1):
+                if retry:
+                    attempt += 1
+                seen = self.errors.locked
+                error = None
+                try:
+                    step()
+                except Exception as e:
+                    if self.db.conn.in_transaction:
+                        self.db.rollback()
+                    if not _is_locked(e):
+                        return (time.perf_counter() - started) * 1000, attempt, locked, repr(e)
+                    locked += 1
+                    error = repr(e)
+                if self.errors.locked > seen:
+                    # a caught error can leave the step's transaction open
+                    if self.db.conn.in_transaction:
+                        self.db.rollback()
+                    locked += self.errors.locked - seen
+                    error = "database is locked (logged)"
+                if error is None:
+                    break
+                if retry < self.max_retries:
+                    time.sleep(RETRY_BACKOFF * 2 ** retry * (0.5 + self.rnd.random()))
+            else:
+                return (time.perf_counter() - started) * 1000, attempt, locked, error
+        return (time.perf_counter() - started) * 1000, attempt, locked, None
+
+
+def _worker_main(index, path, options, start, results):
+    """Worker process: wait for the start signal, run flows until the duration is up"""
+    rnd = random.Random(options["seed"] * 1000 + index)
+    flows, weights = zip(*options["mix"].items())
+    samples = []
+    db = worker = None
+    try:
+        db = Database(path)
+        db.conn.execute(f"PRAGMA busy_timeout = {int(options['busy_timeout'])}")
+        worker = Worker(db, rnd, options["retries"])
+        start.wait()
+        end = time.perf_counter() + options["duration"]
+        next_at = time.perf_counter()
+        while True:
+            if options["rate"]:
+                next_at += rnd.expovariate(options["rate"])
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            if time.perf_counter() >= end:
+                break
+            flow = rnd.choices(flows, weights=weights)[0]
+            ms, attempts, locked, error = worker.run(flow)
+            samples.append((flow, ms, attempts, locked, error))
+    finally:
+        if db is not None:
+            db.conn.close()
+        # always report, or the driver would wait for this worker until its timeout
+        results.put((index, samples, worker.errors.other if worker else 0))
+
+
+# ===== Driver =====
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in FLOWS:
+            raise ValueError(f"Unknown flow {name!r} (flows: {', '.join(FLOWS)})")
+        mix[name] = float(weight or 1)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def run_load(path, workers=4, duration=30, rate=5.0, mix=None, busy_timeout=5000, retries=3, seed=1):
+    """Run the workers against `path`; returns the summary dict (see summarize)"""
+    options = dict(duration=duration, rate=rate, mix=mix or parse_mix(DEFAULT_MIX),
+                   busy_timeout=busy_timeout, retries=retries, seed=seed)
+    # spawn, like Windows does, so workers share nothing but the file
+    context = multiprocessing.get_context("spawn")
+    start = context.Event()
+    results = context.Queue()
+    processes = [context.Process(target=_worker_main, args=(i, path, options, start, results),
+                                 name=f"loadtest-{i}", daemon=True) for i in range(workers)]
+    for process in processes:
+        process.start()
+    time.sleep(0.5)  # let the interpreters start so they begin together
+    start.set()
+    started = time.perf_counter()
+    try:
+        collected = _collect(processes, results, started + duration + 300)
+    except RuntimeError:
+        for process in processes:
+            process.terminate()
+        raise
+    elapsed = time.perf_counter() - started
+    for process in processes:
+        process.join(10)
+    return summarize(collected, elapsed, workers, options)
+
+
+def _collect(processes, results, deadline):
+    """Every worker's result tuple; raises RuntimeError as soon as one died without reporting"""
+    collected = {}
+    while len(collected) < len(processes):
+        try:
+            result = results.get(timeout=POLL_INTERVAL)
+        except queue.Empty:
+            dead = [index for index, process in enumerate(processes)
+                    if index not in collected and process.exitcode is not None]
+            if dead:
+                # a worker that reported and exited is still in the pipe: one more read
+                try:
+                    result = results.get(timeout=POLL_INTERVAL)
+                except queue.Empty:
+                    index = dead[0]
+                    raise RuntimeError(f"worker {index} exited with code {processes[index].exitcode} "
+                                       f"without reporting") from None
+            elif time.perf_counter() > deadline:
+                raise RuntimeError("timed out waiting for the workers") from None
+            else:
+                continue
+        collected[result[0]] = result
+    return [collected[index] for index in sorted(collected)]
+
+
+def _latency(values):
+    values = sorted(values)
+    return {
+        "p50_ms": percentile(values, 50),
+        "p95_ms": percentile(values, 95),
+        "p99_ms": percentile(values, 99),
+        "max_ms": values[-1] if values else 0.0,
+    }
+
+
+def summarize(collected, elapsed, workers, options):
+    per_flow = defaultdict(list)
+    other_logged = 0
+    for _, samples, other in collected:
+        other_logged += other
+        for sample in samples:
+            per_flow[sample[0]].append(sample)
+
+    def stats(samples):
+        ok = [s for s in samples if s[4] is None]
+        return {
+            "flows": len(samples),
+            "ok": len(ok),
+            "failed": len(samples) - len(ok),
+            "per_second": len(ok) / elapsed if elapsed else 0.0,
+            "locked_errors": sum(s[3] for s in samples),
+            "retries": sum(s[2] - 1 for s in samples),
+            **_latency([s[1] for s in ok]),
+        }
+
+    every = [sample for samples in per_flow.values() for sample in samples]
+    failures = defaultdict(int)
+    for sample in every:
+        if sample[4] is not None:
+            failures[sample[4]] += 1
+    return {
+        "workers": workers,
+        "seconds": elapsed,
+        "options": options,
+        "total": stats(every),
+        "flows": {flow: stats(per_flow[flow]) for flow in FLOWS if flow in per_flow},
+        "failures": dict(failures),
+        "other_logged_errors": other_logged,
+    }
+
+
+def format_summary(summary):
+    total = summary["total"]
+    lines = [
+        f"{summary['workers']} workers, {summary['seconds']:.1f} s: {total['ok']:,} flows ok "
+        f"({total['per_second']:.1f}/s), {total['failed']} failed, "
+        f"{total['locked_errors']} 'database is locked', {total['retries']} retries",
+        "",
+        f"{'flow':<10} {'ok':>7} {'failed':>7} {'per s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+        f"{'max ms':>9} {'locked':>7} {'retries':>8}",
+    ]
+    for name, row in list(summary["flows"].items()) + [("total", total)]:
+        lines.append(f"{name:<10} {row['ok']:>7,} {row['failed']:>7} {row['per_second']:>8.1f} {row['p50_ms']:>9.1f} "
+                     f"{row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['max_ms']:>9.1f} "
+                     f"{row['locked_errors']:>7} {row['retries']:>8}")
+    if summary["failures"]:
+        lines.append("")
+        lines.append("Failures after retries:")
+        for error, count in sorted(summary["failures"].items(), key=lambda item: -item[1]):
+            lines.append(f"  {count:>6}  {error}")
+    if summary["other_logged_errors"]:
+        lines.append(f"Other errors logged by Database methods: {summary['other_logged_errors']}")
+    return "\n".join(lines) + "\n"
+
+
+# ===== Command line =====
+def add_arguments(parser):
+    parser.add_argument("db", help="shared database file (generated with --clients if missing)")
+    parser.add_argument("--workers", type=int, default=4, help="worker processes (front-desk PCs)")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to run")
+    parser.add_argument("--rate", type=float, default=5.0, help="flows per second per worker (0: no pause)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="flow weights (default %(default)s)")
+    parser.add_argument("--busy-timeout", type=int, default=5000,
+                        help="ms a connection waits on a lock before 'database is locked'")
+    parser.add_argument("--retries", type=int, default=3, help="retries of a flow that hit a lock")
+    parser.add_argument("--wal", action="store_true", help="switch the file to WAL journal mode first")
+    parser.add_argument("--clients", type=int, default=2000, help="size of the generated database")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write the summary to this JSON file")
+
+
+def run(args):
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    if not os.path.exists(args.db):
+        print(f"Generating {args.db} ({args.clients:,} clients)...", file=sys.stderr)
+        db = Database(args.db)
+        try:
+            datagen.generate_clinic(db, clients=args.clients, seed=args.seed)
+        finally:
+            db.conn.close()
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.wal:
+            conn.execute("PRAGMA journal_mode=WAL")
+        journal = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    finally:
+        conn.close()
+    print(f"Running {args.workers} workers for {args.duration:g} s on {args.db} (journal_mode={journal})",
+          file=sys.stderr)
+    try:
+        summary = run_load(args.db, args.workers, args.duration, args.rate, mix, args.busy_timeout,
+                           args.retries, args.seed)
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    summary["journal_mode"] = journal
+    sys.stdout.write(format_summary(summary))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent load test on a shared database file")
+    add_arguments(parser)
+    return run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
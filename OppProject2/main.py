@@ -1,8 +1,16 @@
+import argparse
 import tkinter as tk
-import traceback
-from datetime import datetime
+from tkinter import messagebox
 
+import applog
+import memprofile
+import metrics
+import services
 from database import Database
+from db_worker import DatabaseWorker
+from lagmonitor import LagMonitor
+from profiler import SamplingProfiler
+from repository import Repository
 from frames.dashboard import DashboardFrame
 from frames.walkin import WalkInFrame
 from frames.clients import ClientsFrame
@@ -14,10 +22,18 @@ from frames.pet_status import PetStatusFrame
 from frames.confine import ConfineFrame
 from frames.reports import ReportsFrame
 from frames.search import SearchFrame
+from frames.diagnostics import DiagnosticsFrame
+
+log = applog.get_logger("app")
 
 class VetClinicApp(tk.Tk):
-    def __init__(self):
+    def __init__(self, stall_ms=250, stall_log=None, profile=None, profile_out=None,
+                 metrics_file=None, metrics_port=None, metrics_interval=15,
+                 trace_frames=None, memory_interval=None, memory_log=None):
         super().__init__()
+        # tracemalloc only sees what is allocated after it starts, so start it first
+        if trace_frames:
+            memprofile.start(trace_frames)
         self.title("Vet Clinic Management System")
         self.geometry("1000x600")
         self.configure(bg="#f4f6f9")
@@ -25,6 +41,14 @@ class VetClinicApp(tk.Tk):
         # Initialize database
         self.db = Database()
 
+        # One shared copy of the records for all frames (invalidated on writes)
+        self.repo = Repository(self.db)
+        self.register_cache_metrics()
+
+        # Writes triggered by buttons run on this worker thread (own connection)
+        self.worker = DatabaseWorker(lambda: Database(self.db.path), self)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
         # ===== Container for all frames =====
         container = tk.Frame(self, bg="#f4f6f9")
         container.pack(fill="both", expand=True)
@@ -33,120 +57,149 @@ class VetClinicApp(tk.Tk):
 
         # ===== Add all frames here =====
         self.frames = {}
+        self.current_frame = None
+        self.current_action = None  # text of the button being handled (profiler tag)
+        self.profiler = None
         for F in (DashboardFrame, WalkInFrame, ClientsFrame, AnimalsFrame,
-                  AppointmentsFrame, InvoicesFrame, TreatmentsFrame, PetStatusFrame, ConfineFrame, ReportsFrame, SearchFrame):
+                  AppointmentsFrame, InvoicesFrame, TreatmentsFrame, PetStatusFrame, ConfineFrame, ReportsFrame, SearchFrame,
+                  DiagnosticsFrame):
             try:
                 frame = F(container, self)
                 self.frames[F.__name__] = frame
                 frame.grid(row=0, column=0, sticky="nsew")
             except Exception:
-                print(f"❌ Error creating frame: {F.__name__}")
-                traceback.print_exc()
+                log.exception("Error creating frame: %s", F.__name__)
                 raise
 
         # Show the dashboard first
         self.show_frame("DashboardFrame")
 
+        # Watch for a blocked mainloop (latency + stack of every stall)
+        self.lag_monitor = LagMonitor(self, active=lambda: self.current_frame,
+                                      stall_ms=stall_ms, log_path=stall_log)
+        self.lag_monitor.start()
+
+        self.create_menu()
+        self.track_actions()
+
+        # Prometheus text file / localhost endpoint (off unless asked for)
+        self.metrics_exporter = None
+        if metrics_file or metrics_port is not None:
+            self.metrics_exporter = metrics.MetricsExporter(path=metrics_file, port=metrics_port,
+                                                            interval=metrics_interval).start()
+        if profile:
+            self.start_profiler(profile, profile_out, notify=False)
+
+        # Periodic memory snapshots (growth per allocation site) to the log
+        self.memory_log = None
+        if memory_interval:
+            self.memory_log = memprofile.MemoryLog(self, memory_interval, memory_log)
+            self.after(int(memory_interval * 1000), self.log_memory)
+
+    def register_cache_metrics(self):
+        metrics.counter("vetclinic_cache_hits_total", "Repository lookups served from memory",
+                        fn=lambda: self.repo.stats()["hits"])
+        metrics.counter("vetclinic_cache_misses_total", "Repository lookups that went to the database",
+                        fn=lambda: self.repo.stats()["misses"])
+        metrics.gauge("vetclinic_cache_hit_ratio", "Repository hits / lookups since startup",
+                      fn=lambda: self.repo.stats()["hit_rate"])
+        metrics.gauge("vetclinic_cache_records", "Records held in the repository identity map", ("table",),
+                      fn=lambda: {(table,): count for table, count in self.repo.stats()["records"].items()})
+
+    def create_menu(self):
+        menubar = tk.Menu(self)
+        tools = tk.Menu(menubar, tearoff=0)
+        tools.add_command(label="Diagnostics", command=lambda: self.show_frame("DiagnosticsFrame"))
+        tools.add_separator()
+        for seconds in (10, 30, 60):
+            tools.add_command(label=f"Profile for {seconds} seconds",
+                              command=lambda s=seconds: self.start_profiler(s))
+        tools.add_command(label="Stop profiling", command=self.stop_profiler)
+        menubar.add_cascade(label="Tools", menu=tools)
+        self.config(menu=menubar)
+
+    # ===== Profiling =====
+    def track_actions(self):
+        """Remember which button is being handled, to tag profiler samples"""
+        # "all" bindings run after the Button class binding, i.e. after the command
+        self.bind_all("<ButtonPress-1>", self.action_started, add="+")
+        self.bind_all("<ButtonRelease-1>", self.action_finished, add="+")
+
+    def action_started(self, event):
+        try:
+            self.current_action = str(event.widget.cget("text")) or None
+        except Exception:
+            self.current_action = None
+        applog.set_context(operation=self.current_action)
+
+    def action_finished(self, event):
+        self.current_action = None
+        applog.set_context(operation=None)
+
+    def start_profiler(self, seconds, output=None, notify=True):
+        """Sample all threads for `seconds`, then write a collapsed-stack file"""
+        if self.profiler is not None and self.profiler.running:
+            messagebox.showinfo("Profiler", "The profiler is already running.")
+            return
+        self.profiler = SamplingProfiler(seconds, output=output,
+                                         tags=lambda: (self.current_frame, self.current_action)).start()
+        log.info("Profiling for %s s -> %s", seconds, self.profiler.output)
+        self.after(500, lambda: self.check_profiler(self.profiler, notify))
+
+    def stop_profiler(self):
+        if self.profiler is not None:
+            self.profiler.stop()
+
+    def check_profiler(self, profiler, notify):
+        if not profiler.done.is_set():
+            self.after(500, lambda: self.check_profiler(profiler, notify))
+            return
+        if profiler.error is not None:
+            text = f"Profiling failed: {profiler.error}"
+        else:
+            text = f"Profile written to {profiler.path}\n{profiler.samples:,} samples"
+        log.info(text)
+        if notify:
+            messagebox.showinfo("Profiler", text)
+
+    def log_memory(self):
+        try:
+            self.memory_log.record()
+        except Exception as e:
+            log.exception("Error taking memory snapshot: %s", e)
+        self.after(int(self.memory_log.interval * 1000), self.log_memory)
+
     def show_frame(self, name):
+        # Only the visible frame keeps filling its table; hidden ones pause
+        for frame_name, frame in self.frames.items():
+            filler = getattr(frame, "filler", None)
+            if filler is not None:
+                if frame_name == name:
+                    filler.resume()
+                else:
+                    filler.suspend()
+        self.current_frame = name
+        applog.set_context(frame=name)
         self.frames[name].tkraise()
 
     def process_walkin(self, walkin_data):
         """Process walk-in and create related records in all tables"""
         try:
-            client_name, contact, address, pet_name, species, breed, age, reason, date = walkin_data
-
-            # normalize and clean strings
-            client_name = client_name.strip() if isinstance(client_name, str) else client_name
-            contact = contact.strip() if isinstance(contact, str) else contact
-            address = address.strip() if isinstance(address, str) else address
-            pet_name = pet_name.strip() if isinstance(pet_name, str) else pet_name
-            species = (species or "").strip()
-            breed = (breed or "").strip()
-            reason = reason.strip() if isinstance(reason, str) else reason
-            date = date.strip() if isinstance(date, str) else date
-
-            # Normalize species to title case and specifically standardize 'dog'
-            if species:
-                species_norm = species.lower()
-                if species_norm == "dog":
-                    species = "Dog"
-                elif species_norm == "cat":
-                    species = "Cat"
-                else:
-                    species = species.title()
-
-            # Normalize breed: keep common dog-breed formatting (Title Case)
-            if breed:
-                breed = " ".join([w.capitalize() for w in breed.split()])
-
-            # Ensure age is integer (if provided)
-            try:
-                age = int(age)
-            except Exception:
-                age = None
-
-            # 1. Add to Clients table
-            client_data = [client_name, contact, address]
-            self.db.insert_client(client_data)
-
-            # 2. Add to Animals table (use normalized species/breed)
-            animal_data = [pet_name, species, breed, age, client_name]
-            self.db.insert_animal(animal_data)
-
-            # 3. Add to Appointments table
-            appointment_data = [client_name, pet_name, date, "09:00", reason]
-            self.db.insert_appointment(appointment_data)
-
-            # IMPORTANT: Do NOT create a treatment or invoice record here.
-            # Treatments and invoices should be created only from the Treatments/Invoices UI.
+            # Treatments and invoices are created only from the Treatments/Invoices UI
+            services.process_walkin(self.db, walkin_data)
 
             # Refresh all frames
             self.refresh_all_frames()
 
             return True
         except Exception as e:
-            print(f"Error processing walk-in: {e}")
+            log.exception("Error processing walk-in: %s", e)
             return False
 
     def add_treatment_cost(self, client_name, treatment_reason, cost):
         """Add treatment cost to invoice and auto-connect. If no invoice exists, create one."""
         try:
-            # Get treatment cost based on reason/type
-            treatment_costs = {
-                "Checkup": 50,
-                "Vaccination": 75,
-                "Surgery": 500,
-                "Dental Cleaning": 150,
-                "X-Ray": 100,
-                "Blood Test": 80,
-                "Grooming": 60,
-                "Wound Care": 120,
-                "Physical Therapy": 100,
-                "Medication": 40
-            }
-
-            treatment_cost = treatment_costs.get(treatment_reason, cost if cost else 50)
-
-            # Find invoice for this client
-            invoices = self.db.fetch_invoices()
-            found = False
-            for invoice in invoices:
-                if invoice[2] == client_name:  # invoice[2] is client name
-                    current_amount = invoice[4]  # invoice[4] is amount
-                    new_amount = current_amount + treatment_cost
-
-                    # Update invoice amount
-                    self.db.update_invoice_amount(invoice[0], new_amount)
-                    found = True
-                    break
-
-            # If no invoice exists for the client, create one now
-            if not found:
-                invoice_no = "INV-" + datetime.now().strftime("%Y%m%d%H%M%S")
-                date = datetime.now().strftime("%Y-%m-%d")
-                # Pet unknown here — leave blank or you can lookup latest pet for client
-                pet = ""
-                self.db.insert_invoice([invoice_no, client_name, pet, treatment_cost, date, "Unpaid"])
+            services.add_treatment_cost(self.db, client_name, treatment_reason, cost)
 
             # Refresh invoice frame
             if "InvoicesFrame" in self.frames:
@@ -155,27 +208,35 @@ class VetClinicApp(tk.Tk):
                     fn()
 
         except Exception as e:
-            print(f"Error adding treatment cost: {e}")
+            log.exception("Error adding treatment cost: %s", e)
 
     def mark_invoice_paid(self, invoice_id):
         """Mark invoice as paid"""
         try:
-            self.db.update_invoice_status(invoice_id, "Paid")
+            services.mark_invoice_paid(self.db, invoice_id)
             fn = getattr(self.frames.get("InvoicesFrame"), "load_invoices", None)
             if callable(fn):
                 fn()
         except Exception as e:
-            print(f"Error marking invoice as paid: {e}")
+            log.exception("Error marking invoice as paid: %s", e)
 
     def mark_invoice_unpaid(self, invoice_id):
         """Mark invoice as unpaid"""
         try:
-            self.db.update_invoice_status(invoice_id, "Unpaid")
+            services.mark_invoice_unpaid(self.db, invoice_id)
             fn = getattr(self.frames.get("InvoicesFrame"), "load_invoices", None)
             if callable(fn):
                 fn()
         except Exception as e:
-            print(f"Error marking invoice as unpaid: {e}")
+            log.exception("Error marking invoice as unpaid: %s", e)
+
+    def record_payment(self, invoice_id, amount, method="Cash"):
+        """Record a (partial) payment; raises ValueError for an amount that can't be taken"""
+        payment_id = services.record_payment(self.db, invoice_id, amount, method=method)
+        fn = getattr(self.frames.get("InvoicesFrame"), "load_invoices", None)
+        if callable(fn):
+            fn()
+        return payment_id
 
     def print_receipt(self, invoice_id):
         """Generate and print receipt"""
@@ -185,35 +246,11 @@ class VetClinicApp(tk.Tk):
                 receipt_text = self.generate_receipt(invoice)
                 self.show_receipt_window(receipt_text)
         except Exception as e:
-            print(f"Error printing receipt: {e}")
+            log.exception("Error printing receipt: %s", e)
 
     def generate_receipt(self, invoice):
         """Generate receipt text from invoice data"""
-        receipt = f"""
-{'='*50}
-         VET CLINIC RECEIPT
-{'='*50}
-
-Invoice No:      {invoice[1]}
-Date:            {invoice[5]}
-Status:          {invoice[6] if len(invoice) > 6 else 'Unknown'}
-
-{'='*50}
-CLIENT INFORMATION
-{'='*50}
-Client Name:     {invoice[2]}
-Pet Name:        {invoice[3]}
-
-{'='*50}
-INVOICE DETAILS
-{'='*50}
-Amount:          ${invoice[4]:.2f}
-
-{'='*50}
-Thank you for visiting!
-{'='*50}
-"""
-        return receipt
+        return services.generate_receipt(invoice)
 
     def show_receipt_window(self, receipt_text):
         """Display receipt in a new window"""
@@ -243,11 +280,25 @@ Thank you for visiting!
                 f.write(receipt_text)
             subprocess.Popen(["notepad", "/p", "temp_receipt.txt"])
         except Exception as e:
-            print(f"Error printing: {e}")
+            log.exception("Error printing: %s", e)
+
+    def on_close(self):
+        """Let queued database jobs finish before closing"""
+        if self.profiler is not None and self.profiler.running:
+            self.profiler.stop()
+            self.profiler.wait(2)
+        self.lag_monitor.stop()
+        self.worker.stop()
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.stop()
+        self.repo.close()
+        self.db.conn.close()
+        self.destroy()
 
     def refresh_all_frames(self):
         """Refresh all tables in open frames (call methods only when present)"""
         try:
+            self.repo.check_external(force=True)  # pick up other terminals' commits now
             for name, frame in self.frames.items():
                 # call any of these if implemented on the frame
                 for method in ("load_walkins", "load_clients", "load_animals",
@@ -257,10 +308,41 @@ Thank you for visiting!
                         try:
                             fn()
                         except Exception as e:
-                            print(f"Error refreshing {name}.{method}: {e}")
+                            log.exception("Error refreshing %s.%s: %s", name, method, e)
         except Exception as e:
-            print(f"Error refreshing frames: {e}")
+            log.exception("Error refreshing frames: %s", e)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Vet Clinic Management System")
+    parser.add_argument("--stall-ms", type=float, default=250,
+                        help="log the UI as stalled when the event loop is blocked this long (default %(default)s)")
+    parser.add_argument("--stall-log", help="append UI stalls (with stacks) to this JSONL file")
+    parser.add_argument("--profile", type=float, metavar="SECONDS",
+                        help="run the sampling profiler for this long after startup")
+    parser.add_argument("--profile-out", metavar="FILE",
+                        help="collapsed-stack output file (default profile-<time>.folded)")
+    parser.add_argument("--log-file", default=applog.DEFAULT_LOG_FILE,
+                        help="rotating JSONL log file (default %(default)s)")
+    parser.add_argument("--log-level", default="INFO", choices=("DEBUG", "INFO", "WARNING", "ERROR"))
+    parser.add_argument("--metrics-file", help="rewrite Prometheus metrics to this file periodically")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on 127.0.0.1:PORT/metrics")
+    parser.add_argument("--metrics-interval", type=float, default=15,
+                        help="seconds between metrics file writes (default %(default)s)")
+    parser.add_argument("--tracemalloc", type=int, nargs="?", const=memprofile.DEFAULT_TRACE_FRAMES,
+                        metavar="FRAMES", help="trace allocations from startup (traceback depth, default %(const)s)")
+    parser.add_argument("--memory-interval", type=float, metavar="SECONDS",
+                        help="log a memory snapshot (growth since the last one) this often; implies --tracemalloc")
+    parser.add_argument("--memory-log", metavar="FILE", help="also append the memory snapshots to this JSONL file")
+    return parser.parse_args(argv)
+
 
 if __name__ == "__main__":
-    app = VetClinicApp()
+    args = parse_args()
+    applog.setup(args.log_file, args.log_level)
+    app = VetClinicApp(stall_ms=args.stall_ms, stall_log=args.stall_log,
+                       profile=args.profile, profile_out=args.profile_out,
+                       metrics_file=args.metrics_file, metrics_port=args.metrics_port,
+                       metrics_interval=args.metrics_interval,
+                       trace_frames=args.tracemalloc or (memprofile.DEFAULT_TRACE_FRAMES if args.memory_interval else None),
+                       memory_interval=args.memory_interval, memory_log=args.memory_log)
     app.mainloop()
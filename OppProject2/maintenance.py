@@ -0,0 +1,100 @@
+# Integrity checks and housekeeping that run without the UI
+
+# daily_revenue as stored, and as recomputed from invoices (cents are enough)
+_ROLLUP_STORED = "SELECT date, invoices, round(total, 2), round(paid, 2), round(unpaid, 2) FROM daily_revenue"
+_ROLLUP_ACTUAL = ("SELECT date, COUNT(*), round(SUM(COALESCE(amount, 0)), 2), "
+                  "round(SUM(paid_amount), 2), round(SUM(COALESCE(amount, 0) - paid_amount), 2) "
+                  "FROM invoices WHERE date IS NOT NULL GROUP BY date")
+
+_BALANCES_STORED = "SELECT client, invoices, round(billed, 2), round(paid, 2) FROM client_balances WHERE invoices <> 0"
+_BALANCES_ACTUAL = ("SELECT client, COUNT(*), round(SUM(COALESCE(amount, 0)), 2), round(SUM(paid_amount), 2) "
+                    "FROM invoices WHERE client IS NOT NULL GROUP BY client")
+
+# (description, query returning the number of problem rows)
+CHECKS = [
+    ("animals whose owner is not a client",
+     "SELECT COUNT(*) FROM animals a WHERE owner_name IS NOT NULL AND owner_name <> '' "
+     "AND NOT EXISTS (SELECT 1 FROM clients c WHERE c.name = a.owner_name)"),
+    ("appointments whose client is missing",
+     "SELECT COUNT(*) FROM appointments a "
+     "WHERE NOT EXISTS (SELECT 1 FROM clients c WHERE c.name = a.client_name)"),
+    ("treatments whose client is missing",
+     "SELECT COUNT(*) FROM treatments t "
+     "WHERE NOT EXISTS (SELECT 1 FROM clients c WHERE c.name = t.client)"),
+    ("invoices whose client is missing",
+     "SELECT COUNT(*) FROM invoices i "
+     "WHERE NOT EXISTS (SELECT 1 FROM clients c WHERE c.name = i.client)"),
+    ("invoices with a missing or negative amount",
+     "SELECT COUNT(*) FROM invoices WHERE amount IS NULL OR amount < 0"),
+    ("invoices with an unknown status",
+     "SELECT COUNT(*) FROM invoices WHERE status IS NULL OR status NOT IN ('Paid', 'Unpaid')"),
+    ("invoices with a malformed date",
+     "SELECT COUNT(*) FROM invoices WHERE date IS NULL "
+     "OR date NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'"),
+    ("revenue rollup days out of sync",
+     f"SELECT (SELECT COUNT(*) FROM ({_ROLLUP_STORED} EXCEPT {_ROLLUP_ACTUAL})) "
+     f"+ (SELECT COUNT(*) FROM ({_ROLLUP_ACTUAL} EXCEPT {_ROLLUP_STORED}))"),
+    ("invoice paid amounts out of sync",
+     "SELECT COUNT(*) FROM invoices i WHERE abs(paid_amount - "
+     "COALESCE((SELECT SUM(amount) FROM payments p WHERE p.invoice_id = i.id), 0)) > 0.005"),
+    ("payments for a missing invoice",
+     "SELECT COUNT(*) FROM payments p WHERE NOT EXISTS (SELECT 1 FROM invoices i WHERE i.id = p.invoice_id)"),
+    ("client balances out of sync",
+     f"SELECT (SELECT COUNT(*) FROM ({_BALANCES_STORED} EXCEPT {_BALANCES_ACTUAL})) "
+     f"+ (SELECT COUNT(*) FROM ({_BALANCES_ACTUAL} EXCEPT {_BALANCES_STORED}))"),
+    ("duplicate invoice numbers",
+     "SELECT COUNT(*) FROM (SELECT invoice_no FROM invoices GROUP BY invoice_no HAVING COUNT(*) > 1)"),
+]
+
+
+def run_checks(db, full=False):
+    """Run SQLite's own check plus the data checks; returns [(description, problem count)]"""
+    cur = db.conn.cursor()
+    results = []
+
+    cur.execute("PRAGMA integrity_check" if full else "PRAGMA quick_check")
+    messages = [row[0] for row in cur.fetchall()]
+    results.append(("sqlite integrity check", 0 if messages == ["ok"] else len(messages)))
+
+    for description, query in CHECKS:
+        cur.execute(query)
+        results.append((description, cur.fetchone()[0]))
+    return results
+
+
+def rollups(db):
+    """Recompute the revenue rollups from invoices"""
+    return db.rebuild_revenue()
+
+
+def balances(db):
+    """Recompute invoice paid amounts and client balances from payments"""
+    return db.rebuild_balances()
+
+
+def analyze(db):
+    """Refresh the query planner statistics"""
+    db.conn.execute("ANALYZE")
+    db.conn.execute("PRAGMA optimize")
+    db.conn.commit()
+
+
+def vacuum(db):
+    """Rebuild the database file to reclaim free pages"""
+    db.conn.commit()
+    db.conn.execute("VACUUM")
+
+
+def checkpoint(db):
+    """Fold the WAL file (if any) back into the database"""
+    return db.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+
+
+def backup(db, dest_path):
+    """Online copy of the database to dest_path"""
+    import sqlite3
+    dest = sqlite3.connect(dest_path)
+    try:
+        db.conn.backup(dest)
+    finally:
+        dest.close()
@@ -0,0 +1,297 @@
+import argparse
+import json
+import linecache
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import applog
+from querystats import QUERY_STATS
+
+# Memory profiling with tracemalloc. tracemalloc only sees allocations made
+# after start(), so the app starts it at launch with --tracemalloc (or the
+# Diagnostics panel starts it on demand). A snapshot here is the traced
+# allocations grouped by source line plus, for the app, what each frame
+# holds: Treeview items, the lists/dicts on the frame object, and cache
+# sizes. Two snapshots diff into the lines that grew -- a leak shows up as
+# the same line growing snapshot after snapshot.
+#
+# "python -m cli memory" runs a bench case repeatedly against a generated
+# database and diffs before/after, to find growth without the UI.
+
+log = applog.get_logger("memprofile")
+
+DEFAULT_TRACE_FRAMES = 10
+TOP_LIMIT = 25
+
+# tracemalloc's own bookkeeping and import machinery are noise here
+_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def start(frames=DEFAULT_TRACE_FRAMES):
+    """Start tracing (no-op when already tracing); returns True if it started now"""
+    if tracemalloc.is_tracing():
+        return False
+    tracemalloc.start(frames)
+    log.info("tracemalloc started", extra={"frames": frames})
+    return True
+
+
+def stop():
+    tracemalloc.stop()
+
+
+def tracing():
+    return tracemalloc.is_tracing()
+
+
+def traced_kb():
+    """(current, peak) traced KB; (0, 0) when not tracing"""
+    if not tracemalloc.is_tracing():
+        return 0.0, 0.0
+    current, peak = tracemalloc.get_traced_memory()
+    return current / 1024, peak / 1024
+
+
+def _site(frame, key):
+    """(where, source line) for a statistic's frame; by module there is no line"""
+    parts = frame.filename.replace("\\", "/").split("/")
+    where = "/".join(parts[-2:])
+    if key == "filename":
+        return where, ""
+    return f"{where}:{frame.lineno}", linecache.getline(frame.filename, frame.lineno).strip()
+
+
+class Snapshot:
+    """A tracemalloc snapshot plus the app-side counts taken at the same moment"""
+
+    def __init__(self, trace, label="", frames=None, caches=None):
+        self.trace = trace.filter_traces(_IGNORED)
+        self.label = label
+        self.time = datetime.now().isoformat(timespec="seconds")
+        self.frames = frames or {}
+        self.caches = caches or {}
+
+    @property
+    def total_kb(self):
+        return sum(stat.size for stat in self.trace.statistics("filename")) / 1024
+
+    def top(self, key="lineno", limit=TOP_LIMIT):
+        """Largest allocation sites (key "lineno") or modules ("filename"): [(where, KB, blocks, line)]"""
+        rows = []
+        for stat in self.trace.statistics(key)[:limit]:
+            where, line = _site(stat.traceback[0], key)
+            rows.append((where, stat.size / 1024, stat.count, line))
+        return rows
+
+    def diff(self, older, key="lineno", limit=TOP_LIMIT):
+        """Sites that changed most since `older`: [(where, KB change, KB now, blocks change, line)]"""
+        rows = []
+        for stat in self.trace.compare_to(older.trace, key)[:limit]:
+            where, line = _site(stat.traceback[0], key)
+            rows.append((where, stat.size_diff / 1024, stat.size / 1024, stat.count_diff, line))
+        return rows
+
+    def asdict(self, older=None, limit=10):
+        entry = {
+            "time": self.time,
+            "label": self.label,
+            "traced_kb": round(self.total_kb, 1),
+            "top": [{"where": where, "kb": round(kb, 1), "blocks": count}
+                    for where, kb, count, _ in self.top(limit=limit)],
+            "frames": self.frames,
+            "caches": self.caches,
+        }
+        if older is not None:
+            entry["growth"] = [{"where": where, "kb": round(change, 1), "blocks": blocks}
+                               for where, change, _, blocks, _ in self.diff(older, limit=limit) if change > 0]
+        return entry
+
+
+def take(label="", app=None):
+    """Snapshot now (starting tracemalloc first if needed, which makes this one nearly empty)"""
+    start()
+    return Snapshot(tracemalloc.take_snapshot(), label,
+                    frame_counts(app.frames) if app is not None else None,
+                    cache_sizes(app) if app is not None else None)
+
+
+# ===== What the app holds =====
+def _trees(widget):
+    """Every Treeview under a widget (duck-typed, so this module needs no tkinter)"""
+    for child in widget.winfo_children():
+        if hasattr(child, "get_children") and hasattr(child, "heading"):
+            yield child
+        yield from _trees(child)
+
+
+def frame_counts(frames):
+    """{frame name: {"trees", "items", "held": {attribute: length}}} (Tk thread only)"""
+    counts = {}
+    for name, frame in frames.items():
+        items = 0
+        trees = 0
+        for tree in _trees(frame):
+            trees += 1
+            items += len(tree.get_children())
+        held = {}
+        for attr, value in vars(frame).items():
+            if isinstance(value, (list, tuple, dict, set)) and not attr.startswith("_") and len(value):
+                held[attr] = len(value)
+            filler_rows = getattr(value, "rows", None)  # TableFiller still inserting
+            if isinstance(filler_rows, list) and filler_rows:
+                held[f"{attr}.rows"] = len(filler_rows)
+        counts[name] = {"trees": trees, "items": items, "held": held}
+    return counts
+
+
+def cache_sizes(app):
+    """{cache: entries} for the caches and bounded logs the app keeps"""
+    sizes = {}
+    repo = getattr(app, "repo", None)
+    if repo is not None:
+        stats = repo.stats()
+        for table, count in stats["records"].items():
+            sizes[f"repository.records.{table}"] = count
+        with repo.lock:
+            for table, rows in repo.listings.items():
+                sizes[f"repository.listings.{table}"] = len(rows)
+    sizes["querystats.statements"] = len(QUERY_STATS.statements)
+    sizes["querystats.slow_log"] = len(QUERY_STATS.slow_log)
+    monitor = getattr(app, "lag_monitor", None)
+    if monitor is not None:
+        sizes["lagmonitor.latencies"] = len(monitor.latencies)
+        sizes["lagmonitor.stalls"] = len(monitor.stalls)
+    return sizes
+
+
+# ===== Periodic logging =====
+class MemoryLog:
+    """Logs a snapshot (with growth since the previous one) every `interval` seconds.
+
+    The app calls record() from the Tk thread via after(); each entry goes to
+    the log as "Memory snapshot" and, when `path` is set, as a JSON line.
+    """
+
+    def __init__(self, app, interval=300, path=None, limit=10):
+        self.app = app
+        self.interval = interval
+        self.path = path
+        self.limit = limit
+        self.previous = None
+
+    def record(self):
+        snapshot = take("periodic", self.app)
+        entry = snapshot.asdict(self.previous, self.limit)
+        self.previous = snapshot
+        growth = entry.get("growth") or []
+        log.info("Memory snapshot: %.0f KB traced", entry["traced_kb"],
+                 extra={"traced_kb": entry["traced_kb"],
+                        "grew": ", ".join(f"{g['where']} +{g['kb']:.0f} KB" for g in growth[:3])})
+        if self.path:
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry) + "\n")
+            except OSError as e:
+                log.error("Error writing memory log: %s", e)
+        return entry
+
+
+# ===== Command line =====
+def format_rows(title, header, rows):
+    lines = [title, header]
+    lines += rows or ["  (nothing)"]
+    return lines
+
+
+def add_arguments(parser):
+    parser.add_argument("--case", default="Database.fetch_invoices",
+                        help="bench case to repeat (see 'bench --case'; default %(default)s)")
+    parser.add_argument("--iterations", type=int, default=20, help="times to run the case between snapshots")
+    parser.add_argument("--db", help="run against a copy of this database instead of a generated one")
+    parser.add_argument("--clients", type=int, default=10000, help="generated dataset size")
+    parser.add_argument("--data-dir", help="where generated datasets are cached (shared with bench)")
+    parser.add_argument("--by-module", action="store_true", help="group allocations by file instead of line")
+    parser.add_argument("--limit", type=int, default=15, help="allocation sites to show")
+    parser.add_argument("--frames", type=int, default=DEFAULT_TRACE_FRAMES, help="traceback depth to record")
+
+
+def run(args):
+    import benchmarks
+    from database import Database
+
+    cases = dict(benchmarks.CASES)
+    if args.case not in cases:
+        print(f"Error: unknown case {args.case!r}; one of: {', '.join(cases)}", file=sys.stderr)
+        return 2
+    data_dir = args.data_dir or os.path.join(tempfile.gettempdir(), "vetclinic-bench")
+    source = args.db or benchmarks.dataset(data_dir, args.clients, "clinic")
+    vet_source = benchmarks.dataset(data_dir, args.clients, "vetclinic") if args.case.startswith("vetclinic.") else None
+    work = tempfile.mkdtemp(prefix="vetclinic-memory-")
+    # tracing slows every statement down; don't report that as slow queries
+    slow_ms, QUERY_STATS.slow_ms = QUERY_STATS.slow_ms, None
+    try:
+        path = os.path.join(work, "clinic.db")
+        shutil.copyfile(source, path)
+        db = Database(path)
+        vdb = None
+        if vet_source:
+            import datagen
+            shutil.copyfile(vet_source, os.path.join(work, "vetclinic.db"))
+            vdb = datagen.vetclinic_module().Database(os.path.join(work, "vetclinic.db"))
+        try:
+            ctx = benchmarks.BenchContext(db, vdb, args.clients)
+            fn = cases[args.case]
+            tracemalloc.start(args.frames)
+            fn(ctx)  # warm-up: statement cache, lazy imports
+            before = take("before")
+            started = time.perf_counter()
+            kept = [fn(ctx) for _ in range(args.iterations)]
+            elapsed = time.perf_counter() - started
+            after = take("after")
+            peak = tracemalloc.get_traced_memory()[1] / 1024
+            del kept
+            released = take("released")
+            tracemalloc.stop()
+        finally:
+            db.conn.close()
+            if vdb is not None:
+                vdb.close()
+    finally:
+        QUERY_STATS.slow_ms = slow_ms
+        shutil.rmtree(work, ignore_errors=True)
+
+    key = "filename" if args.by_module else "lineno"
+    lines = [f"{args.case} x {args.iterations} in {elapsed:.2f} s: traced {before.total_kb:,.0f} KB -> "
+             f"{after.total_kb:,.0f} KB with results kept, {released.total_kb:,.0f} KB after releasing them "
+             f"(peak {peak:,.0f} KB)", ""]
+    lines += format_rows("Top allocation sites (results kept)", f"{'KB':>10} {'blocks':>8}  where",
+                         [f"{kb:>10,.1f} {count:>8,}  {where}  {line}".rstrip()
+                          for where, kb, count, line in after.top(key, args.limit)])
+    lines.append("")
+    lines += format_rows("Still allocated after releasing the results (leak candidates)",
+                         f"{'KB':>10} {'blocks':>8}  where",
+                         [f"{change:>+10,.1f} {blocks:>+8,}  {where}  {line}".rstrip()
+                          for where, change, _, blocks, line in released.diff(before, key, args.limit)
+                          if change > 1])
+    print("\n".join(lines))
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find allocation growth from repeating a bench case")
+    add_arguments(parser)
+    return run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import applog
+
+# Process-wide metrics in the Prometheus text format. Modules declare what
+# they measure at import time:
+#     WALKINS = metrics.counter("vetclinic_walkins_processed_total", "Walk-ins processed")
+#     WALKINS.inc(len(walkins))
+# counter()/gauge()/histogram() return the existing metric when the name is
+# already registered. A metric built with fn= is read from that callable at
+# collection time instead (e.g. cache statistics owned by another object).
+# MetricsExporter writes REGISTRY to a file every few seconds and/or serves
+# it on a localhost port for a Prometheus scraper.
+
+log = applog.get_logger("metrics")
+
+# Latency buckets, in seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames, labelvalues, extra=()):
+    pairs = list(zip(labelnames, labelvalues)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help, labelnames=(), fn=None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.fn = fn
+        # label values tuple -> value; unlabelled metrics start at 0 so they always show
+        self.values = {} if self.labelnames else {(): 0}
+        self.lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        """[(suffix, label values, extra labels, value)]"""
+        if self.fn is not None:
+            value = self.fn()
+            values = value if isinstance(value, dict) else {(): value}
+        else:
+            with self.lock:
+                values = dict(self.values)
+        return [("", key, (), value) for key, value in sorted(values.items())]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, key, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self.lock:
+            return self.values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.values = {}
+        self.buckets = tuple(sorted(buckets))
+        if self.buckets[-1] != float("inf"):
+            self.buckets += (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+            counts = state[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def time(self, **labels):
+        """Context manager observing the elapsed seconds of its block"""
+        return _Timer(self, labels)
+
+    def samples(self):
+        with self.lock:
+            values = {key: (list(counts), total, count) for key, (counts, total, count) in self.values.items()}
+        samples = []
+        for key, (counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, counts):
+                cumulative += bucket
+                samples.append(("_bucket", key, (("le", _format_value(bound)),), cumulative))
+            samples.append(("_sum", key, (), total))
+            samples.append(("_count", key, (), count))
+        return samples
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        with self.lock:
+            existing = self.metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"{metric.name} is already registered as a {existing.kind}")
+                if metric.fn is not None:
+                    existing.fn = metric.fn  # callbacks follow their latest owner
+                return existing
+            self.metrics[metric.name] = metric
+            return metric
+
+    def unregister(self, name):
+        with self.lock:
+            self.metrics.pop(name, None)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self.lock:
+            metrics = sorted(self.metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                log.exception("Error collecting metric %s: %s", metric.name, e)
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write render() to `path` atomically (scrapers never see half a file)"""
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+
+REGISTRY = Registry()
+
+
+def counter(name, help, labelnames=(), fn=None):
+    return REGISTRY.register(Counter(name, help, labelnames, fn))
+
+
+def gauge(name, help, labelnames=(), fn=None):
+    return REGISTRY.register(Gauge(name, help, labelnames, fn))
+
+
+def histogram(name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Histogram(name, help, labelnames, buckets))
+
+
+# ===== Export =====
+class MetricsExporter:
+    """Publishes a Registry from background threads.
+
+    path: rewritten every `interval` seconds (and once more on stop()).
+    port: served at http://127.0.0.1:<port>/metrics.
+    """
+
+    def __init__(self, registry=REGISTRY, path=None, port=None, interval=15):
+        self.registry = registry
+        self.path = path
+        self.port = port
+        self.interval = interval
+        self.stopping = threading.Event()
+        self.writer = None
+        self.server = None
+
+    def start(self):
+        if self.path:
+            self.writer = threading.Thread(target=self._write_loop, name="metrics-writer", daemon=True)
+            self.writer.start()
+        if self.port is not None:
+            registry = self.registry
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.split("?")[0] not in ("/", "/metrics"):
+                        self.send_error(404)
+                        return
+                    body = registry.render().encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass  # no line per scrape
+
+            self.server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+            self.server.daemon_threads = True
+            threading.Thread(target=self.server.serve_forever, name="metrics-server", daemon=True).start()
+        return self
+
+    def _write_loop(self):
+        while True:
+            self._write()
+            if self.stopping.wait(self.interval):
+                break
+
+    def _write(self):
+        try:
+            self.registry.write(self.path)
+        except OSError as e:
+            log.error("Error writing metrics: %s", e)
+
+    def stop(self):
+        self.stopping.set()
+        if self.writer is not None:
+            self.writer.join(2)
+            self.writer = None
+            self._write()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
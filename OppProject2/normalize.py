@@ -0,0 +1,84 @@
+from datetime import date, datetime
+
+# Value cleaning rules shared by the walk-in form and the bulk importer
+
+
+def clean_str(value):
+    """Strip strings; leave anything else (None, numbers) untouched"""
+    return value.strip() if isinstance(value, str) else value
+
+
+def normalize_species(species):
+    """Title-case species, with 'dog'/'cat' standardized"""
+    species = (species or "").strip()
+    if species:
+        species_norm = species.lower()
+        if species_norm == "dog":
+            species = "Dog"
+        elif species_norm == "cat":
+            species = "Cat"
+        else:
+            species = species.title()
+    return species
+
+
+def normalize_breed(breed):
+    """Capitalize every word of the breed (e.g. 'golden  retriever' -> 'Golden Retriever')"""
+    breed = (breed or "").strip()
+    if breed:
+        breed = " ".join([w.capitalize() for w in breed.split()])
+    return breed
+
+
+PET_STATUSES = ("Appointment", "Confined", "Daily Treatment", "Discharged")
+_PET_STATUS_KEYS = {status.lower(): status for status in PET_STATUSES}
+
+
+def normalize_pet_status(status):
+    """Known pet statuses in their canonical case ('confined' -> 'Confined'); others stripped"""
+    status = clean_str(status)
+    if isinstance(status, str):
+        return _PET_STATUS_KEYS.get(" ".join(status.split()).lower(), status)
+    return status
+
+
+def coerce_age(age):
+    """Age as int, or None when it is missing / not a number"""
+    try:
+        return int(age)
+    except Exception:
+        return None
+
+
+def parse_date(value):
+    """Return the date as YYYY-MM-DD; raises ValueError for unknown formats"""
+    value = clean_str(value)
+    if not value:
+        return value
+    try:
+        # fast path for the ISO dates the app itself writes
+        return date.fromisoformat(value).isoformat()
+    except (TypeError, ValueError):
+        pass
+    for fmt in ("%Y-%m-%d", "%Y/%m/%d", "%Y-%m-%d %H:%M:%S"):
+        try:
+            return datetime.strptime(value, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            pass
+    raise ValueError(f"invalid date '{value}' (expected YYYY-MM-DD)")
+
+
+def normalize_walkin(walkin_data):
+    """Clean a walk-in row [client, contact, address, pet, species, breed, age, reason, date]"""
+    client_name, contact, address, pet_name, species, breed, age, reason, date = walkin_data
+    return [
+        clean_str(client_name),
+        clean_str(contact),
+        clean_str(address),
+        clean_str(pet_name),
+        normalize_species(species),
+        normalize_breed(breed),
+        coerce_age(age),
+        clean_str(reason),
+        clean_str(date),
+    ]
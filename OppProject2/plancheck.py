@@ -0,0 +1,275 @@
+import argparse
+import os
+import re
+import shutil
+import sys
+import tempfile
+from collections import OrderedDict
+
+import benchmarks
+import receivables
+from database import Database, LIST_COLUMNS, NUMERIC_COLUMNS, SORT_COLUMNS
+from querystats import QUERY_STATS, explain
+from repository import Repository
+
+# Query-plan regression check. Runs every Database method, the services the
+# frames call, every report (the bench cases) and the list views' page queries (each sort
+# column, both directions, a filter per column) on a generated dataset,
+# captures each distinct statement with its parameters, and checks its
+# EXPLAIN QUERY PLAN:
+#   - SCAN of a table with more than LARGE_TABLE_ROWS rows (a full table or
+#     full index walk) fails, unless it walks the table in its ORDER BY order
+#     (rowid for id, or an index leading with the column) for a statement
+#     with a LIMIT, no WHERE and no temp B-tree: that read stops after the
+#     page. With a WHERE it may read the whole table to fill the page, and
+#     is reported as FILTERED SCAN.
+#   - USE TEMP B-TREE for ORDER BY / GROUP BY over a scanned table fails
+#     when the table already has an index leading with that column
+# Intentional scans -- the "give me everything" fetches the reports and
+# caches build on, the pager's row count -- are listed in ALLOWED with the
+# reason, keyed by the function that ran the statement. Exits 1 on a violation,
+# so it can run in CI:
+#     python -m cli plancheck              (cached 10k-client dataset)
+#     python -m cli plancheck --db vet_clinic.db -v
+
+LARGE_TABLE_ROWS = 1000
+DEFAULT_CLIENTS = 10000
+
+# (source function, finding) -> why it is fine. Findings are "SCAN <table>",
+# "FILTERED SCAN <table>" or "TEMP B-TREE <table>".
+ALLOWED = {
+    ("database.fetch_clients", "SCAN clients"): "dashboard search uses LIKE '%text%', no index can serve it",
+    ("database.fetch_walkins", "SCAN walkins"): "returns every walk-in",
+    ("database.fetch_animals", "SCAN animals"): "returns every animal",
+    ("database.fetch_appointments", "SCAN appointments"): "returns every appointment",
+    ("database.fetch_invoices", "SCAN invoices"): "returns every invoice (walks idx_invoices_date)",
+    ("database.fetch_treatments", "SCAN treatments"): "returns every treatment (walks idx_treatments_date)",
+    ("database.fetch_pet_status", "SCAN pet_status"): "returns every status row (walks idx_pet_status_date)",
+    ("reporting.outstanding_invoices", "SCAN invoices"): "lists every open invoice (walks the partial idx_invoices_due)",
+}
+# the list frames' row count reads the whole list (or index); substring filters can't seek
+for _table in LIST_COLUMNS:
+    ALLOWED[("database.count_rows", f"SCAN {_table}")] = "row count of the list for the pager"
+    ALLOWED[("database.fetch_page", f"FILTERED SCAN {_table}")] = (
+        "list filter box: a 'contains' match can't seek, the page reads rows in sort order until it fills")
+
+_THIS_FILE = __file__
+_SKIP_FILES = {os.path.abspath(_THIS_FILE), os.path.abspath(sys.modules["querystats"].__file__)}
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+# SQLite before 3.36 prints "SCAN TABLE x"
+_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?(?: USING (?:COVERING )?INDEX (\w+))?")
+_TEMP_BTREE = re.compile(r"USE TEMP B-TREE FOR (?:RIGHT PART OF |LAST TERM OF )?(ORDER BY|GROUP BY)")
+
+
+def _source():
+    """module.function of the innermost frame outside this file and querystats"""
+    frame = sys._getframe(1)
+    while frame is not None and os.path.abspath(frame.f_code.co_filename) in _SKIP_FILES:
+        frame = frame.f_back
+    if frame is None:
+        return "?"
+    module = os.path.splitext(os.path.basename(frame.f_code.co_filename))[0]
+    return f"{module}.{frame.f_code.co_name}"
+
+
+class StatementCapture:
+    """Records one example of each distinct statement (literals ignored) per source"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.statements = OrderedDict()  # (source, shape) -> expanded SQL
+
+    def __enter__(self):
+        self.conn.set_trace_callback(self._trace)
+        return self
+
+    def __exit__(self, *exc):
+        self.conn.set_trace_callback(None)
+        return False
+
+    def _trace(self, sql):
+        text = " ".join(sql.split())
+        if not text.upper().startswith(("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")):
+            return
+        key = (_source(), _LITERALS.sub("?", text))
+        self.statements.setdefault(key, text)
+
+
+def exercise(db, ctx):
+    """Run everything that issues SQL on `db` (a scratch copy: this writes to it)"""
+    for name, fn in benchmarks.CASES:
+        if not name.startswith("vetclinic."):
+            fn(ctx)
+    # the list frames: first page for every sort, and a filter on every column
+    for table, sorts in SORT_COLUMNS.items():
+        for sort in sorts:
+            for descending in (False, True):
+                db.fetch_page(table, sort, descending)
+        for column in LIST_COLUMNS[table]:
+            value = ">=5" if column in NUMERIC_COLUMNS else "a"
+            db.fetch_page(table, "id", False, {column: value})
+            db.count_rows(table, {column: value})
+    # receivables: a page of each aging order and a statement
+    for sort in receivables.AGING_SORTS:
+        receivables.aging_page(db, sort=sort, page=2)
+    receivables.statement_page(db, ctx.client)
+    db.fetch_payments(ctx.invoice_id)
+    db.fetch_client_balance(ctx.client)
+    repo = Repository(db)
+    try:
+        for table in LIST_COLUMNS:
+            repo.get(table, 1)
+        repo.find("animals", "owner_name", ctx.client)
+        repo.fetch_clients()
+        repo.fetch_animals()
+    finally:
+        repo.close()
+
+
+def table_indexes(conn):
+    """{table: {leading column: index name}}"""
+    indexes = {}
+    tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    for table in tables:
+        leading = indexes.setdefault(table, {})
+        for index in conn.execute(f"PRAGMA index_list({table})").fetchall():
+            columns = conn.execute(f"PRAGMA index_info({index[1]})").fetchall()
+            if columns and columns[0][2] is not None:
+                leading.setdefault(columns[0][2], index[1])
+    return indexes
+
+
+def index_columns(conn):
+    """{index name: leading column}"""
+    columns = {}
+    for (table,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall():
+        for index in conn.execute(f"PRAGMA index_list({table})").fetchall():
+            info = conn.execute(f"PRAGMA index_info({index[1]})").fetchall()
+            if info and info[0][2] is not None:
+                columns[index[1]] = info[0][2]
+    return columns
+
+
+def _clause_column(sql, clause):
+    """First column of the statement's last ORDER BY / GROUP BY, without alias or direction"""
+    matches = re.findall(clause.replace(" ", r"\s+") + r"\s+([\w.]+)", sql, re.IGNORECASE)
+    return matches[-1].split(".")[-1] if matches else None
+
+
+def _in_order(scan, sql, leading):
+    """Does the scanned table come out in the statement's ORDER BY order?"""
+    column = _clause_column(sql, "ORDER BY")
+    if column is None:
+        return False
+    index = scan.group(2)
+    return column == "id" if index is None else leading.get(index) == column
+
+
+def check_plan(sql, plan, row_counts, indexes, leading=None):
+    """Findings for one statement: [(finding, detail)]
+
+    leading: {index name: leading column} (index_columns); without it only
+    a rowid walk counts as ORDER BY order.
+    """
+    findings = []
+    scanned = []
+    # an unfiltered ORDER BY ... LIMIT read in ORDER BY order stops after the page
+    sorted_in_temp = any(_TEMP_BTREE.search(line) for line in plan)
+    paged = re.search(r"\bLIMIT\b", sql, re.IGNORECASE) and not sorted_in_temp
+    filtered = re.search(r"\bWHERE\b", sql, re.IGNORECASE)
+    for line in plan:
+        detail = line.strip()
+        scan = _SCAN.match(detail)
+        if scan:
+            scanned.append(scan.group(1))
+            if row_counts.get(scan.group(1), 0) <= LARGE_TABLE_ROWS:
+                pass
+            elif not (paged and _in_order(scan, sql, leading or {})):
+                findings.append((f"SCAN {scan.group(1)}", detail))
+            elif filtered:
+                findings.append((f"FILTERED SCAN {scan.group(1)}", detail))
+        temp = _TEMP_BTREE.search(detail)
+        if temp:
+            # sorting the rows a SEARCH picked out is fine; sorting a whole table is not
+            column = _clause_column(sql, temp.group(1))
+            for table in scanned:
+                index = indexes.get(table, {}).get(column)
+                if index and row_counts.get(table, 0) > LARGE_TABLE_ROWS:
+                    findings.append((f"TEMP B-TREE {table}",
+                                     f"{detail} although {index} indexes {table}.{column}"))
+    return findings
+
+
+def run_check(db):
+    """[(source, sql, plan, findings with allowlist reason)] for everything exercise() runs"""
+    ctx = benchmarks.BenchContext(db, None, 0)
+    with StatementCapture(db.conn) as capture:
+        exercise(db, ctx)
+    row_counts = {table: db.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                  for table in LIST_COLUMNS.keys() | {"walkins"}}
+    indexes = table_indexes(db.conn)
+    leading = index_columns(db.conn)
+    results = []
+    for (source, _), sql in capture.statements.items():
+        plan = explain(db.conn, sql)
+        findings = [(finding, detail, ALLOWED.get((source, finding)))
+                    for finding, detail in check_plan(sql, plan, row_counts, indexes, leading)]
+        results.append((source, sql, plan, findings))
+    return results
+
+
+# ===== Command line =====
+def add_arguments(parser):
+    parser.add_argument("--db", help="check against a copy of this database instead of a generated one")
+    parser.add_argument("--clients", type=int, default=DEFAULT_CLIENTS, help="generated dataset size")
+    parser.add_argument("--data-dir", help="where generated datasets are cached (shared with bench)")
+    parser.add_argument("--no-analyze", action="store_true", help="skip ANALYZE on the copy before checking")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print every statement and its plan")
+
+
+def run(args):
+    data_dir = args.data_dir or os.path.join(tempfile.gettempdir(), "vetclinic-bench")
+    source = args.db or benchmarks.dataset(data_dir, args.clients, "clinic")
+    work = tempfile.mkdtemp(prefix="vetclinic-plancheck-")
+    slow_ms, QUERY_STATS.slow_ms = QUERY_STATS.slow_ms, None
+    try:
+        path = os.path.join(work, "check.db")
+        shutil.copyfile(source, path)
+        db = Database(path)
+        try:
+            if not args.no_analyze:
+                db.conn.execute("ANALYZE")
+            results = run_check(db)
+        finally:
+            db.conn.close()
+    finally:
+        QUERY_STATS.slow_ms = slow_ms
+        shutil.rmtree(work, ignore_errors=True)
+
+    failures = allowed = 0
+    for source_fn, sql, plan, findings in results:
+        failed = [f for f in findings if f[2] is None]
+        if failed or args.verbose:
+            print(f"{'FAIL' if failed else 'OK  '}  {source_fn}: {sql[:150]}")
+            for line in plan:
+                print(f"        {line}")
+        for finding, detail, reason in findings:
+            if reason is None:
+                failures += 1
+                print(f"      ! {finding}: {detail}")
+            else:
+                allowed += 1
+                if args.verbose:
+                    print(f"      allowed {finding}: {reason}")
+    print(f"{len(results)} statements checked: {failures} violation(s), {allowed} allowed scan(s)")
+    return 1 if failures else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check query plans for full scans and needless sorts")
+    add_arguments(parser)
+    return run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+import applog
+
+log = applog.get_logger("profiler")
+
+# Sampling profiler for the running app. A background thread wakes every
+# `interval_ms`, reads every other thread's Python stack (sys._current_frames)
+# and counts identical stacks. The result is written in the collapsed-stack
+# format flamegraph.pl, speedscope and inferno read: one line per stack,
+#     frame:InvoicesFrame;action:Mark_Paid;MainThread;main:<module>;...;database:Database.fetch_page 12
+# `tags` is a callable returning (frame name, button action) at sample time;
+# those tags head every stack so the graph splits by what the user was doing.
+
+
+def _frame_name(code):
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def collapse(frame):
+    """Stack of a frame object as "outer;...;inner" function names"""
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame.f_code))
+        frame = frame.f_back
+    names.reverse()
+    # ';' separates frames and the count follows the last space
+    return ";".join(name.replace(";", ",").replace(" ", "_") for name in names)
+
+
+def default_output():
+    return f"profile-{datetime.now():%Y%m%d-%H%M%S}.folded"
+
+
+class SamplingProfiler:
+    """Samples all threads for `duration` seconds (or until stop()) on its own thread.
+
+    When done, `path` holds the collapsed stacks (written to `output`) and
+    `done` is set; the Tk side polls `done` rather than being called back
+    from the sampling thread.
+    """
+
+    def __init__(self, duration=30, interval_ms=10, output=None, tags=None):
+        self.duration = duration
+        self.interval = interval_ms / 1000.0
+        self.output = output or default_output()
+        self.tags = tags
+        self.stacks = Counter()
+        self.samples = 0
+        self.path = None
+        self.error = None
+        self.done = threading.Event()
+        self.stopping = threading.Event()
+        self.thread = None
+
+    @property
+    def running(self):
+        return self.thread is not None and not self.done.is_set()
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """End sampling early; the profile is still written"""
+        self.stopping.set()
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+    def _tags(self):
+        if self.tags is None:
+            return ""
+        try:
+            frame, action = self.tags()
+        except Exception:
+            return ""
+        return f"frame:{frame or '-'};action:{action or '-'};".replace(" ", "_")
+
+    def _run(self):
+        me = threading.get_ident()
+        end = time.perf_counter() + self.duration
+        try:
+            while time.perf_counter() < end and not self.stopping.is_set():
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                tags = self._tags()
+                for ident, frame in sys._current_frames().items():
+                    if ident == me:
+                        continue
+                    thread = names.get(ident, f"thread-{ident}").replace(" ", "_")
+                    self.stacks[f"{tags}{thread};{collapse(frame)}"] += 1
+                frame = None  # don't keep the last stack alive between samples
+                self.samples += 1
+                self.stopping.wait(self.interval)
+            self.path = self.write(self.output)
+        except Exception as e:
+            self.error = e
+            log.exception("Error in profiler: %s", e)
+        finally:
+            self.done.set()
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return os.path.abspath(path)
+
+    def top(self, limit=10):
+        """Innermost functions by sample count: [(function, samples)]"""
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return leaves.most_common(limit)
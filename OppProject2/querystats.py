@@ -0,0 +1,347 @@
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from itertools import chain
+
+import applog
+import metrics
+
+# Query instrumentation. Database connects with InstrumentedConnection, so
+# every statement run through db.cursor, db.conn.execute or a cursor from
+# db.conn.cursor() is timed into QUERY_STATS:
+#   - per statement (whitespace-normalized SQL): calls, total/max time,
+#     a latency histogram, rows and errors, and which functions ran it
+#   - statements slower than QUERY_STATS.slow_ms go to the slow-query log
+#     with their parameters and EXPLAIN QUERY PLAN output
+#
+# A statement's time runs from execute() until its rows are fetched
+# (fetchall, fetchone returning None, a short fetchmany) or the cursor runs
+# its next statement / is closed. Rows read by iterating the cursor are not
+# counted. Set VETCLINIC_SLOW_MS to change the slow threshold at startup (an
+# explicit threshold also raises slow queries to console warnings).
+
+# Histogram bucket upper bounds, in milliseconds
+BUCKETS_MS = (0.1, 0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, float("inf"))
+
+# Statements EXPLAIN QUERY PLAN accepts (PRAGMA, CREATE, BEGIN... have no plan)
+_PLANNED = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+_THIS_FILE = __file__
+
+log = applog.get_logger("querystats")
+
+QUERY_SECONDS = metrics.histogram("vetclinic_db_query_seconds", "SQL statement time, until its rows were read")
+QUERY_ERRORS = metrics.counter("vetclinic_db_query_errors_total", "SQL statements that raised an error")
+SLOW_QUERIES = metrics.counter("vetclinic_db_slow_queries_total", "SQL statements over the slow-query threshold")
+
+
+def normalize_sql(sql):
+    return " ".join(sql.split())
+
+
+def _caller():
+    """module.function of the first frame outside this file"""
+    frame = sys._getframe(2)
+    while frame is not None and frame.f_code.co_filename == _THIS_FILE:
+        frame = frame.f_back
+    if frame is None:
+        return "?"
+    module = os.path.splitext(os.path.basename(frame.f_code.co_filename))[0]
+    return f"{module}.{frame.f_code.co_name}"
+
+
+def _short(value, limit=200):
+    text = repr(value)
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+def explain(conn, sql, params=()):
+    """EXPLAIN QUERY PLAN as indented lines (empty for statements without a plan)"""
+    if not sql.lstrip().upper().startswith(_PLANNED):
+        return []
+    cur = sqlite3.Cursor(conn)  # plain cursor: not instrumented, plain tuples
+    try:
+        rows = cur.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    except Exception as e:
+        return [f"(no plan: {e})"]
+    finally:
+        cur.close()
+    depth = {0: -1}
+    lines = []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node] + detail)
+    return lines
+
+
+class StatementStats:
+    __slots__ = ("sql", "calls", "total_ms", "max_ms", "rows", "errors", "slow", "buckets", "sources")
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.errors = 0
+        self.slow = 0
+        self.buckets = [0] * len(BUCKETS_MS)
+        self.sources = Counter()
+
+    def percentile(self, p):
+        """Upper bound of the histogram bucket holding the p-th percentile (ms)"""
+        if not self.calls:
+            return 0.0
+        wanted = p / 100.0 * self.calls
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.buckets):
+            seen += count
+            if seen >= wanted:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def asdict(self):
+        return {
+            "sql": self.sql,
+            "calls": self.calls,
+            "total_ms": self.total_ms,
+            "mean_ms": self.total_ms / self.calls if self.calls else 0.0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "max_ms": self.max_ms,
+            "rows": self.rows,
+            "errors": self.errors,
+            "slow": self.slow,
+            "histogram": dict(zip(BUCKETS_MS, self.buckets)),
+            "sources": dict(self.sources.most_common()),
+        }
+
+
+class QueryStats:
+    """Process-wide statement statistics and slow-query log (thread safe).
+
+    slow_ms: statements taking at least this long are logged (0 logs all,
+    None logs none). Slow queries log at INFO, so batch jobs stay quiet on the
+    console; warn=True (an explicit threshold) logs them at WARNING, except
+    executemany batches, which are expected to be slow. log_path: also append
+    each slow query there as a JSON line. At most `max_statements` distinct statements are tracked; the rest
+    are counted under "(other)".
+    """
+
+    def __init__(self, slow_ms=100, log_path=None, slow_log_size=200, max_statements=500, warn=False):
+        self.enabled = True
+        self.slow_ms = slow_ms
+        self.warn = warn
+        self.log_path = log_path
+        self.max_statements = max_statements
+        self.statements = {}
+        self.slow_log = deque(maxlen=slow_log_size)
+        self.since = time.time()
+        self.lock = threading.Lock()
+
+    def record(self, conn, sql, params, source, elapsed_ms, rows, error=None, many=False):
+        key = normalize_sql(sql)
+        with self.lock:
+            stats = self.statements.get(key)
+            if stats is None:
+                if len(self.statements) >= self.max_statements:
+                    key = "(other)"
+                    stats = self.statements.get(key)
+                if stats is None:
+                    stats = self.statements[key] = StatementStats(key)
+            stats.calls += 1
+            stats.total_ms += elapsed_ms
+            if elapsed_ms > stats.max_ms:
+                stats.max_ms = elapsed_ms
+            if rows > 0:
+                stats.rows += rows
+            if error is not None:
+                stats.errors += 1
+            stats.sources[source] += 1
+            for i, bound in enumerate(BUCKETS_MS):
+                if elapsed_ms <= bound:
+                    stats.buckets[i] += 1
+                    break
+            slow = self.slow_ms is not None and elapsed_ms >= self.slow_ms
+            if slow:
+                stats.slow += 1
+        QUERY_SECONDS.observe(elapsed_ms / 1000)
+        if error is not None:
+            QUERY_ERRORS.inc()
+        if slow:
+            SLOW_QUERIES.inc()
+            self._log_slow(conn, sql, params, source, elapsed_ms, rows, error, many)
+
+    def _log_slow(self, conn, sql, params, source, elapsed_ms, rows, error, many):
+        # for executemany, params is the first parameter set (the rest were streamed)
+        plan = [] if many and not params else explain(conn, sql, params)
+        entry = {
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "ms": round(elapsed_ms, 3),
+            "rows": rows,
+            "source": source,
+            "thread": threading.current_thread().name,
+            "sql": normalize_sql(sql),
+            "params": f"(executemany) first: {_short(params)}" if many else _short(params),
+            "plan": plan,
+            "error": None if error is None else str(error),
+        }
+        with self.lock:
+            self.slow_log.append(entry)
+            log_path = self.log_path
+            level = logging.WARNING if self.warn and not many else logging.INFO
+        log.log(level, "Slow query (%.1f ms, %s): %s", elapsed_ms, source, entry["sql"][:120],
+                extra={"sql": entry["sql"], "ms": entry["ms"], "source": source, "plan": plan})
+        if log_path:
+            try:
+                with open(log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry) + "\n")
+            except OSError as e:
+                log.error("Error writing slow query log: %s", e)
+
+    def snapshot(self):
+        """Per-statement stats (dicts), slowest total time first"""
+        with self.lock:
+            rows = [stats.asdict() for stats in self.statements.values()]
+        rows.sort(key=lambda row: row["total_ms"], reverse=True)
+        return rows
+
+    def slow_queries(self):
+        """Slow-query log entries, newest first"""
+        with self.lock:
+            return list(reversed(self.slow_log))
+
+    def reset(self):
+        with self.lock:
+            self.statements.clear()
+            self.slow_log.clear()
+            self.since = time.time()
+
+    def summary(self, limit=20):
+        """Text table of the statements with the most total time"""
+        rows = self.snapshot()
+        lines = [f"{'calls':>7} {'total ms':>10} {'mean':>8} {'p95':>8} {'max':>8} {'rows':>9} {'err':>4}  source / sql"]
+        for row in rows[:limit]:
+            source = next(iter(row["sources"]), "?")
+            lines.append(
+                f"{row['calls']:>7} {row['total_ms']:>10.1f} {row['mean_ms']:>8.2f} {row['p95_ms']:>8.2f} "
+                f"{row['max_ms']:>8.2f} {row['rows']:>9} {row['errors']:>4}  {source}: {row['sql'][:80]}"
+            )
+        if len(rows) > limit:
+            lines.append(f"... {len(rows) - limit} more statements")
+        return "\n".join(lines) + "\n"
+
+
+def _default_slow_ms():
+    try:
+        return float(os.environ.get("VETCLINIC_SLOW_MS", 100))
+    except ValueError:
+        return 100
+
+
+QUERY_STATS = QueryStats(slow_ms=_default_slow_ms(), warn=bool(os.environ.get("VETCLINIC_SLOW_MS")))
+
+
+# ===== sqlite3 classes =====
+class InstrumentedCursor(sqlite3.Cursor):
+    def __init__(self, connection):
+        super().__init__(connection)
+        # [sql, params, source, elapsed_ms, rows, many] of the statement being read
+        self._pending = None
+
+    def _finish(self, error=None):
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            sql, params, source, elapsed_ms, rows, many = pending
+            QUERY_STATS.record(self.connection, sql, params, source, elapsed_ms, rows, error, many)
+
+    def _run(self, method, sql, params, many):
+        if self._pending is not None:
+            self._finish()
+        if not QUERY_STATS.enabled:
+            return method(self, sql, params)
+        source = _caller()
+        call_params = params
+        if many:
+            # keep the first parameter set so a slow executemany can be EXPLAINed
+            rest = iter(params)
+            first = next(rest, None)
+            params = () if first is None else first
+            call_params = rest if first is None else chain((first,), rest)
+        start = time.perf_counter()
+        try:
+            method(self, sql, call_params)
+        except Exception as e:
+            self._pending = [sql, params, source, (time.perf_counter() - start) * 1000, 0, many]
+            self._finish(e)
+            raise
+        elapsed = (time.perf_counter() - start) * 1000
+        self._pending = [sql, params, source, elapsed, max(self.rowcount, 0), many]
+        if self.description is None:
+            self._finish()  # no rows to read (INSERT/UPDATE/DDL...)
+        return self
+
+    def execute(self, sql, parameters=()):
+        return self._run(sqlite3.Cursor.execute, sql, parameters, False)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._run(sqlite3.Cursor.executemany, sql, seq_of_parameters, True)
+
+    def fetchone(self):
+        if self._pending is None:
+            return super().fetchone()
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._pending[3] += (time.perf_counter() - start) * 1000
+        if row is None:
+            self._finish()
+        else:
+            self._pending[4] += 1
+        return row
+
+    def fetchmany(self, size=None):
+        if self._pending is None:
+            return super().fetchmany(size or self.arraysize)
+        size = size or self.arraysize
+        start = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._pending[3] += (time.perf_counter() - start) * 1000
+        self._pending[4] += len(rows)
+        if len(rows) < size:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        if self._pending is None:
+            return super().fetchall()
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._pending[3] += (time.perf_counter() - start) * 1000
+        self._pending[4] += len(rows)
+        self._finish()
+        return rows
+
+    def close(self):
+        if self._pending is not None:
+            self._finish()
+        super().close()
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """sqlite3.connect(path, factory=InstrumentedConnection)"""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    # the C versions bypass the cursor class's execute, so route them through it
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
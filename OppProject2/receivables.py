@@ -0,0 +1,282 @@
+import argparse
+import sys
+from datetime import date
+
+from database import Database, DB_FILE
+
+# Accounts receivable: what each client owes and for how long, computed in
+# SQL so collections can run it daily over years of invoices. Only open
+# (Unpaid) invoices are read, through the partial index idx_invoices_due
+# (date, client, amount, paid_amount) WHERE status = 'Unpaid', so the cost
+# follows the number of open invoices, not the size of the invoice table.
+# What is owed on an invoice is amount - paid_amount (paid_amount is kept by
+# the payments triggers, see database.BALANCE_TRIGGERS).
+#
+# Status and paid_amount are the invoice's current ones, so "as of" a past
+# date ages the invoices issued by then that are still open now.
+#
+#     python -m cli ar aging --page 2
+#     python -m cli ar statement "Maria Santos" -o santos.csv
+
+PAGE_SIZE = 50
+
+# (label, first day, last day or None); an invoice's age is days since its date
+AGING_BUCKETS = (
+    ("0-30", 0, 30),
+    ("31-60", 31, 60),
+    ("61-90", 61, 90),
+    ("90+", 91, None),
+)
+BUCKET_COLUMNS = ("days_0_30", "days_31_60", "days_61_90", "over_90")
+
+# what is still owed on an invoice row
+BALANCE = "amount - paid_amount"
+
+# aging page order -> ORDER BY
+AGING_SORTS = {
+    "balance": "total DESC, client",
+    "oldest": "oldest_days DESC, client",
+    "client": "client",
+}
+
+
+def _as_of(as_of):
+    return as_of or date.today().isoformat()
+
+
+def _age(column="date"):
+    return f"CAST(julianday(:as_of) - julianday({column}) AS INTEGER)"
+
+
+def _bucket_sums(age="age", balance="balance"):
+    sums = []
+    for (label, first, last), column in zip(AGING_BUCKETS, BUCKET_COLUMNS):
+        if last is None:
+            condition = f"{age} >= {first}"
+        elif first == 0:
+            condition = f"{age} <= {last}"
+        else:
+            condition = f"{age} BETWEEN {first} AND {last}"
+        sums.append(f"SUM(CASE WHEN {condition} THEN {balance} ELSE 0 END) AS {column}")
+    return ",\n               ".join(sums)
+
+
+def _bucket_label(age="age"):
+    cases = " ".join(f"WHEN {age} <= {last} THEN '{label}'" for label, _, last in AGING_BUCKETS if last is not None)
+    return f"CASE {cases} ELSE '{AGING_BUCKETS[-1][0]}' END"
+
+
+_OPEN = f"""
+    SELECT client, {BALANCE} AS balance, {_age()} AS age
+    FROM invoices
+    WHERE status = 'Unpaid' AND date <= :as_of"""
+
+
+# ===== Queries =====
+def totals_query(as_of=None):
+    """(sql, params) for one row: open invoices, clients, the four buckets, total"""
+    sql = f"""
+        SELECT COUNT(*) AS invoices,
+               COUNT(DISTINCT client) AS clients,
+               {_bucket_sums()},
+               SUM(balance) AS total
+        FROM ({_OPEN})"""
+    return sql, {"as_of": _as_of(as_of)}
+
+
+def aging_query(as_of=None, sort="balance", min_balance=0, limit=None, offset=0):
+    """(sql, params) for the per-client aging rows.
+
+    Columns: client, invoices, the four buckets, total, oldest_days and,
+    when paging, clients (the row count before paging, from a window, so a
+    page needs no separate COUNT query). limit=None returns every client.
+    """
+    if sort not in AGING_SORTS:
+        raise ValueError(f"Unknown sort '{sort}' (use {', '.join(AGING_SORTS)})")
+    sql = f"""
+        SELECT client, invoices, {', '.join(BUCKET_COLUMNS)}, total, oldest_days{{count}}
+        FROM (
+            SELECT client, COUNT(*) AS invoices,
+                   {_bucket_sums()},
+                   SUM(balance) AS total,
+                   MAX(age) AS oldest_days
+            FROM ({_OPEN})
+            GROUP BY client
+        )
+        WHERE total > :min_balance
+        ORDER BY {AGING_SORTS[sort]}"""
+    params = {"as_of": _as_of(as_of), "min_balance": min_balance}
+    return _paged(sql, params, "clients", limit, offset)
+
+
+def statement_query(client, as_of=None, limit=None, offset=0):
+    """(sql, params) for a client's statement: invoices and payments up to as_of, oldest first.
+
+    Columns: date, kind ("Invoice" or the payment method), invoice_no, pet,
+    charge, payment, due / age_days / bucket (invoice lines only), balance
+    (running charges - payments, from a window over all lines, so it is
+    right on every page) and, when paging, lines.
+    """
+    sql = f"""
+        SELECT date, kind, invoice_no, pet, charge, payment, due,
+               CASE WHEN kind = 'Invoice' THEN {_age()} END AS age_days,
+               CASE WHEN due > 0 THEN {_bucket_label(_age())} ELSE '' END AS bucket,
+               SUM(charge - payment) OVER (ORDER BY date, line, id ROWS UNBOUNDED PRECEDING) AS balance{{count}}
+        FROM (
+            SELECT id, 0 AS line, date, 'Invoice' AS kind, invoice_no, pet,
+                   COALESCE(amount, 0) AS charge, 0 AS payment, {BALANCE} AS due
+            FROM invoices
+            WHERE client = :client AND date <= :as_of
+            UNION ALL
+            SELECT p.id, 1, p.date, COALESCE(NULLIF(p.method, ''), 'Payment'), i.invoice_no, i.pet,
+                   0, p.amount, NULL
+            FROM invoices i JOIN payments p ON p.invoice_id = i.id
+            WHERE i.client = :client AND p.date <= :as_of
+        )
+        ORDER BY date, line, id"""
+    params = {"client": client, "as_of": _as_of(as_of)}
+    return _paged(sql, params, "lines", limit, offset)
+
+
+def _paged(sql, params, count_name, limit, offset):
+    """Add LIMIT/OFFSET and a COUNT(*) OVER () column named count_name, or neither"""
+    if limit is None:
+        return sql.format(count=""), params
+    sql = sql.format(count=f",\n               COUNT(*) OVER () AS {count_name}")
+    return sql + " LIMIT :limit OFFSET :offset", {**params, "limit": limit, "offset": offset}
+
+
+def _rows(db, query):
+    sql, params = query
+    cur = db.conn.cursor()
+    cur.row_factory = None
+    try:
+        cur.execute(sql, params)
+        return cur.fetchall()
+    finally:
+        cur.close()
+
+
+def aging_totals(db, as_of=None):
+    """{"invoices", "clients", bucket columns..., "total"} over all open invoices"""
+    row = _rows(db, totals_query(as_of))[0]
+    return dict(zip(("invoices", "clients") + BUCKET_COLUMNS + ("total",), (value or 0 for value in row)))
+
+
+def aging_page(db, as_of=None, sort="balance", page=1, page_size=PAGE_SIZE, min_balance=0):
+    """(rows, total clients) for one page of the per-client aging (pages start at 1)"""
+    rows = _rows(db, aging_query(as_of, sort, min_balance, page_size, (page - 1) * page_size))
+    return [row[:-1] for row in rows], (rows[0][-1] if rows else 0)
+
+
+def statement_page(db, client, as_of=None, page=1, page_size=PAGE_SIZE):
+    """(rows, total lines) for one page of a client's statement"""
+    rows = _rows(db, statement_query(client, as_of, page_size, (page - 1) * page_size))
+    return [row[:-1] for row in rows], (rows[0][-1] if rows else 0)
+
+
+# ===== Text =====
+def pages(total, page_size=PAGE_SIZE):
+    return max(1, -(-total // page_size))
+
+
+def aging_text(db, as_of=None, sort="balance", page=1, page_size=PAGE_SIZE):
+    as_of = _as_of(as_of)
+    totals = aging_totals(db, as_of)
+    rows, count = aging_page(db, as_of, sort, page, page_size)
+    labels = [label for label, _, _ in AGING_BUCKETS]
+    lines = [
+        "=" * 100,
+        f"{'ACCOUNTS RECEIVABLE AGING':^100}",
+        "=" * 100,
+        f"As of:                   {as_of}",
+        f"Open invoices:           {totals['invoices']:,}",
+        f"Clients owing:           {totals['clients']:,}",
+        "",
+        "  ".join(f"{label:>12}" for label in labels) + f"  {'Total':>12}",
+        "  ".join(f"{totals[column]:>12,.2f}" for column in BUCKET_COLUMNS) + f"  {totals['total']:>12,.2f}",
+        "",
+        "=" * 100,
+        f"BY CLIENT (page {page} of {pages(count, page_size)}, {count:,} clients)",
+        "=" * 100,
+        f"{'Client':<28}{'Inv':>5}" + "".join(f"{label:>12}" for label in labels) + f"{'Total':>13}{'Oldest':>8}",
+    ]
+    for client, invoices, *buckets, total, oldest in rows:
+        lines.append(f"{str(client)[:27]:<28}{invoices:>5}" + "".join(f"{value:>12,.2f}" for value in buckets)
+                     + f"{total:>13,.2f}{oldest:>8}")
+    return "\n".join(lines) + "\n"
+
+
+def statement_text(db, client, as_of=None, page=1, page_size=PAGE_SIZE):
+    as_of = _as_of(as_of)
+    rows, count = statement_page(db, client, as_of, page, page_size)
+    owed = _rows(db, ("SELECT (SELECT COALESCE(SUM(amount), 0) FROM invoices "
+                      "WHERE client = :client AND date <= :as_of) - "
+                      "(SELECT COALESCE(SUM(p.amount), 0) FROM invoices i JOIN payments p ON p.invoice_id = i.id "
+                      "WHERE i.client = :client AND p.date <= :as_of)",
+                      {"client": client, "as_of": as_of}))[0][0]
+    lines = [
+        "=" * 90,
+        f"{'STATEMENT OF ACCOUNT':^90}",
+        "=" * 90,
+        f"Client:                  {client}",
+        f"As of:                   {as_of}",
+        f"Balance due:             ${owed:,.2f}",
+        f"Lines:                   {count:,} (page {page} of {pages(count, page_size)})",
+        "",
+        f"{'Date':<12}{'':<9}{'Invoice':<20}{'Pet':<12}{'Charge':>10}{'Payment':>10}{'Due':>10}{'Age':>6} "
+        f"{'Bucket':<7}{'Balance':>11}",
+    ]
+    for day, kind, invoice_no, pet, charge, payment, due, age, bucket, balance in rows:
+        if kind == "Invoice":
+            lines.append(f"{str(day):<12}{kind:<9}{str(invoice_no)[:19]:<20}{str(pet)[:11]:<12}{charge:>10,.2f}"
+                         f"{'':>10}{due:>10,.2f}{age:>6} {bucket:<7}{balance:>11,.2f}")
+        else:
+            lines.append(f"{str(day):<12}{str(kind)[:8]:<9}{str(invoice_no)[:19]:<20}{'':<12}{'':>10}"
+                         f"{payment:>10,.2f}{'':>10}{'':>6} {'':<7}{balance:>11,.2f}")
+    return "\n".join(lines) + "\n"
+
+
+# ===== Command line =====
+def add_arguments(parser):
+    parser.add_argument("view", choices=("aging", "statement"))
+    parser.add_argument("client", nargs="?", help="client name (statement)")
+    parser.add_argument("--db", default=DB_FILE, help="database file")
+    parser.add_argument("--as-of", help="age invoices as of this date (YYYY-MM-DD, default today)")
+    parser.add_argument("--sort", choices=sorted(AGING_SORTS), default="balance", help="aging order")
+    parser.add_argument("--page", type=int, default=1)
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    parser.add_argument("-o", "--output", help="export every row (not one page) to .csv/.jsonl[.gz]")
+
+
+def run(args):
+    import exporter
+    if args.view == "statement" and not args.client:
+        print("Error: statement needs a client name", file=sys.stderr)
+        return 2
+    db = Database(args.db)
+    try:
+        if args.output:
+            if args.view == "aging":
+                sql, params = aging_query(args.as_of, args.sort)
+            else:
+                sql, params = statement_query(args.client, args.as_of)
+            count = exporter.export_query(db, sql, params, args.output)
+            print(f"Exported {count} rows to {args.output}")
+        elif args.view == "aging":
+            sys.stdout.write(aging_text(db, args.as_of, args.sort, args.page, args.page_size))
+        else:
+            sys.stdout.write(statement_text(db, args.client, args.as_of, args.page, args.page_size))
+    finally:
+        db.conn.close()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Accounts receivable aging and client statements")
+    add_arguments(parser)
+    return run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+import sys
+from operator import attrgetter
+
+# Typed rows for the clinic tables. Database installs record_factory as its
+# row_factory, so a SELECT of a table's list columns (database.LIST_COLUMNS)
+# yields these instead of plain tuples; any other query still gets tuples.
+#
+# Records use __slots__ (no per-row __dict__) and intern the short text
+# fields that repeat across rows (names, dates, statuses), so 100k rows take
+# about half the memory of tuples. They still behave like sequences
+# (record[4], len(), iteration, == with tuples) for older code. Records are
+# shared between frames (see repository.py), so treat them as read-only.
+
+_intern = sys.intern
+
+
+def _shared(value):
+    return _intern(value) if type(value) is str else value
+
+
+# column names -> record class (filled in by Record.__init_subclass__)
+RECORD_TYPES = {}
+
+
+class Record:
+    __slots__ = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._values = attrgetter(*cls.__slots__)
+        RECORD_TYPES[cls.__slots__] = cls
+
+    def astuple(self):
+        return self._values(self)
+
+    def asdict(self):
+        return dict(zip(self.__slots__, self._values(self)))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._values(self)[index]
+        return getattr(self, self.__slots__[index])
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def __iter__(self):
+        return iter(self._values(self))
+
+    def __eq__(self, other):
+        if isinstance(other, (Record, tuple)):
+            return tuple(self) == tuple(other)
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self._values(self))
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={value!r}" for name, value in zip(self.__slots__, self._values(self)))
+        return f"{type(self).__name__}({fields})"
+
+    def __reduce__(self):
+        return (type(self), self._values(self))
+
+
+class Client(Record):
+    __slots__ = ("id", "name", "contact", "address")
+
+    def __init__(self, id, name, contact, address):
+        self.id = id
+        self.name = _shared(name)
+        self.contact = contact
+        self.address = address
+
+
+class Animal(Record):
+    __slots__ = ("id", "pet_name", "species", "breed", "age", "owner_name")
+
+    def __init__(self, id, pet_name, species, breed, age, owner_name):
+        self.id = id
+        self.pet_name = _shared(pet_name)
+        self.species = _shared(species)
+        self.breed = _shared(breed)
+        self.age = age
+        self.owner_name = _shared(owner_name)
+
+
+class Appointment(Record):
+    __slots__ = ("id", "client_name", "pet_name", "date", "time", "reason")
+
+    def __init__(self, id, client_name, pet_name, date, time, reason):
+        self.id = id
+        self.client_name = _shared(client_name)
+        self.pet_name = _shared(pet_name)
+        self.date = _shared(date)
+        self.time = _shared(time)
+        self.reason = _shared(reason)
+
+    def label(self):
+        """Combobox text: Client - Pet (Reason) #id (the id keeps repeats apart)"""
+        return f"{self.client_name} - {self.pet_name} ({self.reason}) #{self.id}"
+
+
+class Treatment(Record):
+    __slots__ = ("id", "reason", "pet", "client", "treatment_type", "date", "confined", "notes")
+
+    def __init__(self, id, reason, pet, client, treatment_type, date, confined, notes):
+        self.id = id
+        self.reason = _shared(reason)
+        self.pet = _shared(pet)
+        self.client = _shared(client)
+        self.treatment_type = _shared(treatment_type)
+        self.date = _shared(date)
+        self.confined = _shared(confined)
+        self.notes = notes
+
+
+class Invoice(Record):
+    __slots__ = ("id", "invoice_no", "client", "pet", "amount", "date", "status", "paid_amount")
+
+    def __init__(self, id, invoice_no, client, pet, amount, date, status, paid_amount=0.0):
+        self.id = id
+        self.invoice_no = invoice_no
+        self.client = _shared(client)
+        self.pet = _shared(pet)
+        self.amount = amount
+        self.date = _shared(date)
+        self.status = _shared(status)
+        self.paid_amount = paid_amount
+
+    @property
+    def due(self):
+        """Amount still owed (kept by the payments triggers, no lookup needed)"""
+        return (self.amount or 0) - (self.paid_amount or 0)
+
+
+class PetStatus(Record):
+    __slots__ = ("id", "pet", "client", "status", "date", "notes")
+
+    def __init__(self, id, pet, client, status, date, notes):
+        self.id = id
+        self.pet = _shared(pet)
+        self.client = _shared(client)
+        self.status = _shared(status)
+        self.date = _shared(date)
+        self.notes = notes
+
+
+class Walkin(Record):
+    # columns of Database.fetch_walkins (no address)
+    __slots__ = ("id", "client_name", "contact", "pet_name", "species", "breed", "age", "reason", "date")
+
+    def __init__(self, id, client_name, contact, pet_name, species, breed, age, reason, date):
+        self.id = id
+        self.client_name = _shared(client_name)
+        self.contact = contact
+        self.pet_name = _shared(pet_name)
+        self.species = _shared(species)
+        self.breed = _shared(breed)
+        self.age = age
+        self.reason = _shared(reason)
+        self.date = _shared(date)
+
+
+# (cursor.description, record class or None) of the last query seen;
+# description is the same object for every row of one query
+_last_query = (None, None)
+
+
+def record_factory(cursor, row):
+    """sqlite3 row_factory: a Record when the columns match a record type, else the tuple"""
+    global _last_query
+    description = cursor.description
+    last_description, cls = _last_query
+    if description is not last_description:
+        cls = RECORD_TYPES.get(tuple(column[0] for column in description))
+        _last_query = (description, cls)
+    return cls(*row) if cls is not None else row
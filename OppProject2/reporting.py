@@ -0,0 +1,344 @@
+import functools
+import time
+from datetime import datetime
+
+import metrics
+import receivables
+from services import TREATMENT_COSTS
+
+# Plain-text report builders shared by ReportsFrame and the command line.
+# Each takes a Database and returns the report text. Most also accept the
+# Repository; the receivables ones run SQL and need the Database.
+
+REPORTS_GENERATED = metrics.counter("vetclinic_reports_generated_total", "Reports built", ("report",))
+REPORT_SECONDS = metrics.histogram("vetclinic_report_seconds", "Time to build a report", ("report",))
+
+
+def _measured(name):
+    """Count and time every call of a report builder under `name`"""
+    def decorate(build):
+        @functools.wraps(build)
+        def wrapper(db):
+            start = time.perf_counter()
+            text = build(db)
+            REPORT_SECONDS.observe(time.perf_counter() - start, report=name)
+            REPORTS_GENERATED.inc(report=name)
+            return text
+        return wrapper
+    return decorate
+
+
+def _revenue_totals(db, start, end):
+    """(invoices, total, paid, unpaid) for the days start..end, from the daily rollup"""
+    rows = db.fetch_revenue("daily", start, end)
+    return (sum(row[1] for row in rows), sum(row[2] for row in rows),
+            sum(row[3] for row in rows), sum(row[4] for row in rows))
+
+
+@_measured("daily")
+def daily_revenue(db):
+    """Daily revenue report text"""
+    today = datetime.now().strftime("%Y-%m-%d")
+    count, total_revenue, paid_revenue, unpaid_revenue = _revenue_totals(db, today, today)
+
+    report = f"""
+{'='*60}
+                   DAILY REVENUE REPORT
+{'='*60}
+Date:                    {today}
+Generated:               {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+
+{'='*60}
+SUMMARY
+{'='*60}
+Total Invoices:          {count}
+Total Revenue:           ${total_revenue:.2f}
+Paid Revenue:            ${paid_revenue:.2f}
+Unpaid Revenue:          ${unpaid_revenue:.2f}
+
+{'='*60}
+END OF REPORT
+{'='*60}
+"""
+    return report
+
+
+@_measured("monthly")
+def monthly_revenue(db):
+    """Monthly revenue report text"""
+    today = datetime.now()
+    month_start = today.strftime("%Y-%m-01")
+    month_end = today.strftime("%Y-%m-%d")
+
+    # month to date, so summed from the daily rollup rather than monthly_revenue
+    count, total_revenue, paid_revenue, unpaid_revenue = _revenue_totals(db, month_start, month_end)
+
+    month_name = today.strftime("%B %Y")
+
+    report = f"""
+{'='*60}
+                   MONTHLY REVENUE REPORT
+{'='*60}
+Month:                   {month_name}
+Period:                  {month_start} to {month_end}
+Generated:               {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+
+{'='*60}
+SUMMARY
+{'='*60}
+Total Invoices:          {count}
+Total Revenue:           ${total_revenue:.2f}
+Paid Revenue:            ${paid_revenue:.2f}
+Unpaid Revenue:          ${unpaid_revenue:.2f}
+
+{'='*60}
+END OF REPORT
+{'='*60}
+"""
+    return report
+
+
+@_measured("treatments")
+def treatment_summary(db):
+    """Treatment summary report text"""
+    treatments = db.fetch_treatments()
+
+    treatment_types = {}
+    total_treatments = 0
+
+    for treatment in treatments:
+        treatment_type = treatment.treatment_type
+        total_treatments += 1
+
+        if treatment_type not in treatment_types:
+            treatment_types[treatment_type] = 0
+        treatment_types[treatment_type] += 1
+
+    report = f"""
+{'='*60}
+                   TREATMENT SUMMARY REPORT
+{'='*60}
+Generated:               {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+
+{'='*60}
+TREATMENT BREAKDOWN
+{'='*60}
+Total Treatments:        {total_treatments}
+
+"""
+    total_treatment_revenue = 0
+    for treatment_type, count in sorted(treatment_types.items()):
+        cost = TREATMENT_COSTS.get(treatment_type, 0)
+        revenue = cost * count
+        total_treatment_revenue += revenue
+        report += f"{treatment_type:<30} {count:>5} (${revenue:.2f})\n"
+
+    report += f"""
+{'='*60}
+Total Treatment Revenue: ${total_treatment_revenue:.2f}
+{'='*60}
+END OF REPORT
+{'='*60}
+"""
+    return report
+
+
+@_measured("clients")
+def client_summary(db):
+    """Client summary report text"""
+    clients = db.fetch_clients()
+    animals = db.fetch_animals()
+    invoices = db.fetch_invoices()
+
+    total_clients = len(clients)
+    total_animals = len(animals)
+    total_invoices = len(invoices)
+
+    # Count animals by species
+    species_count = {}
+    for animal in animals:
+        species = animal.species
+        if species not in species_count:
+            species_count[species] = 0
+        species_count[species] += 1
+
+    # Calculate payment status
+    paid_count = sum(1 for inv in invoices if inv.status == "Paid")
+    unpaid_count = sum(1 for inv in invoices if inv.status == "Unpaid")
+
+    report = f"""
+{'='*60}
+                   CLIENT SUMMARY REPORT
+{'='*60}
+Generated:               {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+
+{'='*60}
+STATISTICS
+{'='*60}
+Total Clients:           {total_clients}
+Total Animals:           {total_animals}
+Total Invoices:          {total_invoices}
+
+{'='*60}
+ANIMALS BY SPECIES
+{'='*60}
+"""
+    for species, count in sorted(species_count.items()):
+        report += f"{species:<30} {count:>5}\n"
+
+    report += f"""
+{'='*60}
+PAYMENT STATUS
+{'='*60}
+Paid Invoices:           {paid_count}
+Unpaid Invoices:         {unpaid_count}
+
+{'='*60}
+END OF REPORT
+{'='*60}
+"""
+    return report
+
+
+@_measured("appointments")
+def appointment_summary(db):
+    """Appointment summary report text"""
+    appointments = db.fetch_appointments()
+
+    total_appointments = len(appointments)
+    reason_count = {}
+
+    for appt in appointments:
+        reason = appt.reason
+        if reason not in reason_count:
+            reason_count[reason] = 0
+        reason_count[reason] += 1
+
+    report = f"""
+{'='*60}
+                   APPOINTMENT SUMMARY REPORT
+{'='*60}
+Generated:               {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+
+{'='*60}
+APPOINTMENT STATISTICS
+{'='*60}
+Total Appointments:      {total_appointments}
+
+{'='*60}
+APPOINTMENTS BY REASON
+{'='*60}
+"""
+    for reason, count in sorted(reason_count.items()):
+        report += f"{reason:<40} {count:>5}\n"
+
+    report += f"""
+{'='*60}
+END OF REPORT
+{'='*60}
+"""
+    return report
+
+
+@_measured("species")
+def species_report(db):
+    """Detailed species report text"""
+    animals = db.fetch_animals()
+
+    species_data = {}
+
+    for animal in animals:
+        species = animal.species
+        breed = animal.breed
+        pet_name = animal.pet_name
+        owner = animal.owner_name
+
+        if species not in species_data:
+            species_data[species] = []
+
+        species_data[species].append({
+            'name': pet_name,
+            'breed': breed,
+            'owner': owner
+        })
+
+    report = f"""
+{'='*60}
+                   SPECIES DETAILED REPORT
+{'='*60}
+Generated:               {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+
+"""
+    for species in sorted(species_data.keys()):
+        animals_list = species_data[species]
+        report += f"""
+{'='*60}
+{species.upper()} ({len(animals_list)} total)
+{'='*60}
+"""
+        for animal in animals_list:
+            report += f"Name: {animal['name']:<20} Breed: {animal['breed']:<25} Owner: {animal['owner']}\n"
+
+    report += f"""
+{'='*60}
+END OF REPORT
+{'='*60}
+"""
+    return report
+
+
+@_measured("outstanding")
+def outstanding_invoices(db):
+    """Outstanding (unpaid) invoices report text"""
+    # oldest first, read in order off the partial index of open invoices
+    cur = db.conn.cursor()
+    cur.row_factory = None
+    cur.execute(f"SELECT invoice_no, client, {receivables.BALANCE}, date FROM invoices "
+                "WHERE status = 'Unpaid' ORDER BY date")
+    outstanding = cur.fetchall()
+    cur.close()
+    totals = receivables.aging_totals(db)
+    total_outstanding = sum(row[2] or 0 for row in outstanding)
+
+    report = f"""
+{'='*60}
+                   OUTSTANDING INVOICES REPORT
+{'='*60}
+Generated:               {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+
+{'='*60}
+UNPAID INVOICES: {len(outstanding)}
+TOTAL OUTSTANDING: ${total_outstanding:.2f}
+{'='*60}
+"""
+    for (label, _, _), column in zip(receivables.AGING_BUCKETS, receivables.BUCKET_COLUMNS):
+        report += f"{label + ' days:':<25}${totals[column]:.2f}\n"
+    report += f"{'='*60}\n\n"
+    for invoice_no, client, amount, day in outstanding:
+        report += f"Invoice: {invoice_no:<15} Client: {client:<20} Due: ${amount:>8.2f}  Date: {day}\n"
+
+    report += f"""
+{'='*60}
+END OF REPORT
+{'='*60}
+"""
+    return report
+
+
+@_measured("aging")
+def ar_aging(db):
+    """Accounts receivable aging text (first page of clients by balance)"""
+    return receivables.aging_text(db, page_size=100)
+
+
+# name -> builder, used by the command line
+REPORTS = {
+    "daily": daily_revenue,
+    "monthly": monthly_revenue,
+    "treatments": treatment_summary,
+    "clients": client_summary,
+    "appointments": appointment_summary,
+    "species": species_report,
+    "outstanding": outstanding_invoices,
+    "aging": ar_aging,
+}
@@ -0,0 +1,207 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from database import Database, LIST_COLUMNS
+
+# Database method that lists each table, in the order the frames show it
+FETCH_METHODS = {
+    "clients": "fetch_clients",
+    "animals": "fetch_animals",
+    "appointments": "fetch_appointments",
+    "treatments": "fetch_treatments",
+    "invoices": "fetch_invoices",
+    "pet_status": "fetch_pet_status",
+}
+
+# seconds between PRAGMA data_version checks for other terminals' commits
+EXTERNAL_CHECK_INTERVAL = 0.5
+
+
+class Repository:
+    """Shared in-memory copy of the clinic records, one object per table+id.
+
+    Rows are kept in an identity map ((table, id) -> record, the __slots__
+    objects from records.py) so every frame that asks for the same record
+    gets the same object. Each table keeps at most `capacity` records (least
+    recently used are dropped), and a full table listing is only cached while
+    it fits. Commits made through any Database on the same file (including
+    the worker thread's) invalidate the affected tables/rows. Commits from
+    other terminals can't say which tables they touched: PRAGMA data_version
+    is checked before serving cached rows, at most once every
+    `check_interval` seconds (a query of its own, so not on every hit), and
+    any commit by another connection drops the whole cache. Another
+    terminal's change can therefore be served stale for up to that long.
+
+    The fetch_* methods mirror Database's, so report builders accept either.
+    """
+
+    def __init__(self, db, capacity=20000, check_interval=EXTERNAL_CHECK_INTERVAL):
+        self.db = db
+        self.path = os.path.abspath(db.path)
+        self.capacity = capacity
+        self.check_interval = check_interval
+        self.records = {table: OrderedDict() for table in LIST_COLUMNS}
+        self.listings = {}  # table -> cached rows of the full listing
+        self.versions = dict.fromkeys(LIST_COLUMNS, 0)  # bumped on every write
+        self.hits = 0
+        self.misses = 0
+        self.external_clears = 0
+        self.lock = threading.RLock()
+        self.data_version = db.data_version()
+        self.checked_at = time.monotonic()
+        Database.add_write_listener(self.on_write)
+
+    def close(self):
+        Database.remove_write_listener(self.on_write)
+
+    # ===== Identity map =====
+    def _canonical(self, table, row):
+        """Return the cached object for this row (storing it if new or changed)"""
+        records = self.records[table]
+        key = row.id
+        current = records.get(key)
+        if current is not None and current == row:
+            records.move_to_end(key)
+            return current
+        records[key] = row
+        records.move_to_end(key)
+        if len(records) > self.capacity:
+            records.popitem(last=False)
+        return row
+
+    def get(self, table, row_id):
+        """One record by id (None if it does not exist)"""
+        row_id = int(row_id)  # Treeview values may come back as strings
+        self.check_external()
+        with self.lock:
+            row = self.records[table].get(row_id)
+            if row is not None:
+                self.records[table].move_to_end(row_id)
+                self.hits += 1
+                return row
+            self.misses += 1
+            version = self.versions[table]
+        self.db.cursor.execute(f"SELECT {', '.join(LIST_COLUMNS[table])} FROM {table} WHERE id=?", (row_id,))
+        row = self.db.cursor.fetchone()
+        if row is None:
+            return None
+        with self.lock:
+            # a write committed meanwhile may have made this row stale: don't keep it
+            if version != self.versions[table]:
+                return row
+            return self._canonical(table, row)
+
+    def all(self, table):
+        """Every row of `table`, in the same order as the Database fetch_* method"""
+        self.check_external()
+        with self.lock:
+            rows = self.listings.get(table)
+            if rows is not None:
+                self.hits += 1
+                return rows
+            self.misses += 1
+            version = self.versions[table]
+        rows = getattr(self.db, FETCH_METHODS[table])()
+        if len(rows) > self.capacity:
+            return rows  # too big to keep; don't churn the map with it
+        with self.lock:
+            if version != self.versions[table]:
+                return rows
+            rows = [self._canonical(table, row) for row in rows]
+            self.listings[table] = rows
+        return rows
+
+    def find(self, table, column, value):
+        """Rows where column == value, ordered by id (read through the identity map)"""
+        if column not in LIST_COLUMNS[table]:
+            raise ValueError(f"Unknown column {column!r} for {table}")
+        self.check_external()
+        with self.lock:
+            version = self.versions[table]
+        self.db.cursor.execute(
+            f"SELECT {', '.join(LIST_COLUMNS[table])} FROM {table} WHERE {column}=? ORDER BY id",
+            (value,)
+        )
+        rows = self.db.cursor.fetchall()
+        with self.lock:
+            if version != self.versions[table]:
+                return rows
+            return [self._canonical(table, row) for row in rows]
+
+    # ===== Invalidation =====
+    def check_external(self, force=False):
+        """Drop the cache if another connection committed since the last check (self.db's thread).
+
+        Runs PRAGMA data_version at most once per check_interval unless
+        `force`. data_version only says that something changed, not how
+        often or where, so this also clears after the worker thread's
+        commits (which on_write has already handled per table): a reload too
+        many rather than a stale list.
+        """
+        now = time.monotonic()
+        if not force and now - self.checked_at < self.check_interval:
+            return
+        self.checked_at = now
+        version = self.db.data_version()
+        if version != self.data_version:
+            self.data_version = version
+            self.external_clears += 1
+            self.clear()
+
+    def on_write(self, path, table, row_ids):
+        if path != self.path or table not in self.records:
+            return
+        with self.lock:
+            self.versions[table] += 1
+            self.listings.pop(table, None)
+            if row_ids is None:
+                self.records[table] = OrderedDict()
+            else:
+                for row_id in row_ids:
+                    self.records[table].pop(row_id, None)
+
+    def clear(self):
+        with self.lock:
+            for table in self.records:
+                self.records[table] = OrderedDict()
+                self.versions[table] += 1
+            self.listings.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "external_clears": self.external_clears,
+                "records": {table: len(records) for table, records in self.records.items()},
+                "listings": sorted(self.listings),
+            }
+
+    # ===== Database-compatible readers =====
+    def fetch_clients(self, keyword=""):
+        if keyword:
+            return [row for row in self.all("clients") if keyword.lower() in str(row.name).lower()]
+        return self.all("clients")
+
+    def fetch_animals(self):
+        return self.all("animals")
+
+    def fetch_appointments(self):
+        return self.all("appointments")
+
+    def fetch_treatments(self):
+        return self.all("treatments")
+
+    def fetch_invoices(self):
+        return self.all("invoices")
+
+    def fetch_pet_status(self):
+        return self.all("pet_status")
+
+    def fetch_revenue(self, period="daily", start=None, end=None):
+        # the rollups are already a few rows per day: nothing to cache
+        return self.db.fetch_revenue(period, start, end)
@@ -0,0 +1,271 @@
+from datetime import datetime
+
+import metrics
+from database import SETTLED_TOLERANCE
+from normalize import normalize_walkin, normalize_pet_status
+
+# Clinic business rules as plain functions over a Database, so they can be
+# used (and batched) without Tk. The frames and VetClinicApp call into these.
+
+TREATMENT_COSTS = {
+    "Checkup": 50,
+    "Vaccination": 75,
+    "Surgery": 500,
+    "Dental Cleaning": 150,
+    "X-Ray": 100,
+    "Blood Test": 80,
+    "Grooming": 60,
+    "Wound Care": 120,
+    "Physical Therapy": 100,
+    "Medication": 40
+}
+
+# price charged for treatment types missing from TREATMENT_COSTS
+DEFAULT_TREATMENT_COST = 50
+
+WALKINS_PROCESSED = metrics.counter("vetclinic_walkins_processed_total", "Walk-ins turned into client/animal/appointment records")
+PETS_DISCHARGED = metrics.counter("vetclinic_pets_discharged_total", "Pets discharged (each with a discharge invoice)")
+
+WALKIN_COLUMNS = ("client_name", "contact", "address", "pet_name", "species", "breed", "age", "reason", "date")
+
+
+def today():
+    return datetime.now().strftime("%Y-%m-%d")
+
+
+def new_invoice_no(db, date=None):
+    """Allocate the next invoice number for `date` (default today).
+
+    The allocation holds the write lock until the caller commits: insert the
+    invoice and commit in the same try, rolling back on error (or use
+    create_invoice, which does).
+    """
+    return db.allocate_invoice_nos(date or today())[0]
+
+
+# ===== Walk-ins =====
+def walkin_records(walkin):
+    """Client, animal and appointment rows for a normalized walk-in"""
+    client_name, contact, address, pet_name, species, breed, age, reason, date = walkin
+    return (
+        [client_name, contact, address],
+        [pet_name, species, breed, age, client_name],
+        [client_name, pet_name, date, "09:00", reason],
+    )
+
+
+def process_walkins(db, walkins, record_walkins=True):
+    """Normalize a list of walk-ins and create their records in one transaction.
+
+    Each walk-in adds a client, an animal and a 09:00 appointment (and the
+    walk-in row itself unless record_walkins is False). Treatments and
+    invoices are not created here. Returns the number of walk-ins processed;
+    nothing is written if any insert fails.
+    """
+    walkins = [normalize_walkin(w) for w in walkins]
+    clients, animals, appointments = [], [], []
+    for walkin in walkins:
+        client, animal, appointment = walkin_records(walkin)
+        clients.append(client)
+        animals.append(animal)
+        appointments.append(appointment)
+
+    if record_walkins:
+        db.bulk_insert("walkins", WALKIN_COLUMNS, walkins, commit=False)
+    db.bulk_insert("clients", ("name", "contact", "address"), clients, commit=False)
+    db.bulk_insert("animals", ("pet_name", "species", "breed", "age", "owner_name"), animals, commit=False)
+    db.bulk_insert("appointments", ("client_name", "pet_name", "date", "time", "reason"), appointments, commit=False)
+    db.commit()
+    WALKINS_PROCESSED.inc(len(walkins))
+    return len(walkins)
+
+
+def process_walkin(db, walkin_data, record_walkin=False):
+    """Create the client, animal and appointment records for one walk-in"""
+    return process_walkins(db, [walkin_data], record_walkins=record_walkin) == 1
+
+
+# ===== Treatments / invoices =====
+def treatment_cost(treatment_type, default=DEFAULT_TREATMENT_COST):
+    return TREATMENT_COSTS.get(treatment_type, default)
+
+
+def calculate_treatment_total(db, client, pet=None):
+    """Total price of every treatment recorded for a client (optionally one pet)"""
+    total = 0
+    for treatment_type, count in db.count_treatment_types(client, pet):
+        total += treatment_cost(treatment_type) * count
+    return total
+
+
+def add_treatment_cost(db, client_name, treatment_reason, cost=0):
+    """Add a treatment's price to the client's latest invoice if it is still open, else to a new one.
+
+    A settled invoice is never added to: it would reopen as Unpaid with the
+    new charge mixed into an old balance. Returns the id of the invoice that
+    was updated or created; raises if a new invoice could not be created.
+    """
+    amount = TREATMENT_COSTS.get(treatment_reason, cost if cost else DEFAULT_TREATMENT_COST)
+
+    invoice = db.fetch_latest_invoice_for_client(client_name)
+    if invoice and invoice.status == "Unpaid":
+        db.update_invoice_amount(invoice.id, invoice.amount + amount)
+        return invoice.id
+
+    # Pet unknown here — leave blank
+    invoice_id, _ = db.create_invoice(client_name, "", amount, today())
+    return invoice_id
+
+
+def create_invoice(db, client, pet, amount, date=None, status="Unpaid"):
+    """Insert an invoice under a newly allocated number; returns the number (raises on failure)"""
+    return db.create_invoice(client, pet, amount, date or today(), status)[1]
+
+
+def mark_invoice_paid(db, invoice_id):
+    # the settle trigger records a payment for whatever is still due
+    db.update_invoice_status(invoice_id, "Paid")
+
+
+def mark_invoice_unpaid(db, invoice_id):
+    # the reopen trigger records a reversal of the payments
+    db.update_invoice_status(invoice_id, "Unpaid")
+
+
+def record_payment(db, invoice_id, amount, date=None, method="Cash", notes=""):
+    """Record a (partial) payment; returns the payment id.
+
+    Raises ValueError for a non-positive amount, an unknown invoice or more
+    than is due. The invoice's paid amount, status and the client balance
+    follow in the same transaction (database.BALANCE_TRIGGERS).
+    """
+    amount = round(float(amount), 2)
+    if amount <= 0:
+        raise ValueError("Payment amount must be positive")
+    invoice = db.fetch_invoice_by_id(invoice_id)
+    if invoice is None:
+        raise ValueError(f"Invoice {invoice_id} does not exist")
+    if amount > invoice.due + SETTLED_TOLERANCE:
+        raise ValueError(f"Payment ${amount:.2f} is more than the ${invoice.due:.2f} due")
+    return db.insert_payment(invoice.id, amount, date or today(), method, notes)
+
+
+# ===== Discharge =====
+def discharge_totals(db, pets):
+    """{(client, pet): price of every treatment the pet received} from one grouped query"""
+    counts = db.count_treatment_types_for(pets)
+    return {pair: sum(treatment_cost(treatment_type) * count for treatment_type, count in counts.get(pair, ()))
+            for pair in pets}
+
+
+def discharge_pets(db, pets, date=None, notes=""):
+    """Discharge many pets in one transaction: a Discharged status row and an invoice each.
+
+    `pets` is an iterable of (pet, client); duplicates are discharged once.
+    Every invoice bills all the pet's treatments. Returns
+    [(pet, client, invoice_no, amount)] in input order; nothing is written
+    if pricing or any insert fails (the error is raised).
+    """
+    date = date or today()
+    pairs = list(dict.fromkeys((client, pet) for pet, client in pets))
+    if not pairs:
+        return []
+    totals = discharge_totals(db, pairs)
+    # one block of numbers for the batch, committed with the invoices below
+    invoice_nos = db.allocate_invoice_nos(date, len(pairs))
+    discharged = [(pet, client, invoice_no, totals[(client, pet)])
+                  for (client, pet), invoice_no in zip(pairs, invoice_nos)]
+
+    db.bulk_insert("pet_status", ("pet", "client", "status", "date", "notes"),
+                   [(pet, client, "Discharged", date, notes or "") for pet, client, _, _ in discharged],
+                   commit=False)
+    db.bulk_insert("invoices", ("invoice_no", "client", "pet", "amount", "date", "status"),
+                   [(invoice_no, client, pet, amount, date, "Unpaid")
+                    for pet, client, invoice_no, amount in discharged],
+                   commit=False)
+    try:
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    PETS_DISCHARGED.inc(len(discharged))
+    return discharged
+
+
+def discharge_still_confined(db, pets, date=None, notes=""):
+    """Discharge those of `pets` (pet, client) that are still confined (see discharge_pets).
+
+    Pets discharged since they were picked are skipped, so they are never
+    invoiced twice.
+    """
+    confined = {(pet, client) for client, pet, _ in db.fetch_confined_pets()}
+    return discharge_pets(db, [(pet, client) for pet, client in pets if (pet, client) in confined], date, notes)
+
+
+def discharge_confined(db, date=None, notes="End of day discharge"):
+    """Discharge every pet still confined (see discharge_pets)"""
+    return discharge_pets(db, [(pet, client) for client, pet, _ in db.fetch_confined_pets()], date, notes)
+
+
+def discharge_summary(discharged, limit=20):
+    """Text for one message after a batch discharge"""
+    if not discharged:
+        return "No pets were discharged."
+    total = sum(amount for _, _, _, amount in discharged)
+    lines = [f"Discharged {len(discharged)} pet(s), invoiced ${total:,.2f}:", ""]
+    for pet, client, invoice_no, amount in discharged[:limit]:
+        lines.append(f"{pet} ({client})  {invoice_no}  ${amount:,.2f}")
+    if len(discharged) > limit:
+        lines.append(f"... and {len(discharged) - limit} more")
+    return "\n".join(lines)
+
+
+def update_pet_status(db, pet, client, status, date=None, notes=""):
+    """Record a status change; discharging also creates the discharge invoice.
+
+    Returns (invoice_no, amount) when an invoice was created, otherwise None.
+    """
+    status = normalize_pet_status(status)
+    if status == "Discharged":
+        _, _, invoice_no, amount = discharge_pets(db, [(pet, client)], date, notes)[0]
+        return invoice_no, amount
+    db.insert_pet_status([pet, client, status, date or today(), notes or ""])
+    return None
+
+
+# ===== Receipts =====
+def generate_receipt(invoice):
+    """Generate receipt text from an Invoice record"""
+    receipt = f"""
+{'='*50}
+         VET CLINIC RECEIPT
+{'='*50}
+
+Invoice No:      {invoice.invoice_no}
+Date:            {invoice.date}
+Status:          {invoice.status or 'Unknown'}
+
+{'='*50}
+CLIENT INFORMATION
+{'='*50}
+Client Name:     {invoice.client}
+Pet Name:        {invoice.pet}
+
+{'='*50}
+INVOICE DETAILS
+{'='*50}
+Amount:          ${invoice.amount:.2f}
+Paid:            ${invoice.paid_amount:.2f}
+Balance Due:     ${invoice.due:.2f}
+
+{'='*50}
+Thank you for visiting!
+{'='*50}
+"""
+    return receipt
+
+
+def receipt_for(db, invoice_id):
+    """Receipt text for an invoice id (None if it does not exist)"""
+    invoice = db.fetch_invoice_by_id(invoice_id)
+    return generate_receipt(invoice) if invoice else None
@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+# the modules are flat in OppProject2, as main.py and cli.py import them
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+
+
+@pytest.fixture
+def db(tmp_path):
+    """A fresh clinic database in a temporary file"""
+    database = Database(str(tmp_path / "clinic.db"))
+    yield database
+    database.conn.close()
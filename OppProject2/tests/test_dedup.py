@@ -0,0 +1,53 @@
+import dedup
+
+
+def add_animal(db, pet, owner, species, breed="", age=None):
+    db.cursor.execute("INSERT INTO animals (pet_name, owner_name, species, breed, age) VALUES (?, ?, ?, ?, ?)",
+                      (pet, owner, species, breed, age))
+    return db.cursor.lastrowid
+
+
+def test_same_name_different_species_is_not_a_duplicate(db):
+    add_animal(db, "Brownie", "Maria Cruz", "Dog", "Shih Tzu", 3)
+    add_animal(db, "Brownie", "Maria Cruz", "Small Mammal", "Ferret", 3)
+    db.commit()
+    assert dedup.find_animal_duplicates(db) == []
+
+
+def test_breed_and_age_must_be_compatible(db):
+    add_animal(db, "Biscuit", "Jose Reyes", "Dog", "Beagle", 2)
+    add_animal(db, "Biscuit", "Jose Reyes", "Dog", "Poodle", 2)
+    add_animal(db, "Mochi", "Jose Reyes", "Cat", "", 1)
+    add_animal(db, "Mochi", "Jose Reyes", "Cat", "", 9)
+    db.commit()
+    assert dedup.find_animal_duplicates(db) == []
+
+
+def test_pet_merge_repoints_records_of_the_duplicate(db):
+    keep = add_animal(db, "Bantay", "Maria Cruz", "Dog", "Aspin", 4)
+    dup = add_animal(db, "bantay ", "maria cruz", "dog", "", 5)
+    db.cursor.execute("INSERT INTO treatments (pet, client) VALUES ('bantay ', 'maria cruz')")
+    db.cursor.execute("INSERT INTO walkins (pet_name, client_name) VALUES ('bantay ', 'maria cruz')")
+    db.commit()
+
+    [cluster] = dedup.find_animal_duplicates(db)
+    assert (cluster["keep"].id, [d.id for d in cluster["duplicates"]]) == (keep, [dup])
+    assert dedup.merge_animal_cluster(db, cluster) == 1
+    assert db.cursor.execute("SELECT pet, client FROM treatments").fetchall() == [("Bantay", "Maria Cruz")]
+    assert db.cursor.execute("SELECT pet_name, client_name FROM walkins").fetchall() == [("Bantay", "Maria Cruz")]
+    assert db.cursor.execute("SELECT id FROM animals").fetchall() == [(keep,)]
+
+
+def test_client_merge_skips_a_name_shared_outside_the_cluster(db):
+    db.cursor.executemany("INSERT INTO clients (name, contact) VALUES (?, ?)", [
+        ("Ana Santos", "09171234567"),
+        ("Ana Santoss", "09171234567"),  # typo of the first, same phone
+        ("Ana Santoss", "09998887777"),  # a different client with the typo's name
+    ])
+    db.cursor.execute("INSERT INTO invoices (client, amount) VALUES ('Ana Santoss', 100)")
+    db.commit()
+
+    [cluster] = dedup.find_client_duplicates(db)
+    assert dedup.merge_client_cluster(db, cluster) == 0
+    assert db.cursor.execute("SELECT client FROM invoices").fetchall() == [("Ana Santoss",)]
+    assert db.cursor.execute("SELECT COUNT(*) FROM clients").fetchone()[0] == 3
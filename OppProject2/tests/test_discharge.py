@@ -0,0 +1,33 @@
+import services
+from database import Database
+
+DAY = "2024-03-01"
+
+
+def invoiced(db):
+    return db.cursor.execute("SELECT client, pet FROM invoices ORDER BY id").fetchall()
+
+
+def test_selection_skips_pets_discharged_since(db):
+    db.insert_pet_status(["Rex", "Ann", "Confined", DAY, ""])
+    db.insert_pet_status(["Tom", "Bob", "Confined", DAY, ""])
+    services.discharge_pets(db, [("Rex", "Ann")], DAY)
+
+    # a stale selection from the list still holds Rex's old Confined row
+    discharged = services.discharge_still_confined(db, [("Rex", "Ann"), ("Tom", "Bob")], DAY)
+
+    assert [(pet, client) for pet, client, _, _ in discharged] == [("Tom", "Bob")]
+    assert invoiced(db) == [("Ann", "Rex"), ("Bob", "Tom")]
+
+
+def test_status_case_is_normalized(db, tmp_path):
+    db.insert_pet_status(["Rex", "Ann", "confined", DAY, ""])  # as older versions stored it
+    services.update_pet_status(db, "Tom", "Bob", "CONFINED", DAY)
+    db.conn.close()
+
+    reopened = Database(str(tmp_path / "clinic.db"))
+    try:
+        assert [row[:2] for row in reopened.fetch_confined_pets()] == [("Ann", "Rex"), ("Bob", "Tom")]
+        assert reopened.count_rows("pet_status", {"status": "=Confined"}) == 2
+    finally:
+        reopened.conn.close()
@@ -0,0 +1,36 @@
+import json
+
+import importer
+
+
+def schema(db, kind):
+    return db.cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = ? ORDER BY name", (kind,)).fetchall()
+
+
+def test_invoice_import_restores_triggers_and_indexes(db, tmp_path):
+    triggers, indexes = schema(db, "trigger"), schema(db, "index")
+    path = tmp_path / "invoices.csv"
+    path.write_text("invoice_no,client,amount,date,status\n"
+                    "INV-1,Ann,100,2024-01-05,Paid\n"
+                    "INV-2,Ann,50,2024-01-05,Unpaid\n"
+                    "INV-1,Bea,10,2024-01-06,Unpaid\n")  # duplicate number: rejected alone
+
+    stats = importer.import_file(db, "invoices", str(path), batch_size=10)
+
+    assert (stats["imported"], stats["rejected"]) == (2, 1)
+    assert not db.conn.in_transaction
+    assert schema(db, "trigger") == triggers and schema(db, "index") == indexes
+    assert db.fetch_client_balance("Ann") == (2, 150.0, 100.0, 50.0)
+    assert db.fetch_revenue("daily") == [("2024-01-05", 2, 150.0, 100.0, 50.0)]
+
+
+def test_malformed_json_records_are_rejected_one_at_a_time(db, tmp_path):
+    path = tmp_path / "clients.jsonl"
+    path.write_text('{"name": "Ann"}\n{"name": \n[1]\n{"contact": "0917"}\n{"name": "Bea"}\n')
+    rejects = tmp_path / "rejects.jsonl"
+
+    stats = importer.import_file(db, "clients", str(path), rejects_path=str(rejects))
+
+    assert (stats["read"], stats["imported"], stats["rejected"]) == (5, 2, 3)
+    assert [json.loads(line)["line"] for line in rejects.read_text().splitlines()] == [2, 3, 4]
+    assert [row.name for row in db.fetch_clients()] == ["Ann", "Bea"]
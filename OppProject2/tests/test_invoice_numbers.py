@@ -0,0 +1,85 @@
+import sqlite3
+import threading
+
+import pytest
+
+import services
+from database import Database
+
+DAY = "2024-03-01"
+WRITERS = 4
+INVOICES_EACH = 25
+
+
+def numbers(db):
+    return [row[0] for row in db.cursor.execute("SELECT invoice_no FROM invoices ORDER BY id")]
+
+
+def test_numbers_are_consecutive_per_day(db):
+    assert services.create_invoice(db, "Ann", "Rex", 10.0, DAY) == "INV-20240301-0001"
+    assert services.create_invoice(db, "Ann", "Rex", 10.0, DAY) == "INV-20240301-0002"
+    assert services.create_invoice(db, "Ann", "Rex", 10.0, "2024-03-02") == "INV-20240302-0001"
+    assert db.allocate_invoice_nos(DAY, 3) == ["INV-20240301-0003", "INV-20240301-0004", "INV-20240301-0005"]
+    db.rollback()
+    # a rolled back block is handed out again
+    assert db.allocate_invoice_nos(DAY)[0] == "INV-20240301-0003"
+    db.rollback()
+
+
+def test_counter_skips_numbers_already_used(db):
+    db.bulk_insert("invoices", ("invoice_no", "client", "pet", "amount", "date", "status"),
+                   [("INV-20240301-0007", "Ann", "Rex", 10.0, DAY, "Unpaid")])
+    assert services.create_invoice(db, "Ann", "Rex", 10.0, DAY) == "INV-20240301-0008"
+
+
+def test_failed_insert_gives_its_number_back(db):
+    with pytest.raises(ValueError):
+        db.create_invoice("Ann", "Rex", 10.0, "2024-02-30")
+    db.cursor.execute("CREATE TEMP TRIGGER refuse BEFORE INSERT ON invoices BEGIN SELECT RAISE(ABORT, 'refused'); END")
+    with pytest.raises(sqlite3.IntegrityError):
+        db.create_invoice("Ann", "Rex", 10.0, DAY)
+    db.cursor.execute("DROP TRIGGER refuse")
+    assert not db.conn.in_transaction
+    assert services.create_invoice(db, "Ann", "Rex", 10.0, DAY) == "INV-20240301-0001"
+
+
+def test_concurrent_writers_never_share_a_number(db):
+    """Separate connections on one file, as terminals are: every number is handed out once, in order"""
+    ready = threading.Barrier(WRITERS)
+    created, errors = [], []
+
+    def writer(n):
+        try:
+            conn = Database(db.path)
+        except Exception as e:
+            errors.append(e)
+            ready.abort()
+            return
+        try:
+            ready.wait()
+            for i in range(INVOICES_EACH):
+                if i % 5 == 0:
+                    # a discharge-sized block from the same counter
+                    nos = conn.allocate_invoice_nos(DAY, 2)
+                    conn.bulk_insert("invoices", ("invoice_no", "client", "pet", "amount", "date", "status"),
+                                     [(no, f"Client {n}", "Rex", 10.0, DAY, "Unpaid") for no in nos])
+                    created.extend(nos)
+                else:
+                    created.append(conn.create_invoice(f"Client {n}", "Rex", 10.0, DAY)[1])
+        except Exception as e:
+            errors.append(e)
+        finally:
+            conn.conn.close()
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(WRITERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(60)
+
+    assert errors == []
+    total = WRITERS * (INVOICES_EACH + INVOICES_EACH // 5)
+    expected = [f"INV-20240301-{n:04d}" for n in range(1, total + 1)]
+    assert sorted(created) == expected
+    assert sorted(numbers(db)) == expected
+    assert db.cursor.execute("SELECT next FROM invoice_sequences WHERE day=?", (DAY,)).fetchone()[0] == total + 1
@@ -0,0 +1,120 @@
+import pytest
+
+import maintenance
+import services
+
+DAY = "2024-03-01"
+
+
+def revenue(db):
+    return db.fetch_revenue("daily", DAY, DAY)
+
+
+def invoice(db, invoice_id):
+    return db.cursor.execute("SELECT status, amount, paid_amount FROM invoices WHERE id=?", (invoice_id,)).fetchone()
+
+
+def out_of_sync(db):
+    """Problem counts of the CLI's rollup and balance checks (all should be 0)"""
+    return {name: db.cursor.execute(sql).fetchone()[0] for name, sql in maintenance.CHECKS if "sync" in name}
+
+
+def test_partial_payment_splits_the_rollup(db):
+    invoice_id, _ = db.create_invoice("Ann", "Rex", 650.0, DAY)
+    db.insert_payment(invoice_id, 600.0, DAY)
+
+    assert revenue(db) == [(DAY, 1, 650.0, 600.0, 50.0)]
+    assert db.fetch_client_balance("Ann") == (1, 650.0, 600.0, 50.0)
+    assert invoice(db, invoice_id)[0] == "Unpaid"
+
+
+def test_settle_and_reopen_record_payments(db):
+    invoice_id, _ = db.create_invoice("Ann", "Rex", 650.0, DAY)
+    db.insert_payment(invoice_id, 600.0, DAY)
+
+    services.mark_invoice_paid(db, invoice_id)
+    assert [(p[1], p[3]) for p in db.fetch_payments(invoice_id)][1:] == [(50.0, "Settled")]
+    assert revenue(db) == [(DAY, 1, 650.0, 650.0, 0.0)]
+
+    services.mark_invoice_unpaid(db, invoice_id)
+    assert [p[3] for p in db.fetch_payments(invoice_id)] == ["", "Settled", "Reversal"]
+    assert invoice(db, invoice_id) == ("Unpaid", 650.0, 0.0)
+    assert revenue(db) == [(DAY, 1, 650.0, 0.0, 650.0)]
+    assert db.fetch_client_balance("Ann") == (1, 650.0, 0.0, 650.0)
+    assert set(out_of_sync(db).values()) == {0}
+
+
+def test_treatment_cost_never_reopens_a_paid_invoice(db):
+    invoice_id, _ = db.create_invoice("Ann", "Rex", 100.0, DAY, status="Paid")
+
+    new_id = services.add_treatment_cost(db, "Ann", "Checkup")
+
+    assert new_id != invoice_id
+    assert invoice(db, invoice_id) == ("Paid", 100.0, 100.0)
+    assert services.add_treatment_cost(db, "Ann", "Checkup") == new_id  # still open: added to
+    assert set(out_of_sync(db).values()) == {0}
+
+
+def test_deleting_a_payment_reopens_the_invoice(db):
+    invoice_id, _ = db.create_invoice("Ann", "Rex", 100.0, DAY)
+    payment_id = services.record_payment(db, invoice_id, 100.0, DAY)
+    assert invoice(db, invoice_id) == ("Paid", 100.0, 100.0)
+
+    db.cursor.execute("DELETE FROM payments WHERE id=?", (payment_id,))
+    db.commit()
+
+    assert invoice(db, invoice_id) == ("Unpaid", 100.0, 0.0)
+    assert db.fetch_client_balance("Ann") == (1, 100.0, 0.0, 100.0)
+    assert revenue(db) == [(DAY, 1, 100.0, 0.0, 100.0)]
+
+
+def test_moving_a_payment_updates_both_invoices_and_clients(db):
+    ann_id, _ = db.create_invoice("Ann", "Rex", 100.0, DAY)
+    bob_id, _ = db.create_invoice("Bob", "Tom", 80.0, DAY)
+    payment_id = db.insert_payment(ann_id, 80.0, DAY)
+
+    db.cursor.execute("UPDATE payments SET invoice_id=? WHERE id=?", (bob_id, payment_id))
+    db.commit()
+
+    assert invoice(db, ann_id) == ("Unpaid", 100.0, 0.0)
+    assert invoice(db, bob_id) == ("Paid", 80.0, 80.0)
+    assert db.fetch_client_balance("Ann") == (1, 100.0, 0.0, 100.0)
+    assert db.fetch_client_balance("Bob") == (1, 80.0, 80.0, 0.0)
+    assert revenue(db) == [(DAY, 2, 180.0, 80.0, 100.0)]
+
+
+def test_amount_change_moves_the_status(db):
+    invoice_id, _ = db.create_invoice("Ann", "Rex", 100.0, DAY)
+    db.insert_payment(invoice_id, 60.0, DAY)
+
+    db.update_invoice_amount(invoice_id, 60.0)
+    assert invoice(db, invoice_id) == ("Paid", 60.0, 60.0)
+    db.update_invoice_amount(invoice_id, 90.0)
+    assert invoice(db, invoice_id) == ("Unpaid", 90.0, 60.0)
+    assert db.fetch_client_balance("Ann") == (1, 90.0, 60.0, 30.0)
+    assert revenue(db) == [(DAY, 1, 90.0, 60.0, 30.0)]
+
+
+def test_overpayment_is_refused(db):
+    invoice_id, _ = db.create_invoice("Ann", "Rex", 100.0, DAY)
+    with pytest.raises(ValueError):
+        services.record_payment(db, invoice_id, 100.5, DAY)
+    with pytest.raises(ValueError):
+        services.record_payment(db, invoice_id, 0, DAY)
+    assert db.fetch_payments(invoice_id) == []
+
+
+def test_rebuild_matches_what_the_triggers_kept(db):
+    first, _ = db.create_invoice("Ann", "Rex", 100.0, DAY)
+    second, _ = db.create_invoice("Ann", "Rex", 50.0, DAY, status="Paid")
+    db.insert_payment(first, 30.0, DAY)
+    services.mark_invoice_paid(db, first)
+    services.mark_invoice_unpaid(db, first)
+    kept = (db.fetch_client_balance("Ann"), revenue(db), invoice(db, first), invoice(db, second))
+
+    counts = db.rebuild_balances()
+    db.create_revenue_rollups()
+
+    assert counts["payments"] == 0  # every Paid invoice already had its payment
+    assert (db.fetch_client_balance("Ann"), revenue(db), invoice(db, first), invoice(db, second)) == kept
+    assert set(out_of_sync(db).values()) == {0}
@@ -0,0 +1,25 @@
+import plancheck
+
+ROWS = {"clients": 5000}
+LEADING = {"idx_clients_name": "name"}
+
+
+def findings(sql, *plan):
+    return [finding for finding, _ in plancheck.check_plan(sql, list(plan), ROWS, {}, LEADING)]
+
+
+def test_old_sqlite_scan_table_is_recognised():
+    assert findings("SELECT * FROM clients", "SCAN TABLE clients") == ["SCAN clients"]
+
+
+def test_unfiltered_page_in_index_order_is_not_a_scan():
+    assert findings("SELECT * FROM clients ORDER BY name LIMIT 50",
+                    "SCAN TABLE clients USING INDEX idx_clients_name") == []
+    assert findings("SELECT * FROM clients ORDER BY id LIMIT 50", "SCAN clients") == []
+
+
+def test_page_out_of_order_or_filtered_is_reported():
+    assert findings("SELECT * FROM clients ORDER BY contact LIMIT 50",
+                    "SCAN clients USING INDEX idx_clients_name") == ["SCAN clients"]
+    assert findings("SELECT * FROM clients WHERE name LIKE ? ORDER BY id LIMIT 50",
+                    "SCAN clients") == ["FILTERED SCAN clients"]
@@ -0,0 +1,22 @@
+import logging
+import sqlite3
+
+from querystats import QueryStats
+
+
+def slow_levels(caplog, stats, many=False):
+    conn = sqlite3.connect(":memory:")
+    with caplog.at_level(logging.DEBUG, logger="vetclinic"):
+        stats.record(conn, "SELECT 1", (), "test.case", 500.0, 1, many=many)
+    conn.close()
+    return [record.levelname for record in caplog.records if record.getMessage().startswith("Slow query")]
+
+
+def test_default_threshold_logs_slow_queries_quietly(caplog):
+    assert slow_levels(caplog, QueryStats(slow_ms=100)) == ["INFO"]
+
+
+def test_explicit_threshold_warns_except_for_bulk_statements(caplog):
+    assert slow_levels(caplog, QueryStats(slow_ms=100, warn=True)) == ["WARNING"]
+    caplog.clear()
+    assert slow_levels(caplog, QueryStats(slow_ms=100, warn=True), many=True) == ["INFO"]
@@ -0,0 +1,50 @@
+import sqlite3
+
+from repository import Repository
+
+
+def rename_externally(db, name):
+    """Commit from another connection, as another terminal would"""
+    other = sqlite3.connect(db.path)
+    other.execute("UPDATE clients SET name = ? WHERE id = 1", (name,))
+    other.commit()
+    other.close()
+
+
+def test_cache_hits_skip_the_data_version_query(db, monkeypatch):
+    db.insert_client(["Ann", "555", "Main St"])
+    repo = Repository(db, check_interval=60)
+    try:
+        repo.check_external(force=True)
+        calls = []
+        monkeypatch.setattr(db, "data_version", lambda: calls.append(1) or 0)
+        assert repo.get("clients", 1).name == "Ann"
+        assert repo.get("clients", 1).name == "Ann"
+        assert calls == []
+    finally:
+        repo.close()
+
+
+def test_external_commit_clears_the_cache_once_checked(db):
+    db.insert_client(["Ann", "555", "Main St"])
+    repo = Repository(db, check_interval=60)
+    try:
+        assert repo.get("clients", 1).name == "Ann"
+        rename_externally(db, "Anne")
+        assert repo.get("clients", 1).name == "Ann"  # within the check interval
+        repo.check_external(force=True)
+        assert repo.get("clients", 1).name == "Anne"
+        assert repo.stats()["external_clears"] == 1
+    finally:
+        repo.close()
+
+
+def test_zero_interval_checks_on_every_read(db):
+    db.insert_client(["Ann", "555", "Main St"])
+    repo = Repository(db, check_interval=0)
+    try:
+        assert repo.get("clients", 1).name == "Ann"
+        rename_externally(db, "Anne")
+        assert repo.get("clients", 1).name == "Anne"
+    finally:
+        repo.close()
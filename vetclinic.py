@@ -1,4 +1,5 @@
 import sqlite3
+import time
 import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import date, datetime
@@ -78,6 +79,17 @@ class Database:
             FOREIGN KEY(recordID) REFERENCES MedicalRecord(recordID) ON DELETE CASCADE,
             FOREIGN KEY(treatmentID) REFERENCES Treatment(treatmentID) ON DELETE CASCADE
         );
+
+        -- indexes behind the sortable list columns and the joins they use
+        CREATE INDEX IF NOT EXISTS idx_client_name ON Client(name);
+        CREATE INDEX IF NOT EXISTS idx_pet_name ON Pet(name);
+        CREATE INDEX IF NOT EXISTS idx_pet_owner ON Pet(ownerID);
+        CREATE INDEX IF NOT EXISTS idx_appointment_date ON Appointment(date);
+        CREATE INDEX IF NOT EXISTS idx_appointment_pet ON Appointment(petID);
+        CREATE INDEX IF NOT EXISTS idx_record_visit ON MedicalRecord(visitDate);
+        CREATE INDEX IF NOT EXISTS idx_record_pet ON MedicalRecord(petID);
+        CREATE INDEX IF NOT EXISTS idx_treatment_name ON Treatment(treatmentName);
+        CREATE INDEX IF NOT EXISTS idx_record_treatment_record ON MedicalRecord_Treatment(recordID);
         """)
         self.conn.commit()
 
@@ -116,6 +128,116 @@ def safe_int(val, default=None):
     except Exception:
         return default
 
+def count_rows(db, source, where="", params=()):
+    return db.fetchone(f"SELECT COUNT(*) FROM {source}{where}", params)[0]
+
+def fetch_page(db, fields, source, key, sort, descending=False, where="", params=(), limit=200, offset=0):
+    """One page of rows for PagedList (the SQL side, usable without Tk); ties on sort break by key"""
+    direction = "DESC" if descending else "ASC"
+    order = f"{sort} {direction}" if sort == key else f"{sort} {direction}, {key} {direction}"
+    rows = db.fetchall(f"SELECT {fields} FROM {source}{where} ORDER BY {order} LIMIT ? OFFSET ?",
+                       list(params) + [limit, offset])
+    return rows
+
+# Medical records list: treatment names are looked up only for the rows on the current page
+RECORD_FIELDS = """
+            m.recordID, p.name, m.visitDate, m.diagnosis, m.notes,
+            IFNULL((SELECT GROUP_CONCAT(t.treatmentName, ', ') FROM MedicalRecord_Treatment mrt
+                    JOIN Treatment t ON mrt.treatmentID = t.treatmentID
+                    WHERE mrt.recordID = m.recordID), '')"""
+RECORD_SOURCE = "MedicalRecord m LEFT JOIN Pet p ON m.petID = p.petID"
+
+class PagedList:
+    """Header sorting, per-column filter boxes and Prev/Next paging for a Treeview.
+
+    Sorting and filtering become ORDER BY / WHERE on the query, which fetches
+    one page at a time. columns: (heading, SQL expression or None, sortable)
+    per tree column, the first being the ID (filtered by exact match, used to
+    break sort ties). Sortable columns should be indexed.
+    """
+    def __init__(self, app, tree, fields, source, columns, sort, descending=False, transform=None, page_size=200):
+        self.app, self.tree = app, tree
+        self.fields, self.source, self.columns = fields, source, columns
+        self.sort, self.descending = sort, descending
+        self.transform, self.page_size = transform, page_size
+        self.page, self.total = 0, 0
+        self.key = columns[0][1]
+
+        parent = tree.master
+        filters = tk.Frame(parent, bg=parent.cget("bg"))
+        filters.pack(fill=tk.X, padx=8, pady=(8, 0), before=tree)
+        self.entries = {}
+        for heading, expr, sortable in columns:
+            if sortable:
+                tree.heading(heading, command=lambda e=expr: self.sort_by(e))
+            if expr is None:
+                continue
+            tk.Label(filters, text=heading + ":", bg=parent.cget("bg")).pack(side=tk.LEFT)
+            e = tk.Entry(filters, width=10)
+            e.pack(side=tk.LEFT, padx=(2, 8))
+            e.bind("<Return>", lambda ev: self.apply_filters())
+            self.entries[expr] = e
+        tk.Button(filters, text="Filter", command=self.apply_filters).pack(side=tk.LEFT)
+
+        pager = tk.Frame(parent, bg=parent.cget("bg"))
+        pager.pack(fill=tk.X, padx=8, pady=(0, 8), after=tree)
+        self.prev_btn = tk.Button(pager, text="◀ Prev", command=lambda: self.go_to(self.page - 1))
+        self.prev_btn.pack(side=tk.LEFT)
+        self.next_btn = tk.Button(pager, text="Next ▶", command=lambda: self.go_to(self.page + 1))
+        self.next_btn.pack(side=tk.LEFT, padx=6)
+        self.page_label = tk.Label(pager, text="", bg=parent.cget("bg"))
+        self.page_label.pack(side=tk.LEFT, padx=6)
+        self._where, self._params = "", []
+        self._update_headings()
+
+    def apply_filters(self):
+        conds, params = [], []
+        for expr, e in self.entries.items():
+            text = e.get().strip()
+            if not text:
+                continue
+            if expr == self.key:
+                conds.append(f"{expr} = ?"); params.append(safe_int(text, -1))
+            else:
+                conds.append(f"{expr} LIKE ?"); params.append(f"%{text}%")
+        self._where = (" WHERE " + " AND ".join(conds)) if conds else ""
+        self._params = params
+        self.page = 0
+        self.reload()
+
+    def sort_by(self, expr):
+        if expr == self.sort:
+            self.descending = not self.descending
+        else:
+            self.sort, self.descending = expr, False
+        self.page = 0
+        self._update_headings()
+        self.reload()
+
+    def _update_headings(self):
+        for heading, expr, sortable in self.columns:
+            arrow = (" ▼" if self.descending else " ▲") if expr == self.sort else ""
+            self.tree.heading(heading, text=heading + arrow)
+
+    def go_to(self, page):
+        page = min(max(page, 0), max(0, (self.total - 1) // self.page_size))
+        if page != self.page:
+            self.page = page
+            self.reload(count=False)
+
+    def reload(self, count=True):
+        db = self.app.db
+        if count:
+            self.total = count_rows(db, self.source, self._where, self._params)
+            self.page = min(self.page, max(0, (self.total - 1) // self.page_size))
+        rows = fetch_page(db, self.fields, self.source, self.key, self.sort, self.descending, self._where,
+                          self._params, self.page_size, self.page * self.page_size)
+        self.app._fill_tree(self.tree, rows, self.transform)
+        first = self.page * self.page_size
+        self.page_label.config(text=f"{first + 1:,}–{first + len(rows):,} of {self.total:,}" if self.total else "No rows")
+        self.prev_btn.config(state=tk.NORMAL if self.page > 0 else tk.DISABLED)
+        self.next_btn.config(state=tk.NORMAL if first + len(rows) < self.total else tk.DISABLED)
+
 # GUI / Application
 class VetClinicApp:
     def __init__(self, root):
@@ -123,6 +245,7 @@ class VetClinicApp:
         self.root.title("Vet Clinic Management")
         self.root.geometry("1100x700")
         self.db = Database()
+        self._fill_job = None
         self._build_ui()
         self.show_home()
 
@@ -131,6 +254,8 @@ class VetClinicApp:
         top_bar = tk.Frame(self.root, bg="#ffffff", height=70)
         top_bar.pack(fill=tk.X)
         tk.Label(top_bar, text="Veterinary Clinic System", font=("Arial", 18, "bold"), bg="#ffffff").pack(side=tk.LEFT, padx=18, pady=14)
+        self.row_count = tk.Label(top_bar, text="", fg="#6b7280", bg="#ffffff")
+        self.row_count.pack(side=tk.RIGHT, padx=18)
 
         # left menu
         self.menu = tk.Frame(self.root, bg="#93c6e6", width=220)
@@ -151,9 +276,47 @@ class VetClinicApp:
         tk.Button(self.menu, text="Exit", command=self._exit, bg="#ff7f7f", width=20, pady=6).pack(side=tk.BOTTOM, pady=12)
 
     def clear_content(self):
+        self._cancel_fill()
+        self.row_count.config(text="")
         for w in self.content.winfo_children():
             w.destroy()
 
+    # ---- chunked table filling ----
+    def _fill_tree(self, tree, rows, transform=None, budget_ms=8):
+        """Fill tree a slice at a time (at most budget_ms per slice) so the window stays responsive.
+        Starting another fill or switching views cancels the one in progress."""
+        self._cancel_fill()
+        tree.delete(*tree.get_children())
+        rows = list(rows)
+        total = len(rows)
+        budget = budget_ms / 1000.0
+
+        def fill_slice(pos):
+            self._fill_job = None
+            if not tree.winfo_exists():
+                return
+            deadline = time.perf_counter() + budget
+            while pos < total:
+                stop = min(pos + 32, total)
+                for r in rows[pos:stop]:
+                    tree.insert("", tk.END, values=transform(r) if transform else r)
+                pos = stop
+                if time.perf_counter() >= deadline:
+                    break
+            if pos < total:
+                self.row_count.config(text=f"Loading... {pos:,} of {total:,} rows")
+                self._fill_job = self.root.after(1, fill_slice, pos)
+            else:
+                self.row_count.config(text=f"{total:,} rows")
+
+        self.row_count.config(text=f"Loading... 0 of {total:,} rows")
+        self._fill_job = self.root.after(1, fill_slice, 0)
+
+    def _cancel_fill(self):
+        if self._fill_job is not None:
+            self.root.after_cancel(self._fill_job)
+            self._fill_job = None
+
     # ---- HOME ----
     def show_home(self):
         self.clear_content()
@@ -175,6 +338,9 @@ class VetClinicApp:
             self.client_tree.heading(c, text=c)
             self.client_tree.column(c, width=150 if c!="Address" else 300)
         self.client_tree.pack(fill=tk.BOTH, expand=True, padx=8, pady=8)
+        self.client_list = PagedList(self, self.client_tree, "clientID, name, address, contactNo", "Client", [
+            ("ID", "clientID", True), ("Name", "name", True), ("Address", "address", False), ("Contact", "contactNo", False),
+        ], sort="clientID", descending=True)
         self._load_clients()
 
         btns = tk.Frame(self.content, bg="#f5fbff")
@@ -185,11 +351,7 @@ class VetClinicApp:
         tk.Button(btns, text="Refresh", width=12, command=self._load_clients).grid(row=0,column=3,padx=6)
 
     def _load_clients(self):
-        for i in self.client_tree.get_children():
-            self.client_tree.delete(i)
-        rows = self.db.fetchall("SELECT clientID, name, address, contactNo FROM Client ORDER BY clientID DESC")
-        for r in rows:
-            self.client_tree.insert("", tk.END, values=r)
+        self.client_list.reload()
 
     def _client_add(self):
         win = tk.Toplevel(self.root); win.title("Add Client")
@@ -250,6 +412,19 @@ class VetClinicApp:
             self.pet_tree.column(c, width=100)
         self.pet_tree.column("Owner", width=160)
         self.pet_tree.pack(fill=tk.BOTH, expand=True, padx=8, pady=8)
+
+        def pet_values(r):
+            birth = r[5] or ""
+            age = calc_age_from_iso(birth)
+            owner = r[6] or "—"
+            return (r[0], r[1], r[2], r[3], r[4], birth, owner, age)
+        self.pet_list = PagedList(self, self.pet_tree,
+            "Pet.petID, Pet.name, Pet.species, Pet.breed, Pet.gender, Pet.birthDate, Client.name",
+            "Pet LEFT JOIN Client ON Pet.ownerID = Client.clientID", [
+            ("ID", "Pet.petID", True), ("Name", "Pet.name", True), ("Species", "Pet.species", False),
+            ("Breed", "Pet.breed", False), ("Gender", "Pet.gender", False), ("BirthDate", "Pet.birthDate", False),
+            ("Owner", "Client.name", False), ("Age", None, False),
+        ], sort="Pet.petID", descending=True, transform=pet_values)
         self._load_pets()
 
         btns = tk.Frame(self.content, bg="#f5fbff"); btns.pack(pady=6)
@@ -259,18 +434,7 @@ class VetClinicApp:
         tk.Button(btns, text="Refresh", width=12, command=self._load_pets).grid(row=0,column=3,padx=6)
 
     def _load_pets(self):
-        for i in self.pet_tree.get_children():
-            self.pet_tree.delete(i)
-        rows = self.db.fetchall("""
-            SELECT Pet.petID, Pet.name, Pet.species, Pet.breed, Pet.gender, Pet.birthDate, Client.name
-            FROM Pet LEFT JOIN Client ON Pet.ownerID = Client.clientID
-            ORDER BY Pet.petID DESC
-        """)
-        for r in rows:
-            birth = r[5] or ""
-            age = calc_age_from_iso(birth)
-            owner = r[6] or "—"
-            self.pet_tree.insert("", tk.END, values=(r[0], r[1], r[2], r[3], r[4], birth, owner, age))
+        self.pet_list.reload()
 
     def _pet_add(self):
         win = tk.Toplevel(self.root); win.title("Add Pet")
@@ -350,6 +514,12 @@ class VetClinicApp:
             self.app_tree.heading(c, text=c)
             self.app_tree.column(c, width=120)
         self.app_tree.pack(fill=tk.BOTH, expand=True, padx=8, pady=8)
+        self.app_list = PagedList(self, self.app_tree,
+            "a.appointmentID, p.name, v.name, a.date, a.time, a.status, a.reason",
+            "Appointment a LEFT JOIN Pet p ON a.petID = p.petID LEFT JOIN Veterinarian v ON a.vetID = v.vetID", [
+            ("ID", "a.appointmentID", True), ("Pet", "p.name", False), ("Vet", "v.name", False), ("Date", "a.date", True),
+            ("Time", "a.time", False), ("Status", "a.status", False), ("Reason", "a.reason", False),
+        ], sort="a.date")
         self._load_appointments()
 
         btns = tk.Frame(self.content, bg="#f5fbff"); btns.pack(pady=6)
@@ -359,17 +529,7 @@ class VetClinicApp:
         tk.Button(btns, text="Refresh", width=12, command=self._load_appointments).grid(row=0,column=3,padx=6)
 
     def _load_appointments(self):
-        for i in self.app_tree.get_children():
-            self.app_tree.delete(i)
-        rows = self.db.fetchall("""
-            SELECT a.appointmentID, p.name, v.name, a.date, a.time, a.status, a.reason
-            FROM Appointment a
-            LEFT JOIN Pet p ON a.petID = p.petID
-            LEFT JOIN Veterinarian v ON a.vetID = v.vetID
-            ORDER BY a.date ASC
-        """)
-        for r in rows:
-            self.app_tree.insert("", tk.END, values=r)
+        self.app_list.reload()
 
     def _appointment_add(self):
         win = tk.Toplevel(self.root); win.title("Add Appointment")
@@ -422,6 +582,9 @@ class VetClinicApp:
             self.treat_tree.heading(c, text=c)
             self.treat_tree.column(c, width=150)
         self.treat_tree.pack(fill=tk.BOTH, expand=True, padx=8, pady=8)
+        self.treat_list = PagedList(self, self.treat_tree, "treatmentID, treatmentName, description, cost", "Treatment", [
+            ("ID", "treatmentID", True), ("Name", "treatmentName", True), ("Description", "description", False), ("Cost", "cost", False),
+        ], sort="treatmentName")
         self._load_treatments()
 
         btns = tk.Frame(self.content, bg="#f5fbff"); btns.pack(pady=6)
@@ -431,11 +594,7 @@ class VetClinicApp:
         tk.Button(btns, text="Refresh", width=12, command=self._load_treatments).grid(row=0,column=3,padx=6)
 
     def _load_treatments(self):
-        for i in self.treat_tree.get_children():
-            self.treat_tree.delete(i)
-        rows = self.db.fetchall("SELECT treatmentID, treatmentName, description, cost FROM Treatment ORDER BY treatmentName")
-        for r in rows:
-            self.treat_tree.insert("", tk.END, values=r)
+        self.treat_list.reload()
 
     def _treatment_add(self):
         win = tk.Toplevel(self.root); win.title("Add Treatment")
@@ -505,6 +664,10 @@ class VetClinicApp:
             self.record_tree.heading(c, text=c)
             self.record_tree.column(c, width=100)
         self.record_tree.pack(fill=tk.BOTH, expand=True, padx=8, pady=8)
+        self.record_list = PagedList(self, self.record_tree, RECORD_FIELDS, RECORD_SOURCE, [
+            ("ID", "m.recordID", True), ("Pet", "p.name", False), ("VisitDate", "m.visitDate", True),
+            ("Diagnosis", "m.diagnosis", False), ("Notes", "m.notes", False), ("Treatments", None, False),
+        ], sort="m.visitDate", descending=True)
         self._load_records()
 
         right = tk.Frame(main, bg="white", bd=1, relief=tk.SOLID, width=360)
@@ -516,22 +679,7 @@ class VetClinicApp:
         tk.Button(btn_frame, text="Refresh", width=18, command=self._load_records).grid(row=2,column=0,padx=6, pady=6)
 
     def _load_records(self):
-        for i in self.record_tree.get_children():
-            self.record_tree.delete(i)
-        rows = self.db.fetchall("""
-            SELECT m.recordID, p.name, m.visitDate, m.diagnosis, m.notes
-            FROM MedicalRecord m LEFT JOIN Pet p ON m.petID = p.petID
-            ORDER BY m.visitDate DESC
-        """)
-        for r in rows:
-            recID = r[0]
-            tret_rows = self.db.fetchall("""
-                SELECT t.treatmentName FROM MedicalRecord_Treatment mrt
-                JOIN Treatment t ON mrt.treatmentID = t.treatmentID
-                WHERE mrt.recordID=?
-            """, (recID,))
-            tret = ", ".join([x[0] for x in tret_rows]) if tret_rows else ""
-            self.record_tree.insert("", tk.END, values=(r[0], r[1], r[2], r[3], r[4], tret))
+        self.record_list.reload()
 
     def _record_add(self):
         win = tk.Toplevel(self.root); win.title("Add Medical Record")
@@ -600,19 +748,20 @@ class VetClinicApp:
         result_tree.pack(fill=tk.BOTH, expand=True, padx=12, pady=8)
         def run_search():
             kw = q_entry.get().strip()
-            for i in result_tree.get_children():
-                result_tree.delete(i)
             if not kw:
+                self._fill_tree(result_tree, [])
                 return
+            results = []
             # clients
             for r in self.db.fetchall("SELECT clientID, name FROM Client WHERE name LIKE ? OR address LIKE ? OR contactNo LIKE ?", (f"%{kw}%", f"%{kw}%", f"%{kw}%")):
-                result_tree.insert("", tk.END, values=("Client", f"{r[0]} - {r[1]}"))
+                results.append(("Client", f"{r[0]} - {r[1]}"))
             # pets
             for r in self.db.fetchall("SELECT petID, name, species FROM Pet WHERE name LIKE ? OR species LIKE ? OR breed LIKE ?", (f"%{kw}%", f"%{kw}%", f"%{kw}%")):
-                result_tree.insert("", tk.END, values=("Pet", f"{r[0]} - {r[1]} ({r[2]})"))
+                results.append(("Pet", f"{r[0]} - {r[1]} ({r[2]})"))
             # appointments
             for r in self.db.fetchall("SELECT a.appointmentID, p.name, a.date, a.time FROM Appointment a JOIN Pet p ON a.petID = p.petID WHERE p.name LIKE ? OR a.reason LIKE ?", (f"%{kw}%", f"%{kw}%")):
-                result_tree.insert("", tk.END, values=("Appointment", f"{r[0]} - {r[1]} @ {r[2]} {r[3]}"))
+                results.append(("Appointment", f"{r[0]} - {r[1]} @ {r[2]} {r[3]}"))
+            self._fill_tree(result_tree, results)
         tk.Button(frame, text="Search", command=run_search).pack(pady=6)
 
     # ---- REPORTS ----